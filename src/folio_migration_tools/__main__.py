@@ -13,9 +13,14 @@ from pydantic import ValidationError
 
 from folio_migration_tools.config_file_load import merge_load
 from folio_migration_tools.custom_exceptions import TransformationProcessError
-from folio_migration_tools.library_configuration import LibraryConfiguration
+from folio_migration_tools.date_parser import date_parser
+from folio_migration_tools.library_configuration import LibraryConfiguration, SnapshotMode
 from folio_migration_tools.migration_tasks import *  # noqa: F403, F401
 from folio_migration_tools.migration_tasks import migration_task_base
+from folio_migration_tools.reference_data_snapshot import (
+    ReferenceDataSnapshot,
+    SnapshotFolioClient,
+)
 
 
 def parse_args(args):
@@ -60,6 +65,15 @@ def parse_args(args):
         default=environ.get("FOLIO_MIGRATION_TOOLS_REPORT_LANGUAGE", "en"),
         prompt=False,
     )
+    parser.add_argument(
+        "--refresh_reference_data",
+        help=(
+            "Fetch the schemas, mapping rules and reference data again, and store them in "
+            "the reference data snapshot"
+        ),
+        action="store_true",
+        prompt=False,
+    )
     return parser.parse_args(args)
 
 
@@ -111,16 +125,15 @@ def main():
             sys.exit("Task Type Not Found")
         try:
             logging.getLogger("httpx").setLevel(logging.WARNING) # Exclude info messages from httpx
-            with FolioClient(
-                library_config.okapi_url,
-                library_config.tenant_id,
-                library_config.okapi_username,
-                library_config.okapi_password,
-            ) as folio_client:
+            with get_folio_client(library_config, args.refresh_reference_data) as folio_client:
                 task_config = task_class.TaskConfiguration(**migration_task_config)
                 task_obj = task_class(task_config, library_config, folio_client)
                 task_obj.do_work()
                 task_obj.wrap_up()
+                date_parser.log_statistics()
+                if http_session := getattr(task_obj, "http_session", None):
+                    http_session.log_latencies()
+                    http_session.close()
         except TransformationProcessError as tpe:
             logging.critical(tpe.message)
             print(f"\n{tpe.message}: {tpe.data_value}")
@@ -162,6 +175,28 @@ def main():
         sys.exit(ee.__class__.__name__)
 
 
+def get_folio_client(library_config: LibraryConfiguration, refresh_reference_data: bool):
+    snapshot_mode = library_config.reference_data_snapshot
+    if refresh_reference_data:
+        snapshot_mode = SnapshotMode.refresh
+    if snapshot_mode == SnapshotMode.off:
+        return FolioClient(
+            library_config.okapi_url,
+            library_config.tenant_id,
+            library_config.okapi_username,
+            library_config.okapi_password,
+        )
+    return SnapshotFolioClient(
+        library_config.okapi_url,
+        library_config.tenant_id,
+        library_config.okapi_username,
+        library_config.okapi_password,
+        ReferenceDataSnapshot(
+            library_config.base_folder, library_config.folio_release.value, snapshot_mode
+        ),
+    )
+
+
 def inheritors(base_class):
     subclasses = set()
     work = [base_class]
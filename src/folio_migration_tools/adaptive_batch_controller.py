@@ -0,0 +1,135 @@
+import logging
+from collections import deque
+
+import i18n
+
+from folio_migration_tools.migration_report import MigrationReport
+
+
+class AdaptiveBatchController:
+    """Adjusts the batch size and the number of concurrent batches for BatchPoster
+    based on how FOLIO responds to the batches posted.
+
+    The controller follows an additive increase/multiplicative decrease scheme:
+        - HTTP 413 halves the batch size and remembers the request size that was rejected,
+          so that later batches are kept below that size.
+        - HTTP 5xx halves the batch size and lowers the concurrency by one.
+        - Responses slower than the target response time shrinks the batch size by a quarter.
+        - A streak of fast, successful responses grows the batch size by a tenth, and
+          eventually the concurrency by one, until the configured limits are reached.
+    """
+
+    window_size = 20
+    growth_streak = 5
+
+    def __init__(
+        self,
+        migration_report: MigrationReport,
+        start_batch_size: int,
+        min_batch_size: int,
+        max_batch_size: int,
+        max_concurrency: int,
+        target_response_time: float,
+    ):
+        self.migration_report = migration_report
+        self.min_batch_size = max(1, min(min_batch_size, max_batch_size))
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.batch_size = min(max(start_batch_size, self.min_batch_size), self.max_batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = self.max_concurrency
+        self.target_response_time = target_response_time
+        self.max_request_bytes = 0
+        self.bytes_per_record = 0.0
+        self.fast_streak = 0
+        self.recent_failures: deque = deque(maxlen=self.window_size)
+        self.migration_report.set("AdaptiveBatching", i18n.t("Start batch size"), self.batch_size)
+        self.migration_report.set(
+            "AdaptiveBatching", i18n.t("Start concurrency"), self.concurrency
+        )
+        self.report_limits()
+
+    def register_response(
+        self, status_code: int, elapsed_seconds: float, request_bytes: int, records: int
+    ):
+        """Registers the outcome of a posted batch and adjusts the limits accordingly
+
+        Args:
+            status_code (int): HTTP status code of the response
+            elapsed_seconds (float): The time FOLIO took to respond
+            request_bytes (int): The size of the request body
+            records (int): Number of records in the batch
+        """
+        self.recent_failures.append(status_code == 413 or status_code >= 500)
+        if records and request_bytes and status_code != 413:
+            self.bytes_per_record = request_bytes / records
+        if status_code == 413:
+            self.fast_streak = 0
+            self.max_request_bytes = int(request_bytes * 0.8)
+            self.bytes_per_record = request_bytes / max(records, 1)
+            self.shrink(min(self.batch_size, records) // 2, "HTTP 413")
+        elif status_code >= 500:
+            self.fast_streak = 0
+            self.shrink(self.batch_size // 2, "HTTP 5xx")
+            self.lower_concurrency("HTTP 5xx")
+        elif elapsed_seconds > self.target_response_time:
+            self.fast_streak = 0
+            self.shrink(self.batch_size * 3 // 4, "slow response")
+        elif elapsed_seconds < self.target_response_time / 2 and not any(self.recent_failures):
+            self.fast_streak += 1
+            if self.fast_streak % self.growth_streak == 0:
+                self.grow()
+
+    def shrink(self, new_size: int, reason: str):
+        new_size = max(self.min_batch_size, new_size)
+        if new_size < self.batch_size:
+            logging.info(
+                "Adaptive batching: Decreasing batch size from %s to %s due to %s",
+                self.batch_size,
+                new_size,
+                reason,
+            )
+            self.migration_report.add(
+                "AdaptiveBatching",
+                i18n.t("Batch size decreased due to %{reason}", reason=reason),
+            )
+            self.batch_size = new_size
+            self.report_limits()
+
+    def grow(self):
+        new_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 10))
+        if self.max_request_bytes and self.bytes_per_record:
+            new_size = min(new_size, int(self.max_request_bytes / self.bytes_per_record))
+        if new_size > self.batch_size:
+            logging.info(
+                "Adaptive batching: Increasing batch size from %s to %s",
+                self.batch_size,
+                new_size,
+            )
+            self.migration_report.add("AdaptiveBatching", i18n.t("Batch size increased"))
+            self.batch_size = new_size
+            self.report_limits()
+        elif self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            logging.info("Adaptive batching: Increasing concurrency to %s", self.concurrency)
+            self.migration_report.add("AdaptiveBatching", i18n.t("Concurrency increased"))
+            self.report_limits()
+
+    def lower_concurrency(self, reason: str):
+        if self.concurrency > 1:
+            self.concurrency -= 1
+            logging.info(
+                "Adaptive batching: Decreasing concurrency to %s due to %s",
+                self.concurrency,
+                reason,
+            )
+            self.migration_report.add(
+                "AdaptiveBatching",
+                i18n.t("Concurrency decreased due to %{reason}", reason=reason),
+            )
+            self.report_limits()
+
+    def report_limits(self):
+        self.migration_report.set("AdaptiveBatching", i18n.t("Final batch size"), self.batch_size)
+        self.migration_report.set(
+            "AdaptiveBatching", i18n.t("Final concurrency"), self.concurrency
+        )
@@ -0,0 +1,249 @@
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.library_configuration import JsonEncoder, ResultsCompression
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+WRITER_BATCH_SIZE = 1000
+MAX_PENDING_BATCHES = 16
+_FLUSH = object()
+_CLOSE = object()
+
+
+def get_record_encoder(json_encoder: JsonEncoder = JsonEncoder.json) -> Callable[[Any], str]:
+    """Returns the function serializing the records written to the results files
+
+    Args:
+        json_encoder (JsonEncoder, optional): json, or the faster orjson if installed
+
+    Returns:
+        Callable[[Any], str]: The encoder
+    """
+    if json_encoder == JsonEncoder.orjson:
+        if orjson is None:
+            raise TransformationProcessError(
+                "", "jsonEncoder is set to orjson, but the orjson package is not installed"
+            )
+        return lambda record: orjson.dumps(record).decode("utf-8")
+    return json.dumps
+
+
+def open_for_writing(path: Path, compression: ResultsCompression, append: bool = False):
+    mode = "ab" if append else "wb"
+    if compression == ResultsCompression.gzip:
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == ResultsCompression.zstd:
+        if zstandard is None:
+            raise TransformationProcessError(
+                "", "resultsCompression is set to zstd, but the zstandard package is not installed"
+            )
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+    return open(path, mode)
+
+
+def open_results_file(path: Path, mode: str = "r"):
+    """Opens a file written by a BackgroundWriter, or by anything else, for reading.
+    Compressed files are recognized by their first bytes and decompressed.
+
+    Args:
+        path (Path): The file to read
+        mode (str, optional): "r" for text, "rb" for bytes. Defaults to "r".
+
+    Returns:
+        _type_: A file object, iterable by line
+    """
+    with open(path, "rb") as results_file:
+        magic = results_file.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        binary_file = gzip.open(path, "rb")
+    elif magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise TransformationProcessError(
+                "", "The file is compressed with zstd, but zstandard is not installed", path
+            )
+        binary_file = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        )
+    else:
+        binary_file = open(path, "rb")
+    if "b" in mode:
+        return binary_file
+    return io.TextIOWrapper(binary_file, encoding="utf-8")
+
+
+def skip_bytes(results_file, offset: int):
+    """Moves forward to an offset in a file opened by open_results_file. Offsets in
+    compressed files are offsets in the decompressed data.
+    """
+    if results_file.seekable():
+        results_file.seek(offset)
+        return
+    while offset > 0:
+        skipped = len(results_file.read(min(offset, io.DEFAULT_BUFFER_SIZE)))
+        if not skipped:
+            return
+        offset -= skipped
+
+
+class BackgroundWriter:
+    """Writes the lines of a results file from a background thread.
+
+    The lines are collected in batches of WRITER_BATCH_SIZE, and the batches are written,
+    and compressed if asked for, by a thread of its own. Encoding to UTF-8, compression and
+    the writes to disk run while the transformation goes on mapping the next records.
+    Compression and disk writes release the GIL, so they run in parallel with the mapping.
+    At most MAX_PENDING_BATCHES are queued, so a slow disk slows the transformation down
+    instead of filling the memory.
+
+    The writer behaves like a text file opened for writing, but is meant to be written to
+    from one thread. Errors in the background thread are raised on the next write, flush or
+    close. In a forked worker process, which does not have the background thread, the lines
+    are written straight to the file, which only works for uncompressed files.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        compression: ResultsCompression = ResultsCompression.none,
+        json_encoder: JsonEncoder = JsonEncoder.json,
+        append: bool = False,
+        batch_size: int = WRITER_BATCH_SIZE,
+    ):
+        self.path = Path(path)
+        self.name = str(path)
+        self.compression = compression
+        self.encode = get_record_encoder(json_encoder)
+        self.batch_size = batch_size
+        self.file = open_for_writing(self.path, compression, append)
+        self.pid = os.getpid()
+        self.batch: List[str] = []
+        self.queue: queue.Queue = queue.Queue(MAX_PENDING_BATCHES)
+        self.error: Optional[BaseException] = None
+        self.closed = False
+        self.thread = threading.Thread(
+            target=self.write_batches, name=f"Writer {self.path.name}", daemon=True
+        )
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, text: str):
+        if os.getpid() != self.pid:
+            self.write_from_forked_process(text)
+            return
+        self.batch.append(text)
+        if len(self.batch) >= self.batch_size:
+            self.raise_error()
+            self.queue.put(self.batch)
+            self.batch = []
+
+    def writelines(self, lines: Iterable[str]):
+        for line in lines:
+            self.write(line)
+
+    def write_record(self, record):
+        """Serializes a record with the configured encoder, and writes it as a line"""
+        self.write(f"{self.encode(record)}\n")
+
+    def flush(self):
+        """Waits until everything written so far is on disk"""
+        if self.closed or os.getpid() != self.pid:
+            return
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+        self.queue.put(_FLUSH)
+        self.queue.join()
+        self.raise_error()
+
+    def close(self):
+        if self.closed or os.getpid() != self.pid:
+            return
+        self.closed = True
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+        self.queue.put(_CLOSE)
+        self.thread.join()
+        self.raise_error()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise TransformationProcessError(
+                "", f"Writing to {self.path} failed: {self.error}", self.path
+            ) from self.error
+
+    def write_batches(self):
+        while True:
+            batch = self.queue.get()
+            try:
+                # Keep emptying the queue after an error, so the writing thread is not blocked
+                if self.error is None:
+                    if batch is _FLUSH:
+                        self.file.flush()
+                    elif batch is _CLOSE:
+                        self.file.close()
+                    else:
+                        self.file.write("".join(batch).encode("utf-8"))
+            except Exception as error:
+                logging.error("Writing to %s failed: %s", self.path, error)
+                self.error = error
+            finally:
+                self.queue.task_done()
+            if batch is _CLOSE:
+                return
+
+    def write_from_forked_process(self, text: str):
+        if self.compression != ResultsCompression.none:
+            raise TransformationProcessError(
+                "", "Compressed results files can only be written by the main process", self.path
+            )
+        os.write(self.file.fileno(), text.encode("utf-8"))
+
+
+class BackgroundFileHandler(logging.Handler):
+    """A logging handler writing the formatted records to a file through a BackgroundWriter,
+    instead of taking a lock and writing every record to disk in the logging thread
+    """
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.writer = BackgroundWriter(path)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.writer.write(f"{self.format(record)}\n")
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            super().close()
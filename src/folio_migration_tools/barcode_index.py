@@ -0,0 +1,149 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+from folio_migration_tools.background_writer import open_results_file
+from folio_migration_tools.results_index import BARCODE_INDEX, ResultsIndex
+
+INDEX_MAGIC = b"FMTBCIX1"
+NUMBER_OF_BUCKETS = 256
+
+
+class BarcodeIndex:
+    """A set of barcodes, kept as sorted 64 bit hashes of the barcodes instead of as strings.
+
+    A barcode takes 8 bytes instead of the 60 to 100 bytes of a string in a set, so the
+    barcodes of 20 million items fit in 160 MB. The hashes are spread over 256 buckets by
+    their first byte, so sorting a bucket never needs much memory. Two different barcodes
+    sharing a hash is so unlikely, even with tens of millions of barcodes, that the index
+    is used as an exact set.
+
+    The index can be saved to a file, together with a signature of the files it was built
+    from, and loaded again as long as these files have not changed.
+    """
+
+    def __init__(self):
+        self.buckets: List[array] = [array("Q") for _ in range(NUMBER_OF_BUCKETS)]
+        self.is_sorted = True
+
+    @staticmethod
+    def hash_barcode(barcode: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(barcode.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+
+    def add(self, barcode: str):
+        barcode_hash = self.hash_barcode(barcode)
+        self.buckets[barcode_hash >> 56].append(barcode_hash)
+        self.is_sorted = False
+
+    def sort(self):
+        if not self.is_sorted:
+            self.buckets = [array("Q", sorted(set(bucket))) for bucket in self.buckets]
+            self.is_sorted = True
+
+    def __contains__(self, barcode) -> bool:
+        if not isinstance(barcode, str):
+            return False
+        self.sort()
+        barcode_hash = self.hash_barcode(barcode)
+        bucket = self.buckets[barcode_hash >> 56]
+        index = bisect.bisect_left(bucket, barcode_hash)
+        return index < len(bucket) and bucket[index] == barcode_hash
+
+    def __len__(self) -> int:
+        self.sort()
+        return sum(len(bucket) for bucket in self.buckets)
+
+    def save(self, path: Path, signature: dict):
+        self.sort()
+        header = json.dumps(dict(signature, byteorder=sys.byteorder)).encode("utf-8")
+        temp_path = Path(path).with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as index_file:
+            index_file.write(INDEX_MAGIC)
+            index_file.write(struct.pack("<I", len(header)))
+            index_file.write(header)
+            array("Q", (len(bucket) for bucket in self.buckets)).tofile(index_file)
+            for bucket in self.buckets:
+                bucket.tofile(index_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, signature: dict) -> Optional["BarcodeIndex"]:
+        """Loads a saved index
+
+        Args:
+            path (Path): The index file
+            signature (dict): The signature the index must have been saved with
+
+        Returns:
+            Optional[BarcodeIndex]: The index, or None if there is no index saved with the
+            signature
+        """
+        try:
+            with open(path, "rb") as index_file:
+                if index_file.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return None
+                (header_length,) = struct.unpack("<I", index_file.read(4))
+                header = json.loads(index_file.read(header_length))
+                if header != dict(signature, byteorder=sys.byteorder):
+                    return None
+                counts = array("Q")
+                counts.fromfile(index_file, NUMBER_OF_BUCKETS)
+                index = cls()
+                for bucket, count in zip(index.buckets, counts):
+                    bucket.fromfile(index_file, count)
+                return index
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, struct.error) as error:
+            logging.warning("Ignoring broken barcode index %s: %s", path, error)
+            return None
+
+    @classmethod
+    def from_results_files(
+        cls, paths: List[Path], index_path: Optional[Path] = None
+    ) -> "BarcodeIndex":
+        """Collects the barcodes of the records in results files, like the created items
+        or users. The barcodes are read from the barcode index written next to a results file
+        by the transformer, if it is there. With an index_path, the index is saved there, and
+        loaded from there the next time, unless the results files have changed since.
+
+        Args:
+            paths (List[Path]): The results files
+            index_path (Optional[Path], optional): Where to keep the index. Defaults to None.
+
+        Returns:
+            BarcodeIndex: The barcodes
+        """
+        signature = {
+            "files": [
+                [str(path), (stat := os.stat(path)).st_size, stat.st_mtime_ns] for path in paths
+            ]
+        }
+        if index_path and (index := cls.load(index_path, signature)) is not None:
+            logging.info("Loaded %s barcodes from %s", len(index), index_path)
+            return index
+        index = cls()
+        for path in paths:
+            if (results_index := ResultsIndex.open(path, BARCODE_INDEX)) is not None:
+                logging.info("Reading barcodes from %s", results_index.store_path)
+                for barcode in results_index:
+                    index.add(barcode)
+                results_index.close()
+                continue
+            with open_results_file(path) as results_file:
+                for row in results_file:
+                    if barcode := json.loads(row).get("barcode"):
+                        index.add(barcode)
+        index.sort()
+        if index_path:
+            index.save(index_path, signature)
+        return index
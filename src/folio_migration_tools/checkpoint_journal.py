@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+from collections import deque
+from pathlib import Path
+
+
+class JournalEntry:
+    """A batch, or the end of a file, waiting to be acknowledged"""
+
+    def __init__(self, file_name: str, offset: int, line: int, file_done: bool = False):
+        self.file_name = file_name
+        self.offset = offset
+        self.line = line
+        self.file_done = file_done
+        self.acknowledged = file_done
+
+
+class CheckpointJournal:
+    """Keeps track of how far BatchPoster has gotten in each of the files it posts,
+    so that an interrupted run can be resumed where it stopped.
+
+    For every file, the journal stores the byte offset and line number after the last row
+    of the last acknowledged batch. Batches are registered in the order they are read from
+    the files. Since concurrently posted batches can be acknowledged out of order, the
+    checkpoint only moves forward past batches when all batches before them are acknowledged
+    as well. That way, no batch is skipped or posted twice when resuming.
+
+    The journal is small and is rewritten atomically every time the checkpoint moves. A
+    journal that is not enabled keeps track of the positions without writing them.
+    """
+
+    def __init__(self, journal_path: Path, resume: bool = False, enabled: bool = True):
+        self.journal_path = journal_path
+        self.enabled = enabled
+        self.pending: deque = deque()
+        self.positions: dict = {}
+        if resume:
+            self.positions = self.load()
+
+    def load(self) -> dict:
+        if not self.journal_path.is_file():
+            logging.info("No checkpoint journal found at %s. Starting over", self.journal_path)
+            return {}
+        with open(self.journal_path) as journal_file:
+            positions = json.load(journal_file)
+        logging.info("Resuming from checkpoint journal %s", self.journal_path)
+        for file_name, position in positions.items():
+            logging.info(
+                "%s: %s",
+                file_name,
+                "done" if position["done"] else f"continuing after line {position['line']}",
+            )
+        return positions
+
+    def get_position(self, file_name: str):
+        """Returns where to resume reading a file
+
+        Args:
+            file_name (str): Name of the file
+
+        Returns:
+            tuple: byte offset, line number and whether or not the file was fully posted
+        """
+        position = self.positions.get(file_name, {})
+        return position.get("offset", 0), position.get("line", 0), position.get("done", False)
+
+    def register_batch(self, file_name: str, offset: int, line: int) -> JournalEntry:
+        """Registers a batch ending at offset/line, in the order the batches were read
+
+        Args:
+            file_name (str): Name of the file the batch was read from
+            offset (int): Byte offset after the last row of the batch
+            line (int): Line number of the last row of the batch
+
+        Returns:
+            JournalEntry: the entry to acknowledge once the batch is posted or failed
+        """
+        entry = JournalEntry(file_name, offset, line)
+        self.pending.append(entry)
+        return entry
+
+    def register_file_done(self, file_name: str, offset: int, line: int):
+        self.pending.append(JournalEntry(file_name, offset, line, True))
+        self.advance()
+
+    def acknowledge(self, entry: JournalEntry):
+        entry.acknowledged = True
+        self.advance()
+
+    def advance(self):
+        moved = False
+        while self.pending and self.pending[0].acknowledged:
+            entry = self.pending.popleft()
+            self.positions[entry.file_name] = {
+                "offset": entry.offset,
+                "line": entry.line,
+                "done": entry.file_done,
+            }
+            moved = True
+        if moved and self.enabled:
+            self.save()
+
+    def save(self):
+        temp_path = self.journal_path.with_suffix(".tmp")
+        with open(temp_path, "w") as journal_file:
+            json.dump(self.positions, journal_file)
+        os.replace(temp_path, self.journal_path)
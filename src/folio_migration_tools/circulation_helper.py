@@ -5,12 +5,13 @@ import re
 import time
 from typing import Set
 
-import httpx
 import i18n
 from folioclient import FolioClient
 from httpx import HTTPError
 
+from folio_migration_tools.barcode_index import BarcodeIndex
 from folio_migration_tools.helper import Helper
+from folio_migration_tools.http_session import FolioHttpSession
 from folio_migration_tools.migration_report import MigrationReport
 from folio_migration_tools.transaction_migration.legacy_loan import LegacyLoan
 from folio_migration_tools.transaction_migration.legacy_request import LegacyRequest
@@ -27,12 +28,14 @@ class CirculationHelper:
         folio_client: FolioClient,
         service_point_id,
         migration_report: MigrationReport,
+        http_session: FolioHttpSession = None,
     ):
         self.folio_client = folio_client
         self.service_point_id = service_point_id
         self.missing_patron_barcodes: Set[str] = set()
         self.missing_item_barcodes: Set[str] = set()
         self.migration_report: MigrationReport = migration_report
+        self.http_session = http_session or FolioHttpSession(folio_client)
 
     def get_user_by_barcode(self, user_barcode):
         if user_barcode in self.missing_patron_barcodes:
@@ -147,7 +150,7 @@ class CirculationHelper:
                     f"Item Barcode:{legacy_loan.item_barcode}"
                 )
                 return TransactionResult(False, False, "", error_message, error_message)
-            req = httpx.post(url, headers=self.folio_client.okapi_headers, json=data, timeout=None)
+            req = self.http_session.post(url, headers=self.folio_client.okapi_headers, json=data)
             if req.status_code == 422:
                 error_message_from_folio = json.loads(req.text)["errors"][0]["message"]
                 stat_message = error_message_from_folio
@@ -245,7 +248,10 @@ class CirculationHelper:
 
     @staticmethod
     def create_request(
-        folio_client: FolioClient, legacy_request: LegacyRequest, migration_report: MigrationReport
+        folio_client: FolioClient,
+        legacy_request: LegacyRequest,
+        migration_report: MigrationReport,
+        http_session: FolioHttpSession = None,
     ):
         try:
             path = "/circulation/requests"
@@ -261,7 +267,8 @@ class CirculationHelper:
                     "comment": "Migrated from legacy system",
                 }
             }
-            req = httpx.post(url, headers=folio_client.okapi_headers, json=data, timeout=None)
+            http_session = http_session or FolioHttpSession(folio_client)
+            req = http_session.post(url, headers=folio_client.okapi_headers, json=data)
             logging.debug(f"POST {req.status_code}\t{url}\t{json.dumps(data)}")
             if str(req.status_code) == "422":
                 message = json.loads(req.text)["errors"][0]["message"]
@@ -286,28 +293,43 @@ class CirculationHelper:
             )
             return False
 
-    def load_migrated_user_barcodes(self, user_barcodes, patron_files, folder_structure):
-        if any(patron_files):
-            for filedef in patron_files:
-                my_path = folder_structure.results_folder / filedef.file_name
-                with open(my_path) as patron_file:
-                    for row in patron_file:
-                        rec = json.loads(row)
-                        user_barcodes.add(rec.get("barcode", "None"))
-            logging.info("Loaded %s barcodes from users", len(user_barcodes))
+    def load_migrated_user_barcodes(self, patron_files, folder_structure) -> BarcodeIndex:
+        return self.load_migrated_barcodes(patron_files, folder_structure, "users")
+
+    def load_migrated_item_barcodes(self, item_files, folder_structure) -> BarcodeIndex:
+        return self.load_migrated_barcodes(item_files, folder_structure, "items")
+
+    @staticmethod
+    def load_migrated_barcodes(files, folder_structure, object_type: str) -> BarcodeIndex:
+        """Loads the barcodes of the migrated users or items. The barcodes are indexed once
+        per iteration, in the results folder, and read from the index by the following tasks
+        for as long as the results files stay the same.
+
+        Args:
+            files (_type_): The file definitions of the results files
+            folder_structure (_type_): The folder structure of the task
+            object_type (str): users or items
 
-    def load_migrated_item_barcodes(self, item_barcodes, item_files, folder_structure):
-        if any(item_files):
-            for filedef in item_files:
-                my_path = folder_structure.results_folder / filedef.file_name
-                with open(my_path) as item_file:
-                    for row in item_file:
-                        rec = json.loads(row)
-                        item_barcodes.add(rec.get("barcode", "None"))
-            logging.info("Loaded %s barcodes from items", len(item_barcodes))
+        Returns:
+            BarcodeIndex: The barcodes. Empty if no files are given
+        """
+        if not any(files):
+            return BarcodeIndex()
+        barcodes = BarcodeIndex.from_results_files(
+            [folder_structure.results_folder / filedef.file_name for filedef in files],
+            folder_structure.results_folder / f"barcode_index_{object_type}.bin",
+        )
+        logging.info("Loaded %s barcodes from %s", len(barcodes), object_type)
+        return barcodes
 
     @staticmethod
-    def extend_open_loan(folio_client: FolioClient, loan, extension_due_date, extend_out_date):
+    def extend_open_loan(
+        folio_client: FolioClient,
+        loan,
+        extension_due_date,
+        extend_out_date,
+        http_session: FolioHttpSession = None,
+    ):
         try:
             loan_to_put = copy.deepcopy(loan)
             del loan_to_put["metadata"]
@@ -315,9 +337,8 @@ class CirculationHelper:
             loan_to_put["loanDate"] = extend_out_date.isoformat()
             url = f"{folio_client.okapi_url}/circulation/loans/{loan_to_put['id']}"
 
-            req = httpx.put(
-                url, headers=folio_client.okapi_headers, json=loan_to_put, timeout=None
-            )
+            http_session = http_session or FolioHttpSession(folio_client)
+            req = http_session.put(url, headers=folio_client.okapi_headers, json=loan_to_put)
             logging.info(
                 "%s\tPUT Extend loan %s to %s\t %s",
                 req.status_code,
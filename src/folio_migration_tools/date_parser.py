@@ -0,0 +1,139 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from dateutil import parser as dateutil_parser
+from dateutil import tz
+
+MAX_CACHED_DATES = 100_000
+
+# Formats that are parsed without dateutil. Each format is only tried on strings matching its
+# pattern, and gives the same date as dateutil.parser.parse, with its default month first
+# interpretation, would. Anything else is left to dateutil.
+ISO_FORMAT = "iso"
+FAST_FORMATS: List[Tuple[str, "re.Pattern[str]"]] = [
+    (
+        ISO_FORMAT,
+        re.compile(
+            r"\d{4}-\d{2}-\d{2}"
+            r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?"
+            r"(?:Z|[+-]\d{2}:?\d{2})?"
+        ),
+    ),
+    ("%Y%m%d", re.compile(r"\d{8}")),
+    ("%m/%d/%Y", re.compile(r"\d{1,2}/\d{1,2}/\d{4}")),
+    ("%m/%d/%Y %H:%M", re.compile(r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}")),
+    ("%m/%d/%Y %H:%M:%S", re.compile(r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}")),
+    ("%Y/%m/%d", re.compile(r"\d{4}/\d{1,2}/\d{1,2}")),
+]
+
+
+class DateParser:
+    """Parses the dates in the legacy data, giving the same results as
+    dateutil.parser.parse, but without running dateutil for the dates in the common formats.
+
+    Legacy extracts tend to use the same one or two date formats all through a file, and many
+    of the dates repeat, like the due dates of a library closing day. So the parsed dates are
+    memoized, and the formats in FAST_FORMATS are parsed with datetime.fromisoformat or
+    strptime. The format that matched last is tried first, so the dominant format of a file
+    is found by the first dates in it. dateutil only parses the dates not in any of these
+    formats.
+    """
+
+    def __init__(self, max_cached_dates: int = MAX_CACHED_DATES):
+        self.max_cached_dates = max_cached_dates
+        self.formats = list(FAST_FORMATS)
+        self.cache: Dict[Tuple[str, bool], object] = {}
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.fast_path_hits = 0
+        self.fallbacks = 0
+
+    def parse(self, value: str, fuzzy: bool = False) -> datetime:
+        """Parses a date string
+
+        Args:
+            value (str): The date
+            fuzzy (bool, optional): Ignore unknown tokens, like dateutil does. Defaults to False.
+
+        Raises:
+            ValueError: If the date could not be parsed, like dateutil would raise it
+
+        Returns:
+            datetime: The parsed date. Do not change it in place, since it is shared
+        """
+        if not isinstance(value, str):
+            return dateutil_parser.parse(value, fuzzy=fuzzy)
+        key = (value, fuzzy)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            if isinstance(cached, Exception):
+                raise cached.with_traceback(None)
+            return cached  # type: ignore
+        parsed = self.parse_fast(value.strip())
+        if parsed is not None:
+            self.fast_path_hits += 1
+        else:
+            self.fallbacks += 1
+            try:
+                parsed = dateutil_parser.parse(value, fuzzy=fuzzy)
+            except (ValueError, OverflowError) as error:
+                self.remember(key, error)
+                raise
+        self.remember(key, parsed)
+        return parsed
+
+    def parse_fast(self, value: str) -> Optional[datetime]:
+        formats = self.formats
+        for index, (date_format, pattern) in enumerate(formats):
+            if not pattern.fullmatch(value):
+                continue
+            try:
+                if date_format == ISO_FORMAT:
+                    parsed = self.from_iso_format(value)
+                else:
+                    parsed = datetime.strptime(value, date_format)
+            except ValueError:
+                return None
+            if index:
+                # Try the format of this file first from now on
+                with self.lock:
+                    self.formats = [formats[index]] + formats[:index] + formats[index + 1 :]
+            return parsed
+        return None
+
+    @staticmethod
+    def from_iso_format(value: str) -> datetime:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            return parsed
+        # Same time zone objects as dateutil, since callers compare them to dateutil.tz.UTC
+        offset = parsed.utcoffset()
+        if offset == timedelta(0):
+            return parsed.replace(tzinfo=tz.UTC)
+        return parsed.replace(tzinfo=tz.tzoffset(None, int(offset.total_seconds())))
+
+    def remember(self, key: Tuple[str, bool], parsed):
+        if len(self.cache) >= self.max_cached_dates:
+            self.cache.clear()
+        self.cache[key] = parsed
+
+    def log_statistics(self):
+        if self.cache_hits or self.fast_path_hits or self.fallbacks:
+            logging.info(
+                "Dates parsed: %s from cache, %s in a known format, %s by dateutil",
+                self.cache_hits,
+                self.fast_path_hits,
+                self.fallbacks,
+            )
+
+
+date_parser = DateParser()
+
+
+def parse_date(value: str, fuzzy: bool = False) -> datetime:
+    """Parses a date string with the DateParser shared by all of the process"""
+    return date_parser.parse(value, fuzzy)
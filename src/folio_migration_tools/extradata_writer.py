@@ -20,6 +20,7 @@ class ExtradataWriter:
         if type(self).__inited:
             return
         self.cache: List[str] = []
+        self.cache_size: int = 1000
         self.path_to_file: Path = path_to_file
         if self.path_to_file.is_file():
             os.remove(self.path_to_file)
@@ -29,7 +30,7 @@ class ExtradataWriter:
         try:
             if data_to_write:
                 self.cache.append(f"{record_type}\t{json.dumps(data_to_write)}\n")
-            if len(self.cache) > 1000 or flush:
+            if len(self.cache) > self.cache_size or flush:
                 with open(self.path_to_file, "a") as extradata_file:
                     extradata_file.writelines(self.cache)
                     self.cache = []
@@ -39,6 +40,15 @@ class ExtradataWriter:
             logging.error(error_message)
             raise TransformationProcessError("", error_message, record_type) from ee
 
+    def write_cached(self, cached_lines: List[str]):
+        """Writes lines already formatted by another ExtradataWriter, e.g. in a worker process
+
+        Args:
+            cached_lines (List[str]): The cache of the other writer
+        """
+        self.cache.extend(cached_lines)
+        self.write("", {})
+
     def flush(self):
         self.write("", {}, True)
         if self.path_to_file.is_file() and os.stat(self.path_to_file).st_size == 0:
@@ -81,6 +81,10 @@ class FolderStructure:
         self.failed_recs_path = (
             self.results_folder / f"failed_records{self.file_template}{self.time_stamp}.txt"
         )
+        self.hrid_journal_path = self.results_folder / "hrid_allocation_journal.jsonl"
+        self.batch_poster_checkpoint_path = (
+            self.results_folder / f"checkpoint_journal_{self.migration_task_name}.json"
+        )
 
         self.transformation_extra_data_path = (
             self.results_folder / f"extradata{self.file_template}.extradata"
@@ -2,6 +2,8 @@ import json
 import logging
 import i18n
 
+from folio_migration_tools.background_writer import BackgroundWriter
+
 
 class Helper:
     @staticmethod
@@ -53,16 +55,36 @@ class Helper:
             )
         report_file.write(details_end)
 
+    @staticmethod
+    def merge_mapping_stats(mapped_fields: dict, other_mapped_fields: dict):
+        """Adds the field counts from another mapper, e.g. one in a worker process
+
+        Args:
+            mapped_fields (dict): mapped_folio_fields or mapped_legacy_fields to add to
+            other_mapped_fields (dict): the counts to add
+        """
+        for field_name, counts in other_mapped_fields.items():
+            if field_name in mapped_fields:
+                mapped_fields[field_name] = [
+                    count + other_count
+                    for count, other_count in zip(mapped_fields[field_name], counts)
+                ]
+            else:
+                mapped_fields[field_name] = list(counts)
+
     @staticmethod
     def log_data_issue(index_or_id, message, legacy_value):
         logging.log(26, "DATA ISSUE\t%s\t%s\t%s", index_or_id, message, legacy_value)
 
     @staticmethod
     def write_to_file(file, folio_record):
-        """Writes record to file.
+        """Writes record to file. A BackgroundWriter serializes it with its own encoder.
 
         Args:
             file (_type_): _description_
             folio_record (_type_): _description_
         """
-        file.write(f"{json.dumps(folio_record)}\n")
+        if isinstance(file, BackgroundWriter):
+            file.write_record(folio_record)
+        else:
+            file.write(f"{json.dumps(folio_record)}\n")
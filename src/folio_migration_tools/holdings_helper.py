@@ -5,6 +5,7 @@ from uuid import uuid4
 
 from folio_migration_tools import custom_exceptions
 from folio_migration_tools import helper
+from folio_migration_tools.background_writer import open_results_file
 from folio_migration_tools.migration_report import MigrationReport
 
 
@@ -76,7 +77,7 @@ class HoldingsHelper:
             "Holdings type id to exclude is set to %s",
             holdings_type_id_to_exclude_from_merging,
         )
-        with open(holdings_file_path) as holdings_file:
+        with open_results_file(holdings_file_path) as holdings_file:
             prev_holdings = {}
             for row in holdings_file:
                 stored_holding = json.loads(row.split("\t")[-1])
@@ -156,6 +157,91 @@ class HoldingsHelper:
                 del folio_object["notes"]
 
 
+class HoldingsMerger:
+    """Merges a stream of holdings records with the same key into the first one.
+
+    Gives the same result as merging them one at a time with HoldingsHelper.merge_holding,
+    but keeps the items of the merged lists in sets as well, so that merging thousands of
+    records into the same holding does not get slower for every record merged.
+    Duplicate notes are removed like in merge_holding, but without changing their order.
+    """
+
+    # The merged list properties, and whether duplicate items are accepted
+    merged_lists = [
+        ("holdingsStatementsForIndexes", True),
+        ("holdingsStatements", True),
+        ("holdingsStatementsForSupplements", True),
+        ("notes", False),
+        ("formerIds", False),
+        ("electronicAccess", False),
+    ]
+    statements = [
+        "holdingsStatements",
+        "holdingsStatementsForIndexes",
+        "holdingsStatementsForSupplements",
+    ]
+
+    def __init__(self, holdings_record: dict):
+        self.holdings_record = holdings_record
+        self.merged_records = 0
+        self.items_in_lists = {
+            prop_name: {as_hashable(i) for i in holdings_record.get(prop_name, [])}
+            for prop_name, _ in self.merged_lists
+        }
+
+    def merge(self, incoming_holdings: dict):
+        if not self.merged_records:
+            HoldingsHelper.remove_empty_holdings_statements(self.holdings_record)
+            for prop_name in self.statements:
+                self.items_in_lists[prop_name] = {
+                    as_hashable(i) for i in self.holdings_record.get(prop_name, [])
+                }
+        self.merged_records += 1
+        for prop_name, accept_dupe_items in self.merged_lists:
+            self.extend_list(prop_name, incoming_holdings, accept_dupe_items)
+        merge_boolean("discoverySuppress", self.holdings_record, incoming_holdings)
+
+    def extend_list(self, prop_name: str, incoming_holdings: dict, accept_dupe_items: bool):
+        incoming_items = incoming_holdings.get(prop_name, [])
+        items_in_list = self.items_in_lists[prop_name]
+        temp = self.holdings_record.get(prop_name, [])
+        if prop_name in self.statements:
+            # Empty statements are removed after every merge, so they are never in the list
+            incoming_keys = [
+                as_hashable(i) if any(i.values()) else None for i in incoming_items
+            ]
+        else:
+            incoming_keys = [as_hashable(i) for i in incoming_items]
+        if not all(k is not None and k in items_in_list for k in incoming_keys):
+            for f, k in zip(incoming_items, incoming_keys):
+                if k is None:
+                    continue
+                if accept_dupe_items or k not in items_in_list:
+                    temp.append(f)
+                    items_in_list.add(k)
+        if temp:
+            self.holdings_record[prop_name] = temp
+        elif prop_name in self.statements:
+            self.holdings_record.pop(prop_name, None)
+
+    def get_merged_holding(self) -> dict:
+        if self.merged_records:
+            unique_notes = []
+            seen_notes = set()
+            for note in self.holdings_record.get("notes", []):
+                if (key := as_hashable(note)) not in seen_notes:
+                    seen_notes.add(key)
+                    unique_notes.append(note)
+            self.holdings_record["notes"] = unique_notes
+        return self.holdings_record
+
+
+def as_hashable(list_item):
+    if isinstance(list_item, (dict, list)):
+        return json.dumps(list_item, sort_keys=True)
+    return list_item
+
+
 def extend_list(
     prop_name: str, holdings_record: dict, incoming_holdings: dict, accept_dupe_items: bool = False
 ):
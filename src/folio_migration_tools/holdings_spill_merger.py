@@ -0,0 +1,86 @@
+import heapq
+import itertools
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from folio_migration_tools.holdings_helper import HoldingsMerger
+
+
+class HoldingsSpillMerger:
+    """Collects holdings records to be merged by key without keeping them all in memory.
+
+    The records are buffered together with their merge key and the order they were added in.
+    When the buffer is full, it is sorted by key and written to a spill file. At the end, the
+    spill files are merged, and the records with the same key are merged into the first one
+    added, in the order they were added. That gives the same holdings as merging them in
+    memory as they come, but only the buffer and one holding per spill file at a time are
+    kept in memory. The merged holdings come out ordered by key.
+    """
+
+    def __init__(self, spill_folder: Path, max_holdings_in_memory: int):
+        self.spill_folder = Path(tempfile.mkdtemp(prefix="holdings_merge_", dir=spill_folder))
+        self.max_holdings_in_memory = max_holdings_in_memory
+        self.buffer: List[Tuple[str, int, str]] = []
+        self.spill_files: List[Path] = []
+        self.holdings_added = 0
+
+    def add(self, holdings_key: str, holdings_record: dict):
+        self.buffer.append((holdings_key, self.holdings_added, json.dumps(holdings_record)))
+        self.holdings_added += 1
+        if len(self.buffer) >= self.max_holdings_in_memory:
+            self.spill()
+
+    def spill(self):
+        self.buffer.sort()
+        spill_path = self.spill_folder / f"spill_{len(self.spill_files)}.jsonl"
+        with open(spill_path, "w") as spill_file:
+            for holdings_key, order, holding_json in self.buffer:
+                spill_file.write(f"{json.dumps([holdings_key, order])}\t{holding_json}\n")
+        logging.info("Spilled %s holdings to %s", len(self.buffer), spill_path)
+        self.spill_files.append(spill_path)
+        self.buffer = []
+
+    @staticmethod
+    def read_spill_file(spill_path: Path) -> Iterator[Tuple[str, int, str]]:
+        with open(spill_path) as spill_file:
+            for line in spill_file:
+                key_and_order, holding_json = line.rstrip("\n").split("\t", 1)
+                holdings_key, order = json.loads(key_and_order)
+                yield holdings_key, order, holding_json
+
+    def merge(self) -> Iterator[Tuple[dict, int, int]]:
+        """Merges the spill files and the buffer, and the holdings with the same key
+
+        Yields:
+            Tuple[dict, int, int]: The merged holding, the order of the first holding merged
+            into it and the number of holdings merged
+        """
+        for _, holding, first_order, merged_count in self.merge_by_key():
+            yield holding, first_order, merged_count
+
+    def merge_by_key(self) -> Iterator[Tuple[str, dict, int, int]]:
+        """Like merge, but also yields the key of the merged holding first"""
+        self.buffer.sort()
+        runs = [self.read_spill_file(spill_path) for spill_path in self.spill_files]
+        runs.append(iter(self.buffer))
+        try:
+            for holdings_key, records in itertools.groupby(
+                heapq.merge(*runs), key=lambda r: r[0]
+            ):
+                _, first_order, holding_json = next(records)
+                holdings_merger = HoldingsMerger(json.loads(holding_json))
+                for _, _, incoming_json in records:
+                    holdings_merger.merge(json.loads(incoming_json))
+                yield (
+                    holdings_key,
+                    holdings_merger.get_merged_holding(),
+                    first_order,
+                    holdings_merger.merged_records + 1,
+                )
+        finally:
+            self.buffer = []
+            shutil.rmtree(self.spill_folder, ignore_errors=True)
@@ -0,0 +1,212 @@
+import importlib.util
+import logging
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import httpx
+from folioclient import FolioClient
+
+RETRY_STATUSES = {429}
+IDEMPOTENT_RETRY_STATUSES = {500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+MAX_BACKOFF = 60.0
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+
+
+class FolioHttpSession:
+    """One pooled HTTP client, shared by everything a task sends to FOLIO.
+
+    The connections are kept alive between requests, instead of opening a new one, with a
+    new TLS handshake, for every check out, request or settings update. HTTP/2 is used when
+    the h2 package is installed. Requests that were never acted on by FOLIO (429, and
+    connections that could not be made) are retried with exponential backoff and jitter,
+    honouring Retry-After. Requests that can safely be sent twice are also retried on 500,
+    502, 503, 504 and broken connections. A POST, like a check out, is not retried on those,
+    since FOLIO may have acted on it before the error came back. The time every request takes
+    is recorded per endpoint, and logged when the task is done.
+
+    The session can be used as a context manager, like an httpx.Client. Closing it closes the
+    connections. Should the session be used after that, a new client is opened.
+    """
+
+    def __init__(
+        self,
+        folio_client: FolioClient,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = 30,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_connections: int = 100,
+    ):
+        self.folio_client = folio_client
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        self.http2 = importlib.util.find_spec("h2") is not None
+        self.client: Optional[httpx.Client] = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[int]] = defaultdict(
+            lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+        )
+        self.total_latency: Dict[str, float] = defaultdict(float)
+        self.retries: Dict[str, int] = defaultdict(int)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def is_closed(self) -> bool:
+        """True once the session is closed, until it is used again"""
+        return self.closed
+
+    def get_client(self) -> httpx.Client:
+        with self.lock:
+            if self.client is None or self.client.is_closed:
+                self.client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    http2=self.http2,
+                    verify=self.folio_client.ssl_verify,
+                )
+            self.closed = False
+            return self.client
+
+    def close(self):
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+            self.closed = True
+
+    def get(self, url, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method: str, url, **kwargs) -> httpx.Response:
+        """Sends a request, and retries it as long as the failure is worth retrying
+
+        Args:
+            method (str): The HTTP method
+            url (_type_): The full URL, or a path relative to the Okapi URL
+
+        Returns:
+            httpx.Response: The last response received
+        """
+        method = method.upper()
+        url = str(url)
+        if not url.startswith(("http://", "https://")):
+            url = self.folio_client.okapi_url.rstrip("/") + "/" + url.lstrip("/")
+        endpoint = self.endpoint(method, url)
+        retry_statuses = RETRY_STATUSES
+        if method in IDEMPOTENT_METHODS:
+            retry_statuses = RETRY_STATUSES | IDEMPOTENT_RETRY_STATUSES
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.get_client().request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as error:
+                self.record_latency(endpoint, time.perf_counter() - start)
+                if attempt >= self.max_retries:
+                    raise
+                wait = self.backoff(attempt)
+                logging.debug("%s when calling %s. Retrying in %.1fs", error, endpoint, wait)
+            except httpx.TransportError as error:
+                self.record_latency(endpoint, time.perf_counter() - start)
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise
+                wait = self.backoff(attempt)
+                logging.debug("%s when calling %s. Retrying in %.1fs", error, endpoint, wait)
+            else:
+                self.record_latency(endpoint, time.perf_counter() - start)
+                if response.status_code not in retry_statuses or attempt >= self.max_retries:
+                    return response
+                wait = self.retry_after(response)
+                if wait is None:
+                    wait = self.backoff(attempt)
+                logging.debug(
+                    "%s from %s. Retrying in %.1fs", response.status_code, endpoint, wait
+                )
+                response.close()
+            with self.lock:
+                self.retries[endpoint] += 1
+            attempt += 1
+            time.sleep(wait)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff_factor * (2**attempt)))
+
+    @staticmethod
+    def retry_after(response: httpx.Response) -> Optional[float]:
+        retry_after = response.headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return min(MAX_BACKOFF, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        try:
+            return min(
+                MAX_BACKOFF,
+                max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()),
+            )
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def endpoint(method: str, url: str) -> str:
+        """Groups the requests by method and path, with ids replaced by placeholders"""
+        path = httpx.URL(url).path
+        path = UUID_PATTERN.sub("{id}", path)
+        path = "/".join("{n}" if part.isdigit() else part for part in path.split("/"))
+        return f"{method} {path}"
+
+    def record_latency(self, endpoint: str, seconds: float):
+        bucket = next(
+            (i for i, limit in enumerate(LATENCY_BUCKETS) if seconds <= limit),
+            len(LATENCY_BUCKETS),
+        )
+        with self.lock:
+            self.latencies[endpoint][bucket] += 1
+            self.total_latency[endpoint] += seconds
+
+    def log_latencies(self):
+        """Logs the number of requests, the mean latency and the latency histogram per
+        endpoint
+        """
+        labels = [f"<={limit}s" for limit in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        with self.lock:
+            for endpoint, histogram in sorted(self.latencies.items()):
+                count = sum(histogram)
+                logging.info(
+                    "%s: %s requests, %s retried, mean %.3fs. %s",
+                    endpoint,
+                    count,
+                    self.retries[endpoint],
+                    self.total_latency[endpoint] / count,
+                    ", ".join(f"{label}: {n}" for label, n in zip(labels, histogram) if n),
+                )
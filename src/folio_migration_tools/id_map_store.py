@@ -0,0 +1,170 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+MAGIC = b"FMTIDMP1"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+LENGTH = struct.Struct("<I")
+
+
+class IdMapStore(Mapping):
+    """A legacy ID map kept on disk, and read through mmap.
+
+    The store holds the same rows as the *_id_map.json files (legacy id, FOLIO id and, for
+    instances, the HRID), sorted by legacy id. After a small header follows a table with the
+    offset of every row, and then the rows themselves: the legacy id and the rest of the row
+    as JSON, each prefixed by its length. Lookups are binary searches in the offset table,
+    so opening a store takes no time and the rows are only read from disk, or rather from
+    the page cache, when they are looked up. Forked worker processes share the same pages.
+
+    The store is read only, and behaves like the dict returned by
+    MigrationTaskBase.load_id_map. The values are lists, just like the parsed JSON rows.
+    """
+
+    def __init__(self, store_path: Path):
+        self.store_path = store_path
+        with open(store_path, "rb") as store_file:
+            if os.fstat(store_file.fileno()).st_size == 0:
+                raise ValueError(f"{store_path} is not an ID map store")
+            self.mm = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{store_path} is not an ID map store")
+
+    @staticmethod
+    def store_path(map_path) -> Path:
+        """Returns the path of the store kept next to an *_id_map.json file"""
+        return Path(map_path).with_suffix(".idmap")
+
+    @staticmethod
+    def is_up_to_date(map_path) -> bool:
+        """Checks if there is a store for the ID map file that is not older than the file"""
+        store_path = IdMapStore.store_path(map_path)
+        if not store_path.is_file():
+            return False
+        return not os.path.isfile(map_path) or (
+            os.path.getmtime(store_path) >= os.path.getmtime(map_path)
+        )
+
+    @staticmethod
+    def write(store_path: Path, id_map_rows: Iterable[Sequence]):
+        """Writes an ID map store. Should a legacy id appear more than once, the last row wins,
+        just like when the rows are loaded into a dict.
+
+        Args:
+            store_path (Path): Where to write the store
+            id_map_rows (Iterable[Sequence]): The ID map rows, starting with the legacy id
+        """
+        rows = {}
+        for id_map_row in id_map_rows:
+            rows[str(id_map_row[0]).encode("utf-8")] = json.dumps(list(id_map_row[1:])).encode(
+                "utf-8"
+            )
+        IdMapStore.write_sorted(store_path, sorted(rows.items()))
+
+    @staticmethod
+    def write_sorted(store_path: Path, rows: List[Tuple[bytes, bytes]]):
+        IdMapStore.write_sorted_rows(store_path, len(rows), lambda: rows)
+
+    @staticmethod
+    def write_sorted_rows(
+        store_path: Path, count: int, read_rows: Callable[[], Iterable[Tuple[bytes, bytes]]]
+    ):
+        """Writes a store from rows sorted by key, without keeping them in memory
+
+        Args:
+            store_path (Path): Where to write the store
+            count (int): The number of rows
+            read_rows (Callable[[], Iterable[Tuple[bytes, bytes]]]): Returns the rows. Called
+                twice, once for the offsets and once for the rows themselves.
+        """
+        temp_path = Path(f"{store_path}.tmp")
+        with open(temp_path, "wb") as store_file:
+            store_file.write(HEADER.pack(MAGIC, count))
+            offset = HEADER.size + OFFSET.size * count
+            for key, value in read_rows():
+                store_file.write(OFFSET.pack(offset))
+                offset += 2 * LENGTH.size + len(key) + len(value)
+            for key, value in read_rows():
+                store_file.write(LENGTH.pack(len(key)))
+                store_file.write(key)
+                store_file.write(LENGTH.pack(len(value)))
+                store_file.write(value)
+        os.replace(temp_path, store_path)
+        logging.info("Wrote %s IDs to ID map store %s", count, store_path)
+
+    @staticmethod
+    def convert(map_path, store_path: Path = None) -> Path:
+        """Converts an *_id_map.json file into a store, once.
+
+        Args:
+            map_path (_type_): Path to the *_id_map.json file
+            store_path (Path, optional): Where to write the store. Defaults to next to the file.
+
+        Returns:
+            Path: The path to the store
+        """
+        store_path = store_path or IdMapStore.store_path(map_path)
+        logging.info("Converting %s to ID map store %s", map_path, store_path)
+        with open(map_path) as id_map_file:
+            IdMapStore.write(
+                store_path, (json.loads(line) for line in id_map_file if line.strip())
+            )
+        return store_path
+
+    def key_at(self, index: int) -> bytes:
+        (offset,) = OFFSET.unpack_from(self.mm, HEADER.size + OFFSET.size * index)
+        (key_length,) = LENGTH.unpack_from(self.mm, offset)
+        start = offset + LENGTH.size
+        return self.mm[start : start + key_length]
+
+    def value_at(self, index: int) -> list:
+        (offset,) = OFFSET.unpack_from(self.mm, HEADER.size + OFFSET.size * index)
+        (key_length,) = LENGTH.unpack_from(self.mm, offset)
+        start = offset + LENGTH.size
+        key = self.mm[start : start + key_length].decode("utf-8")
+        value_offset = start + key_length
+        (value_length,) = LENGTH.unpack_from(self.mm, value_offset)
+        value_start = value_offset + LENGTH.size
+        return [key, *json.loads(self.mm[value_start : value_start + value_length])]
+
+    def find(self, legacy_id) -> int:
+        """Returns the index of the row with the legacy id, or -1 if it is not in the store"""
+        if not isinstance(legacy_id, str):
+            return -1
+        key = legacy_id.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.key_at(low) == key:
+            return low
+        return -1
+
+    def __getitem__(self, legacy_id) -> list:
+        index = self.find(legacy_id)
+        if index < 0:
+            raise KeyError(legacy_id)
+        return self.value_at(index)
+
+    def __contains__(self, legacy_id) -> bool:
+        return self.find(legacy_id) >= 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.key_at(index).decode("utf-8") for index in range(self.count))
+
+    def close(self):
+        self.mm.close()
@@ -72,6 +72,24 @@ class FolioRelease(str, Enum):
     sunflower = "sunflower"
 
 
+class ResultsCompression(str, Enum):
+    none = "none"
+    gzip = "gzip"
+    zstd = "zstd"
+
+
+class JsonEncoder(str, Enum):
+    json = "json"
+    orjson = "orjson"
+
+
+class SnapshotMode(str, Enum):
+    off = "off"
+    use = "use"
+    refresh = "refresh"
+    offline = "offline"
+
+
 class LibraryConfiguration(BaseModel):
     okapi_url: str
     tenant_id: str
@@ -116,3 +134,65 @@ class LibraryConfiguration(BaseModel):
     add_time_stamp_to_file_names: Annotated[
         bool, Field(title="Add time stamp to file names")
     ] = False
+    http_timeout: Annotated[
+        Optional[float],
+        Field(
+            title="HTTP timeout",
+            description=(
+                "Seconds to wait for FOLIO to respond to a request. Leave out to wait forever"
+            ),
+        ),
+    ] = None
+    http_connect_timeout: Annotated[
+        Optional[float],
+        Field(
+            title="HTTP connect timeout",
+            description="Seconds to wait for a connection to FOLIO to be made",
+        ),
+    ] = 30
+    http_max_retries: Annotated[
+        int,
+        Field(
+            title="HTTP max retries",
+            description=(
+                "Number of times a request is retried when FOLIO is overloaded (429) or "
+                "cannot be reached. Requests that can safely be sent twice, unlike POSTs, "
+                "are also retried on 500, 502, 503 and 504"
+            ),
+            ge=0,
+        ),
+    ] = 3
+    results_compression: Annotated[
+        ResultsCompression,
+        Field(
+            title="Results compression",
+            description=(
+                "Compress the created objects and SRS records files with gzip, or with zstd "
+                "if the zstandard package is installed. The file names stay the same, and "
+                "BatchPoster and the other tasks reading the files decompress them."
+            ),
+        ),
+    ] = ResultsCompression.none
+    json_encoder: Annotated[
+        JsonEncoder,
+        Field(
+            title="JSON encoder",
+            description=(
+                "The encoder used for writing the created objects. orjson is several "
+                "times faster, but needs the orjson package to be installed."
+            ),
+        ),
+    ] = JsonEncoder.json
+    reference_data_snapshot: Annotated[
+        SnapshotMode,
+        Field(
+            title="Reference data snapshot",
+            description=(
+                "Keep the schemas, mapping rules and reference data fetched when the tasks "
+                "start in the reference_data_snapshots folder, per tenant and FOLIO release. "
+                "use reads them from there, and fetches what is missing. refresh fetches "
+                "them all again. offline only reads them from there. off fetches them every "
+                "time."
+            ),
+        ),
+    ] = SnapshotMode.off
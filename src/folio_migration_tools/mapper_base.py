@@ -19,6 +19,7 @@ from folio_migration_tools.custom_exceptions import (
     TransformationRecordFailedError,
 )
 from folio_migration_tools.extradata_writer import ExtradataWriter
+from folio_migration_tools.id_map_store import IdMapStore
 from folio_migration_tools.library_configuration import LibraryConfiguration
 from folio_migration_tools.mapping_file_transformation.ref_data_mapping import (
     RefDataMapping,
@@ -47,6 +48,8 @@ class MapperBase:
         self.migration_report: MigrationReport = MigrationReport()
         self.num_criticalerrors = 0
         self.num_exceptions = 0
+        # Set in worker processes. The main process sums their errors and checks the thresholds
+        self.defer_threshold_checks = False
         self.mapped_legacy_fields: dict = {}
         self.schema_properties = None
 
@@ -226,6 +229,26 @@ class MapperBase:
                 ),
             ) from exception
 
+    def report_ref_data_mapping_caches(self):
+        """Adds the hits and misses of the hybrid mapping caches of the reference data
+        mappings to the migration report, and resets the counts"""
+        for ref_data_mapping in vars(self).values():
+            if isinstance(ref_data_mapping, RefDataMapping) and (
+                ref_data_mapping.cache_hits or ref_data_mapping.cache_misses
+            ):
+                self.migration_report.add(
+                    "RefDataMappingCache",
+                    i18n.t("%{name} hybrid mapping cache hits", name=ref_data_mapping.name),
+                    ref_data_mapping.cache_hits,
+                )
+                self.migration_report.add(
+                    "RefDataMappingCache",
+                    i18n.t("%{name} hybrid mapping cache misses", name=ref_data_mapping.name),
+                    ref_data_mapping.cache_misses,
+                )
+                ref_data_mapping.cache_hits = 0
+                ref_data_mapping.cache_misses = 0
+
     def handle_transformation_field_mapping_error(self, index_or_id, error):
         self.migration_report.add("FieldMappingErrors", error)
         error.id = error.id or index_or_id
@@ -247,6 +270,10 @@ class MapperBase:
         error.index_or_id = error.index_or_id or records_processed
         error.log_it()
         self.num_criticalerrors += 1
+        if not self.defer_threshold_checks:
+            self.check_failed_records_threshold(records_processed)
+
+    def check_failed_records_threshold(self, records_processed: int):
         if (
             self.num_criticalerrors / (records_processed + 1)
             > (self.library_configuration.failed_percentage_threshold / 100)
@@ -279,6 +306,10 @@ class MapperBase:
             f"of type {type(exception).__name__}"
         )
         logging.error(exception, exc_info=True)
+        if not self.defer_threshold_checks:
+            self.check_generic_exception_threshold()
+
+    def check_generic_exception_threshold(self):
         if self.num_exceptions > self.library_configuration.generic_exception_threshold:
             logging.fatal(
                 "Stopping. More than %s unhandled exceptions. Code needs fixing",
@@ -323,6 +354,7 @@ class MapperBase:
                     "GeneralStatistics", i18n.t("Unique ID:s written to legacy map")
                 )
         logging.info("Wrote legacy id map to %s", path)
+        IdMapStore.write(IdMapStore.store_path(path), legacy_map.values())
 
     @staticmethod
     def validate_required_properties(
@@ -0,0 +1,89 @@
+import csv
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+class DelimitedRow(Mapping):
+    """A read only view of a row, sharing the header to column index map with all the other
+    rows of the file, instead of being a dict of its own. Missing columns read as None, like
+    in a csv.DictReader row.
+    """
+
+    __slots__ = ("columns", "values")
+
+    def __init__(self, columns: Dict[str, int], values: List[str]):
+        self.columns = columns
+        self.values = values
+
+    def __getitem__(self, key):
+        index = self.columns[key]
+        return self.values[index] if index < len(self.values) else None
+
+    def get(self, key, default=None):
+        index = self.columns.get(key)
+        if index is None:
+            return default
+        return self.values[index] if index < len(self.values) else None
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.columns}
+
+
+class DelimitedFileReader:
+    """Reads the rows of a csv or tsv file in one pass, counting the rows and the empty rows
+    as they are read. The counts are complete once the reader is exhausted.
+
+    The rows are dicts, just like the ones from csv.DictReader, or DelimitedRow views when
+    row_views is set. Use the views where the rows are only read from.
+    """
+
+    def __init__(self, source_file, file_name: Path, row_views: bool = False):
+        if str(file_name).endswith("tsv"):
+            self.reader = csv.reader(source_file, delimiter="\t")
+        else:
+            self.reader = csv.reader(source_file)
+        self.row_views = row_views
+        self.fieldnames: Optional[List[str]] = None
+        self.total_rows = 0
+        self.empty_rows = 0
+
+    @property
+    def line_num(self) -> int:
+        return self.reader.line_num
+
+    def __iter__(self) -> Iterator[Mapping]:
+        self.fieldnames = next(self.reader, None)
+        while self.fieldnames == []:
+            self.fieldnames = next(self.reader, None)
+        if self.fieldnames is None:
+            return
+        fieldnames = self.fieldnames
+        columns = {fieldname: index for index, fieldname in enumerate(fieldnames)}
+        number_of_fields = len(fieldnames)
+        for row in self.reader:
+            self.total_rows += 1
+            if not "".join(row).strip():
+                self.empty_rows += 1
+                if not row:
+                    # csv.DictReader skips blank lines as well
+                    continue
+            if self.row_views:
+                yield DelimitedRow(columns, row)
+                continue
+            legacy_object = dict(zip(fieldnames, row))
+            if number_of_fields < len(row):
+                legacy_object[None] = row[number_of_fields:]
+            elif number_of_fields > len(row):
+                for fieldname in fieldnames[len(row) :]:
+                    legacy_object[fieldname] = None
+            yield legacy_object
@@ -0,0 +1,106 @@
+import json
+import logging
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from folioclient import FolioClient
+
+from folio_migration_tools.background_writer import open_results_file
+
+LOOKUP_BATCH_SIZE = 50
+
+
+class FolioRecordLookup:
+    """Fills the cache the mappers use to look up FOLIO records by a unique property,
+    like users and items by barcode or organizations by code.
+
+    Instead of one query per value, the values are prefetched in batches of
+    (barcode==("a" or "b" or ...)) queries. Values not in FOLIO are cached as None, so that
+    they are not looked up again for every row they appear in.
+    """
+
+    def __init__(
+        self,
+        folio_client: FolioClient,
+        path: str,
+        result_type: str,
+        match_property: str,
+        cache: Dict[str, Optional[dict]],
+        batch_size: int = LOOKUP_BATCH_SIZE,
+    ):
+        self.folio_client = folio_client
+        self.path = path
+        self.result_type = result_type
+        self.match_property = match_property
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def prefetch(self, match_values: Iterable[str]):
+        """Looks up all values not already in the cache, in batches
+
+        Args:
+            match_values (Iterable[str]): The values to look up
+        """
+        to_fetch = sorted({v for v in match_values if v and v not in self.cache})
+        logging.info("Prefetching %s %s from FOLIO", len(to_fetch), self.result_type)
+        found = 0
+        for start in range(0, len(to_fetch), self.batch_size):
+            batch = to_fetch[start : start + self.batch_size]
+            values = " or ".join(f'"{escape_cql(v)}"' for v in batch)
+            query = f"?query=({self.match_property}==({values}))"
+            records = list(
+                self.folio_client.folio_get_all(
+                    self.path, self.result_type, query, self.batch_size
+                )
+            )
+            # CQL == ignores case and accents. Exact matches win over the other records matched
+            requested = set(batch)
+            for record in records:
+                if (match_value := record.get(self.match_property)) in requested:
+                    self.cache.setdefault(match_value, record)
+            by_folded_value: Dict[str, List[str]] = {}
+            for match_value in batch:
+                by_folded_value.setdefault(fold_cql(match_value), []).append(match_value)
+            for record in records:
+                folded_value = fold_cql(str(record.get(self.match_property, "")))
+                for match_value in by_folded_value.get(folded_value, []):
+                    self.cache.setdefault(match_value, record)
+            for match_value in batch:
+                if self.cache.setdefault(match_value, None):
+                    found += 1
+        logging.info("%s of the %s %s found in FOLIO", found, len(to_fetch), self.result_type)
+
+    def seed(self, records: Iterable[dict]) -> int:
+        """Adds records, created by an earlier task, to the cache
+
+        Args:
+            records (Iterable[dict]): FOLIO records
+
+        Returns:
+            int: The number of records added
+        """
+        added = 0
+        for record in records:
+            if record.get("id") and (match_value := record.get(self.match_property)):
+                self.cache[match_value] = record
+                added += 1
+        return added
+
+    def seed_from_file(self, results_file_path: Path):
+        with open_results_file(results_file_path) as results_file:
+            added = self.seed(json.loads(line) for line in results_file if line.strip())
+        logging.info("Added %s %s from %s", added, self.result_type, results_file_path)
+
+
+def escape_cql(value: str) -> str:
+    """Escapes quotes, backslashes and masking characters in a CQL string"""
+    for char in ("\\", '"', "*", "?", "^"):
+        value = value.replace(char, f"\\{char}")
+    return value
+
+
+def fold_cql(value: str) -> str:
+    """Folds case and accents away, the way CQL == compares strings"""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
@@ -2,7 +2,7 @@ import json
 import logging
 import sys
 from datetime import datetime, timezone
-from typing import Set
+from typing import List, Optional, Set
 from uuid import uuid4
 
 import i18n
@@ -56,6 +56,9 @@ class ItemMapper(MappingFileMapperBase):
         self.items_map = items_map
         self.holdings_id_map = holdings_id_map
         self.unique_barcodes: Set[str] = set()
+        # When set to a list, barcodes are collected here instead of checked for duplicates.
+        # Used by worker processes, since the check depends on all previously mapped rows.
+        self.deferred_barcodes: Optional[List[str]] = None
         self.status_mapping: dict = {}
         if temporary_loan_type_mapping:
             self.temp_loan_type_mapping = RefDataMapping(
@@ -225,16 +228,10 @@ class ItemMapper(MappingFileMapperBase):
         if folio_prop_name == "status.name":
             return self.transform_status(mapped_value)
         elif folio_prop_name == "barcode":
-            barcode = mapped_value
-            normalized_barcode = barcode.strip().lower()
-            if normalized_barcode and normalized_barcode in self.unique_barcodes:
-                Helper.log_data_issue(index_or_id, "Duplicate barcode", mapped_value)
-                self.migration_report.add_general_statistics(i18n.t("Duplicate barcodes"))
-                return f"{barcode}-{uuid4()}"
-            else:
-                if normalized_barcode:
-                    self.unique_barcodes.add(normalized_barcode)
-                return barcode
+            if self.deferred_barcodes is not None:
+                self.deferred_barcodes.append(mapped_value)
+                return mapped_value
+            return self.get_unique_barcode(mapped_value, index_or_id)
         elif folio_prop_name == "holdingsRecordId":
             if mapped_value in self.holdings_id_map:
                 return self.holdings_id_map[mapped_value][1]
@@ -254,6 +251,17 @@ class ItemMapper(MappingFileMapperBase):
             self.migration_report.add("UnmappedProperties", f"{folio_prop_name}")
             return ""
 
+    def get_unique_barcode(self, barcode: str, index_or_id) -> str:
+        normalized_barcode = barcode.strip().lower()
+        if normalized_barcode and normalized_barcode in self.unique_barcodes:
+            Helper.log_data_issue(index_or_id, "Duplicate barcode", barcode)
+            self.migration_report.add_general_statistics(i18n.t("Duplicate barcodes"))
+            return f"{barcode}-{uuid4()}"
+        else:
+            if normalized_barcode:
+                self.unique_barcodes.add(normalized_barcode)
+            return barcode
+
     def get_item_level_call_number_type_id(self, legacy_item, folio_prop_name: str, index_or_id):
         if self.call_number_mapping:
             return self.get_mapped_ref_data_value(
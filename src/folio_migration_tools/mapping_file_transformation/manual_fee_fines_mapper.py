@@ -6,14 +6,17 @@ from typing import Any
 from typing import Dict
 from zoneinfo import ZoneInfo
 
-from dateutil import parser as dateutil_parser
 from dateutil import tz
 from folio_uuid.folio_uuid import FOLIONamespaces
 from folioclient import FolioClient
 
 from folio_migration_tools.custom_exceptions import TransformationProcessError
 from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
+from folio_migration_tools.date_parser import parse_date
 from folio_migration_tools.library_configuration import LibraryConfiguration
+from folio_migration_tools.mapping_file_transformation.folio_record_lookup import (
+    FolioRecordLookup,
+)
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
@@ -52,6 +55,12 @@ class ManualFeeFinesMapper(MappingFileMapperBase):
         self.feefines_map = feefines_map
         self.user_cache: dict = {}
         self.item_cache: dict = {}
+        self.user_lookup = FolioRecordLookup(
+            self.folio_client, "/users", "users", "barcode", self.user_cache
+        )
+        self.item_lookup = FolioRecordLookup(
+            self.folio_client, "/inventory/items", "items", "barcode", self.item_cache
+        )
 
         if feefines_owner_map:
             self.feefines_owner_map = RefDataMapping(
@@ -183,7 +192,7 @@ class ManualFeeFinesMapper(MappingFileMapperBase):
 
     def parse_date_with_tenant_timezone(self, folio_prop_name: str, index_or_id, mapped_value):
         try:
-            format_date = dateutil_parser.parse(mapped_value, fuzzy=True)
+            format_date = parse_date(mapped_value, fuzzy=True)
             if format_date.tzinfo != tz.UTC:
                 format_date = format_date.replace(tzinfo=self.tenant_timezone)
             return format_date.isoformat()
@@ -227,11 +236,18 @@ class ManualFeeFinesMapper(MappingFileMapperBase):
             return cache[match_value]
         else:
             query = f'?query=({match_property}=="{match_value}")'
-            if matching_record := next(
-                self.folio_client.folio_get_all(path, result_type, query), None
-            ):
-                cache[match_value] = matching_record
-                return matching_record
+            matching_record = next(self.folio_client.folio_get_all(path, result_type, query), None)
+            # Misses are cached as well, so that they are not looked up again
+            cache[match_value] = matching_record
+            return matching_record
+
+    def prefetch_folio_records(self, source_file_paths):
+        """Looks up the users and items in the source files in bulk, before mapping"""
+        mapped_values = self.collect_mapped_values(
+            source_file_paths, ["account.userId", "account.itemId"]
+        )
+        self.user_lookup.prefetch(mapped_values["account.userId"])
+        self.item_lookup.prefetch(mapped_values["account.itemId"])
 
     def get_folio_user_uuid(self, index_or_id, user_barcode):
         if matching_user := self.get_matching_record_from_folio(
@@ -4,7 +4,7 @@ import json
 import logging
 import re
 import uuid
-from functools import reduce
+from functools import lru_cache, reduce
 from pathlib import Path
 from typing import Dict, List, Set
 from uuid import UUID
@@ -20,6 +20,9 @@ from folio_migration_tools.custom_exceptions import (
 )
 from folio_migration_tools.library_configuration import LibraryConfiguration
 from folio_migration_tools.mapper_base import MapperBase
+from folio_migration_tools.mapping_file_transformation.delimited_file_reader import (
+    DelimitedFileReader,
+)
 from folio_migration_tools.mapping_file_transformation.ref_data_mapping import (
     RefDataMapping,
 )
@@ -52,6 +55,14 @@ class MappingFileMapperBase(MapperBase):
         self.folio_keys = self.get_mapped_folio_properties_from_map(self.record_map)
         self.field_map = self.setup_field_map(ignore_legacy_identifier)
         self.validate_map()
+        self.map_entries_by_folio_prop = self.setup_map_entries_index(self.record_map)
+        self.legacy_fields_by_folio_prop = {
+            k["folio_field"]: k["legacy_field"] for k in reversed(self.record_map["data"])
+        }
+        self.mapped_legacy_properties = self.get_mapped_legacy_properties_from_map(
+            self.record_map
+        )
+        self.mapped_schema_properties = self.get_mapped_schema_properties()
         try:
             self.mapped_from_values = {
                 k["folio_field"]: k["value"]
@@ -81,9 +92,7 @@ class MappingFileMapperBase(MapperBase):
             ):
                 clean_folio_field = re.sub(r"\[\d+\]", "", k["folio_field"])
                 self.legacy_record_mappings[k["folio_field"]] = list(
-                    self.get_map_entries_by_folio_prop_name(
-                        clean_folio_field, self.record_map["data"]
-                    )
+                    self.map_entries_by_folio_prop.get(clean_folio_field, [])
                 )
                 legacy_fields.add(k["legacy_field"])
                 if not self.mapped_from_legacy_data.get(k["folio_field"]):
@@ -159,6 +168,45 @@ class MappingFileMapperBase(MapperBase):
         # That it maps the required fields etc
         return True
 
+    @staticmethod
+    def setup_map_entries_index(the_map) -> Dict[str, List[dict]]:
+        """Groups the entries of the mapping file that map something by FOLIO property.
+
+        Also compiles the regexes of the entries, so that they are ready when the rows are
+        mapped.
+
+        Args:
+            the_map (_type_): the record mapping file
+
+        Returns:
+            Dict[str, List[dict]]: the mapping file entries of each FOLIO property, in the
+            order they appear in the mapping file
+        """
+        map_entries: Dict[str, List[dict]] = {}
+        for k in the_map["data"]:
+            if is_mapped_entry(k):
+                map_entries.setdefault(k["folio_field"], []).append(k)
+                if regex := k.get("rules", {}).get("regexGetFirstMatchOrEmpty", ""):
+                    get_first_match_or_empty_pattern(regex)
+        return map_entries
+
+    def get_mapped_schema_properties(self) -> List[str]:
+        """Returns the names of the top level schema properties that can get a value.
+
+        Arrays and basic properties only get values from the FOLIO properties in the mapping
+        file, so the ones not in the mapping file are left out. Objects are always kept, since
+        the mappers can add values to the properties of an object on their own.
+
+        Returns:
+            List[str]: The property names, in schema order
+        """
+        return [
+            property_name
+            for property_name, schema_property in self.schema.get("properties", {}).items()
+            if schema_property.get("type", "") == "object"
+            or any(folio_key.startswith(property_name) for folio_key in self.folio_keys)
+        ]
+
     @staticmethod
     def get_mapped_folio_properties_from_map(the_map):
         return [
@@ -246,11 +294,7 @@ class MappingFileMapperBase(MapperBase):
 
     def get_prop(self, legacy_object, folio_prop_name, index_or_id, schema_default_value):
         legacy_item_keys = self.mapped_from_legacy_data.get(folio_prop_name, [])
-        map_entries = list(
-            MappingFileMapperBase.get_map_entries_by_folio_prop_name(
-                folio_prop_name, self.record_map["data"]
-            )
-        )
+        map_entries = self.map_entries_by_folio_prop.get(folio_prop_name, [])
         if not any(map_entries):
             return ""
         elif len(map_entries) > 1:
@@ -298,7 +342,8 @@ class MappingFileMapperBase(MapperBase):
         folio_object, legacy_id = self.instantiate_record(
             legacy_object, index_or_id, object_type, accept_duplicate_ids
         )
-        for property_name, property in self.schema["properties"].items():
+        for property_name in self.mapped_schema_properties:
+            property = self.schema["properties"][property_name]
             try:
                 self.map_property(property_name, property, folio_object, legacy_id, legacy_object)
             except TransformationFieldMappingError as data_error:
@@ -406,10 +451,10 @@ class MappingFileMapperBase(MapperBase):
                 )
                 value = replaced_val
         if value and mapping_file_entry.get("rules", {}).get("regexGetFirstMatchOrEmpty", ""):
-            my_pattern = (
-                f'{mapping_file_entry.get("rules", {}).get("regexGetFirstMatchOrEmpty")}|$'
+            my_pattern = get_first_match_or_empty_pattern(
+                mapping_file_entry["rules"]["regexGetFirstMatchOrEmpty"]
             )
-            value = re.findall(my_pattern, value)[0]
+            value = my_pattern.findall(value)[0]
         if not value and mapping_file_entry.get("fallback_legacy_field", ""):
             migration_report.add(
                 "FieldMappingDetails",
@@ -679,55 +724,82 @@ class MappingFileMapperBase(MapperBase):
             self.report_legacy_mapping(self.legacy_basic_property(property_name), True, True)
 
     @staticmethod
-    def _get_delimited_file_reader(source_file, file_name: Path):
-        """
-            First, let's count:
-            * The total number of rows in the source file
-            * The total number of empty rows in the source file
-
-            Then, we'll return those counts and a csv.DictReader
+    def _get_delimited_file_reader(
+        source_file, file_name: Path, row_views: bool = False
+    ) -> DelimitedFileReader:
+        """Returns a reader for a csv or tsv file, tsv if the file name ends with tsv.
+        The total number of rows and of empty rows are counted while the rows are read,
+        and are available from the reader once it is exhausted.
 
         Args:
             source_file (_type_): _description_
             file_name (Path): _description_
+            row_views (bool, optional): Read the rows as DelimitedRow views instead of dicts
 
         Returns:
-            (int, int, DictReader): total rows, empty rows, dict reader
+            DelimitedFileReader: The reader
         """
-        empty_rows = 0
-        total_rows = -1  # Do not count header row
-        if str(file_name).endswith("tsv"):
-            delimiter = "\t"
-        else:
-            delimiter = ","
-        for line in source_file:
-            if not "".join(line.strip().split(delimiter)):  # check for empty rows
-                empty_rows += 1
-            total_rows += 1
-        source_file.seek(0)  # Set file position back to start
-        if str(file_name).endswith("tsv"):
-            dict_reader = csv.DictReader(source_file, dialect="tsv")
-        else:
-            dict_reader = csv.DictReader(source_file)
-        return total_rows, empty_rows, dict_reader
+        return DelimitedFileReader(source_file, file_name, row_views)
+
+    def collect_mapped_values(
+        self, source_file_paths: List[Path], folio_prop_names: List[str]
+    ) -> Dict[str, Set[str]]:
+        """Scans the source files for the distinct values mapped to the properties, so that the
+        records they point to can be looked up in FOLIO in bulk. Nothing is reported, and rows
+        that can not be mapped are skipped, since they will be reported when mapped.
+
+        Args:
+            source_file_paths (List[Path]): The delimited source files
+            folio_prop_names (List[str]): The FOLIO properties, like account.userId
 
-    def get_objects(self, source_file, file_name: Path):
-        total_rows, empty_rows, reader = self._get_delimited_file_reader(source_file, file_name)
-        logging.info("Source data file contains %d rows", total_rows)
-        logging.info("Source data file contains %d empty rows", empty_rows)
+        Returns:
+            Dict[str, Set[str]]: The distinct values per property
+        """
+        scratch_report = MigrationReport()
+        mapped_values: Dict[str, Set[str]] = {name: set() for name in folio_prop_names}
+        for source_file_path in source_file_paths:
+            with open(source_file_path, encoding="utf-8-sig") as source_file:
+                reader = self._get_delimited_file_reader(
+                    source_file, source_file_path, row_views=True
+                )
+                for legacy_object in reader:
+                    for folio_prop_name in folio_prop_names:
+                        try:
+                            value = " ".join(
+                                MappingFileMapperBase.get_legacy_value(
+                                    legacy_object,
+                                    map_entry,
+                                    scratch_report,
+                                    "",
+                                    self.library_configuration.multi_field_delimiter,
+                                )
+                                for map_entry in self.map_entries_by_folio_prop.get(
+                                    folio_prop_name, []
+                                )
+                            ).strip()
+                        except Exception:
+                            continue
+                        if value:
+                            mapped_values[folio_prop_name].add(value)
+        return mapped_values
+
+    def get_objects(self, source_file, file_name: Path, row_views: bool = False):
+        reader = self._get_delimited_file_reader(source_file, file_name, row_views)
+        try:
+            yield from reader
+        except Exception as exception:
+            logging.error("%s at row %s", exception, reader.line_num)
+            raise exception from exception
+        logging.info("Source data file contains %d rows", reader.total_rows)
+        logging.info("Source data file contains %d empty rows", reader.empty_rows)
         self.migration_report.set(
-            "GeneralStatistics", "Number of rows in {}".format(file_name.name), total_rows
+            "GeneralStatistics", "Number of rows in {}".format(file_name.name), reader.total_rows
         )
         self.migration_report.set(
             "GeneralStatistics",
             "Number of empty rows in {}".format(file_name.name),
-            empty_rows,
+            reader.empty_rows,
         )
-        try:
-            yield from reader
-        except Exception as exception:
-            logging.error("%s at row %s", exception, reader.line_num)
-            raise exception from exception
 
     def has_property(self, legacy_object, folio_prop_name: str):
         legacy_keys = self.field_map.get(folio_prop_name, [])
@@ -750,34 +822,17 @@ class MappingFileMapperBase(MapperBase):
 
     @staticmethod
     def get_map_entries_by_folio_prop_name(folio_prop_name, data):
-        return (
-            k
-            for k in data
-            if k["folio_field"] == folio_prop_name
-            and any(
-                [
-                    is_set_or_bool_or_numeric(k.get("value", "")),
-                    is_set_or_bool_or_numeric(k.get("legacy_field", "")),
-                    is_set_or_bool_or_numeric(k.get("fallback_legacy_field", "")),
-                    is_set_or_bool_or_numeric(k.get("fallback_value", "")),
-                ]
-            )
-        )
+        return (k for k in data if k["folio_field"] == folio_prop_name and is_mapped_entry(k))
 
     def legacy_basic_property(self, folio_prop):
         if folio_prop not in self.folio_keys:
             return ""
-        return next(
-            (k["legacy_field"] for k in self.record_map["data"] if k["folio_field"] == folio_prop),
-            "",
-        )
+        return self.legacy_fields_by_folio_prop.get(folio_prop, "")
 
     def verify_legacy_record(self, legacy_object, idx):
         if idx == 0:
             missing_keys_in_record = [
-                f
-                for f in self.get_mapped_legacy_properties_from_map(self.record_map)
-                if f not in legacy_object
+                f for f in self.mapped_legacy_properties if f not in legacy_object
             ]
             if any(missing_keys_in_record):
                 raise TransformationProcessError(
@@ -973,3 +1028,19 @@ def in_deep(dictionary, keys):
 
 def is_set_or_bool_or_numeric(any_value):
     return any(isinstance(any_value, t) for t in [int, bool, float, complex]) or any_value.strip()
+
+
+def is_mapped_entry(mapping_file_entry: dict):
+    return any(
+        [
+            is_set_or_bool_or_numeric(mapping_file_entry.get("value", "")),
+            is_set_or_bool_or_numeric(mapping_file_entry.get("legacy_field", "")),
+            is_set_or_bool_or_numeric(mapping_file_entry.get("fallback_legacy_field", "")),
+            is_set_or_bool_or_numeric(mapping_file_entry.get("fallback_value", "")),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def get_first_match_or_empty_pattern(regex: str) -> re.Pattern:
+    return re.compile(f"{regex}|$")
@@ -15,6 +15,9 @@ from httpx import HTTPError
 from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
 from folio_migration_tools.helper import Helper
 from folio_migration_tools.library_configuration import LibraryConfiguration
+from folio_migration_tools.mapping_file_transformation.folio_record_lookup import (
+    FolioRecordLookup,
+)
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
@@ -22,6 +25,7 @@ from folio_migration_tools.mapping_file_transformation.notes_mapper import Notes
 from folio_migration_tools.mapping_file_transformation.ref_data_mapping import (
     RefDataMapping,
 )
+from folio_migration_tools.reference_data_snapshot import get_snapshotted
 
 
 class CompositeOrderMapper(MappingFileMapperBase):
@@ -41,8 +45,12 @@ class CompositeOrderMapper(MappingFileMapperBase):
         funds_expense_class_map=None,
     ):
         # Get organization schema
-        self.composite_order_schema = CompositeOrderMapper.get_latest_acq_schemas_from_github(
-            "folio-org", "mod-orders", "mod-orders", "composite_purchase_order"
+        self.composite_order_schema = get_snapshotted(
+            folio_client,
+            "github:folio-org/mod-orders/composite_purchase_order",
+            lambda: CompositeOrderMapper.get_latest_acq_schemas_from_github(
+                "folio-org", "mod-orders", "mod-orders", "composite_purchase_order"
+            ),
         )
 
         super().__init__(
@@ -57,6 +65,13 @@ class CompositeOrderMapper(MappingFileMapperBase):
         self.instance_id_map = instance_id_map
         self.organizations_id_map = organizations_id_map
         self.folio_organization_cache = {}
+        self.folio_organization_lookup = FolioRecordLookup(
+            self.folio_client,
+            "/organizations-storage/organizations",
+            "organizations",
+            "code",
+            self.folio_organization_cache,
+        )
 
         self.acquisitions_methods_mapping = RefDataMapping(
             self.folio_client,
@@ -389,11 +404,17 @@ class CompositeOrderMapper(MappingFileMapperBase):
             return cache[match_value]
         else:
             query = f'?query=({match_property}=="{match_value}")'
-            if matching_record := next(
-                self.folio_client.folio_get_all(path, result_type, query), None
-            ):
-                cache[match_value] = matching_record
-                return matching_record
+            matching_record = next(self.folio_client.folio_get_all(path, result_type, query), None)
+            # Misses are cached as well, so that they are not looked up again
+            cache[match_value] = matching_record
+            return matching_record
+
+    def prefetch_folio_organizations(self, source_file_paths):
+        """Looks up the organizations in the source files, and not in the ID map, in bulk"""
+        org_codes = self.collect_mapped_values(source_file_paths, ["vendor"])["vendor"]
+        self.folio_organization_lookup.prefetch(
+            org_code for org_code in org_codes if org_code not in self.organizations_id_map
+        )
 
     def get_folio_organization_uuid(self, index_or_id, org_code):
         if self.organizations_id_map:
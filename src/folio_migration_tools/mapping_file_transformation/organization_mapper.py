@@ -16,6 +16,7 @@ from folio_migration_tools.mapping_file_transformation.notes_mapper import Notes
 from folio_migration_tools.mapping_file_transformation.ref_data_mapping import (
     RefDataMapping,
 )
+from folio_migration_tools.reference_data_snapshot import get_snapshotted
 
 
 class OrganizationMapper(MappingFileMapperBase):
@@ -32,8 +33,12 @@ class OrganizationMapper(MappingFileMapperBase):
         # Build composite organization schema
         if os.environ.get("GITHUB_TOKEN"):
             logging.info("Using GITHUB_TOKEN environment variable for GitHub API Access")
-        organization_schema = OrganizationMapper.get_latest_acq_schemas_from_github(
-            "folio-org", "mod-organizations-storage", "mod-orgs", "organization"
+        organization_schema = get_snapshotted(
+            folio_client,
+            "github:folio-org/mod-organizations-storage/organization",
+            lambda: OrganizationMapper.get_latest_acq_schemas_from_github(
+                "folio-org", "mod-organizations-storage", "mod-orgs", "organization"
+            ),
         )
 
         super().__init__(
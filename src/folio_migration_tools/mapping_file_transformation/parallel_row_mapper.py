@@ -0,0 +1,126 @@
+import multiprocessing
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List
+
+from folio_migration_tools.helper import Helper
+from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
+    MappingFileMapperBase,
+)
+
+# The row mapper in use. The worker processes are forked, and inherit it together with the
+# transformer and the fully initialized mapper, so only the rows and the results have to be
+# sent between the processes.
+_row_mapper = None
+
+
+def map_chunk(indexed_rows: List[tuple]):
+    return _row_mapper.map_chunk(indexed_rows)
+
+
+class MappedChunk:
+    """Everything a worker process produced while mapping a chunk of rows"""
+
+    def __init__(self):
+        self.results: List[tuple] = []
+        self.migration_report: dict = {}
+        self.mapped_folio_fields: dict = {}
+        self.mapped_legacy_fields: dict = {}
+        self.extradata: List[str] = []
+        self.num_criticalerrors = 0
+        self.num_exceptions = 0
+
+
+class ParallelRowMapper:
+    """Maps rows of legacy data using a pool of worker processes.
+
+    The rows are sent to the workers in chunks, and the results come back in input order,
+    together with the migration report, the mapping statistics and the extradata from the
+    workers. Checks depending on the rows before the current one, like duplicate detection
+    and holdings merging, are left to the main process, which gets the results in order. So
+    are the failed records and exception thresholds, checked against the errors of all the
+    workers.
+
+    The workers are forked, so this only works on platforms supporting the fork start method.
+    """
+
+    chunk_size = 1000
+
+    def __init__(
+        self,
+        mapper: MappingFileMapperBase,
+        map_row: Callable[[int, dict], object],
+        number_of_processes: int,
+    ):
+        self.mapper = mapper
+        self.map_row = map_row
+        self.number_of_processes = number_of_processes
+
+    def map_rows(self, indexed_rows: Iterable[tuple]) -> Iterator[tuple]:
+        """Maps the rows in the worker processes
+
+        Args:
+            indexed_rows (Iterable[tuple]): index and legacy row
+
+        Yields:
+            tuple: index and the result of map_row for that row, in input order
+        """
+        global _row_mapper
+        _row_mapper = self
+        with ProcessPoolExecutor(
+            self.number_of_processes, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            pending: deque = deque()
+            for chunk in self.chunks(indexed_rows, self.chunk_size):
+                if len(pending) >= 2 * self.number_of_processes:
+                    yield from self.merge_chunk(pending.popleft().result())
+                pending.append(executor.submit(map_chunk, chunk))
+            while pending:
+                yield from self.merge_chunk(pending.popleft().result())
+
+    @staticmethod
+    def chunks(indexed_rows: Iterable[tuple], chunk_size: int):
+        chunk = []
+        for indexed_row in indexed_rows:
+            chunk.append(indexed_row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def map_chunk(self, indexed_rows: List[tuple]) -> MappedChunk:
+        chunk = MappedChunk()
+        self.mapper.migration_report.report = {}
+        self.mapper.mapped_folio_fields = {}
+        self.mapper.mapped_legacy_fields = {}
+        # Duplicate IDs are checked by the main process
+        self.mapper.unique_record_ids = set()
+        self.mapper.extradata_writer.cache_size = sys.maxsize
+        self.mapper.defer_threshold_checks = True
+        self.mapper.num_criticalerrors = 0
+        self.mapper.num_exceptions = 0
+        chunk.results = [(idx, self.map_row(idx, row)) for idx, row in indexed_rows]
+        self.mapper.report_ref_data_mapping_caches()
+        chunk.migration_report = self.mapper.migration_report.report
+        chunk.mapped_folio_fields = self.mapper.mapped_folio_fields
+        chunk.mapped_legacy_fields = self.mapper.mapped_legacy_fields
+        chunk.extradata = self.mapper.extradata_writer.cache
+        chunk.num_criticalerrors = self.mapper.num_criticalerrors
+        chunk.num_exceptions = self.mapper.num_exceptions
+        self.mapper.extradata_writer.cache = []
+        return chunk
+
+    def merge_chunk(self, chunk: MappedChunk) -> List[tuple]:
+        self.mapper.migration_report.merge(chunk.migration_report)
+        Helper.merge_mapping_stats(self.mapper.mapped_folio_fields, chunk.mapped_folio_fields)
+        Helper.merge_mapping_stats(self.mapper.mapped_legacy_fields, chunk.mapped_legacy_fields)
+        self.mapper.extradata_writer.write_cached(chunk.extradata)
+        self.mapper.num_criticalerrors += chunk.num_criticalerrors
+        self.mapper.num_exceptions += chunk.num_exceptions
+        if chunk.num_criticalerrors and chunk.results:
+            self.mapper.check_failed_records_threshold(chunk.results[-1][0])
+        if chunk.num_exceptions:
+            self.mapper.check_generic_exception_threshold()
+        return chunk.results
@@ -1,11 +1,16 @@
 import json
 import logging
 import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 from folioclient import FolioClient
 
 from folio_migration_tools.custom_exceptions import TransformationProcessError
 
+# The number of legacy value combinations to keep the hybrid mapping results for
+HYBRID_MAPPING_CACHE_SIZE = 10000
+
 
 class RefDataMapping(object):
     def __init__(
@@ -18,7 +23,6 @@ class RefDataMapping(object):
         blurb_id,
     ):
         self.name = array_name
-        self.cache: dict = {}
         self.blurb_id = blurb_id
         logging.info("%s reference data mapping. Initializing", self.name)
         logging.info("Fetching %s reference data from FOLIO", self.name)
@@ -30,16 +34,13 @@ class RefDataMapping(object):
         self.mapped_legacy_keys = []
         self.default_id = ""
         self.default_name = ""
-        self.cached_dict = {}
+        self.cached_dict = {
+            r[self.key_type].lower(): (r["id"], r[self.key_type]) for r in self.ref_data
+        }
         self.setup_mappings()
         logging.info("%s reference data mapping. Done init", self.name)
 
     def get_ref_data_tuple(self, key_value):
-        if ref_object := self.cached_dict.get(key_value.lower().strip(), ()):
-            return ref_object
-        self.cached_dict = {
-            r[self.key_type].lower(): (r["id"], r[self.key_type]) for r in self.ref_data
-        }
         return self.cached_dict.get(key_value.lower().strip(), ())
 
     def setup_mappings(self):
@@ -86,6 +87,7 @@ class RefDataMapping(object):
                 ) from ee
 
         self.post_validate_map()
+        self.setup_indexes()
         logging.info(
             f"Loaded {len(self.regular_mappings)} mappings for {len(self.ref_data)} {self.name} "
             "in FOLIO"
@@ -95,43 +97,30 @@ class RefDataMapping(object):
             f"{self.name} in FOLIO"
         )
 
-    def get_hybrid_mapping(self, legacy_object):
-        obj_key = "_".join(legacy_object[k].strip() for k in self.mapped_legacy_keys)
-        if obj_key in self.cache:
-            return self.cache[obj_key]
-        highest_match = None
-        highest_match_number = 0
-
-        prepped_props = {k: legacy_object[k].strip() for k in self.mapped_legacy_keys}
-        for mapping in self.hybrid_mappings:
-            mismatch = 0
-            match_numbers = []
-            for k in self.mapped_legacy_keys:
-                if mapping[k] == prepped_props[k]:
-                    match_numbers.append(10)
-                elif mapping[k] == "*":
-                    match_numbers.append(1)
-                else:
-                    mismatch += 1
-            summa = sum(match_numbers)
+    def setup_indexes(self):
+        """Indexes the regular and hybrid mappings by their legacy values,
+        and sets up the cache for the hybrid mapping results"""
+        self.regular_index = build_regular_index(self.regular_mappings, self.mapped_legacy_keys)
+        self.hybrid_index = build_hybrid_index(self.hybrid_mappings, self.mapped_legacy_keys)
+        self.cache: OrderedDict = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-            if mismatch < 1 and summa > highest_match_number and min(match_numbers) > 0:
-                highest_match_number = summa
-                highest_match = mapping
-        self.cache[obj_key] = highest_match
+    def get_hybrid_mapping(self, legacy_object):
+        legacy_values = get_legacy_values(legacy_object, self.mapped_legacy_keys)
+        if legacy_values in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(legacy_values)
+            return self.cache[legacy_values]
+        self.cache_misses += 1
+        highest_match = match_hybrid_mapping(self.hybrid_index, legacy_values)
+        self.cache[legacy_values] = highest_match
+        if len(self.cache) > HYBRID_MAPPING_CACHE_SIZE:
+            self.cache.popitem(last=False)
         return highest_match
 
     def get_ref_data_mapping(self, legacy_object):
-        obj_key = "_".join(legacy_object[k].strip() for k in self.mapped_legacy_keys)
-        if obj_key in self.cache:
-            return self.cache[obj_key]
-        prepped_props = {k: legacy_object[k].strip() for k in self.mapped_legacy_keys}
-        for mapping in self.regular_mappings:
-            match_number = sum(prepped_props[k] == mapping[k] for k in self.mapped_legacy_keys)
-            if match_number == len(self.mapped_legacy_keys):
-                self.cache[obj_key] = mapping
-                return mapping
-        return None
+        return self.regular_index.get(get_legacy_values(legacy_object, self.mapped_legacy_keys))
 
     def is_hybrid_default_mapping(self, mapping):
         legacy_values = [value for key, value in mapping.items() if key in self.mapped_legacy_keys]
@@ -219,3 +208,73 @@ def get_mapped_legacy_keys(mapping):
             "folio_feeFineType",
         ]
     ]
+
+
+def get_legacy_values(legacy_object, mapped_legacy_keys) -> tuple:
+    return tuple(legacy_object[k].strip() for k in mapped_legacy_keys)
+
+
+def build_regular_index(regular_mappings, mapped_legacy_keys) -> Dict[tuple, dict]:
+    """Indexes the regular mappings by the values of all legacy keys.
+    The first mapping in the file wins should there be duplicates.
+
+    Args:
+        regular_mappings (_type_): the mappings without wildcards
+        mapped_legacy_keys (_type_): the legacy keys of the mapping file
+
+    Returns:
+        Dict[tuple, dict]: The mappings by their legacy values
+    """
+    regular_index: Dict[tuple, dict] = {}
+    for mapping in regular_mappings:
+        regular_index.setdefault(tuple(mapping.get(k) for k in mapped_legacy_keys), mapping)
+    return regular_index
+
+
+def build_hybrid_index(
+    hybrid_mappings, mapped_legacy_keys
+) -> List[Tuple[Tuple[int, ...], Dict[tuple, Tuple[int, dict]]]]:
+    """Groups the hybrid mappings by which legacy keys are not wildcards,
+    and indexes each group by the values of those keys.
+
+    The groups are ordered with the most specific groups first.
+
+    Args:
+        hybrid_mappings (_type_): the mappings with wildcards
+        mapped_legacy_keys (_type_): the legacy keys of the mapping file
+
+    Returns:
+        List[Tuple[Tuple[int, ...], Dict[tuple, Tuple[int, dict]]]]: The positions of the
+        legacy keys of each group, and the position in the file and the mapping by the values
+    """
+    groups: Dict[Tuple[int, ...], Dict[tuple, Tuple[int, dict]]] = {}
+    for order, mapping in enumerate(hybrid_mappings):
+        positions = tuple(i for i, k in enumerate(mapped_legacy_keys) if mapping.get(k) != "*")
+        groups.setdefault(positions, {}).setdefault(
+            tuple(mapping.get(mapped_legacy_keys[i]) for i in positions), (order, mapping)
+        )
+    return sorted(groups.items(), key=lambda group: -len(group[0]))
+
+
+def match_hybrid_mapping(hybrid_index, legacy_values: tuple) -> Optional[dict]:
+    """Finds the hybrid mapping matching the most of the legacy values.
+    Should more than one mapping match the same number of values, the first one in the
+    mapping file is used.
+
+    Args:
+        hybrid_index (_type_): the index from build_hybrid_index
+        legacy_values (tuple): the stripped values of the mapped legacy keys
+
+    Returns:
+        Optional[dict]: the hybrid mapping, or None if none of them matched
+    """
+    best_match: Optional[Tuple[int, dict]] = None
+    best_match_specificity = 0
+    for positions, index in hybrid_index:
+        if best_match and len(positions) < best_match_specificity:
+            break
+        match = index.get(tuple(legacy_values[i] for i in positions))
+        if match and (not best_match or match[0] < best_match[0]):
+            best_match = match
+            best_match_specificity = len(positions)
+    return best_match[1] if best_match else None
@@ -4,7 +4,6 @@ import logging
 import sys
 
 import i18n
-from dateutil.parser import parse
 from folio_uuid.folio_namespaces import FOLIONamespaces
 from folioclient import FolioClient
 
@@ -12,6 +11,7 @@ from folio_migration_tools.custom_exceptions import (
     TransformationProcessError,
     TransformationRecordFailedError,
 )
+from folio_migration_tools.date_parser import parse_date
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
@@ -168,7 +168,7 @@ class UserMapper(MappingFileMapperBase):
         try:
             if not mapped_value.strip():
                 return ""
-            format_date = parse(mapped_value, fuzzy=True)
+            format_date = parse_date(mapped_value, fuzzy=True)
             return format_date.isoformat()
         except Exception as ee:
             v = mapped_value
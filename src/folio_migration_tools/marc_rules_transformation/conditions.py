@@ -1,5 +1,7 @@
 import logging
 import re
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
 
 import i18n
 import pymarc
@@ -19,6 +21,12 @@ from folio_migration_tools.marc_rules_transformation.rules_mapper_base import (
 
 # flake8: noqa: s
 
+# The conditions run on every subfield of every record, so the patterns are compiled once
+TRIM_PUNCTUATION_INITIAL = re.compile(r"^(.*?)\s.[.]$")
+TRIM_PUNCTUATION_INITIAL_COMMA = re.compile(r"^(.*?)\s.,[.]$")
+NON_ALPHANUMERIC = re.compile(r"[^A-Za-z0-9 ]+")
+TRAILING_TITLE_PUNCTUATION = re.compile(r"[\s:\/]{0,3}$")
+
 
 class Conditions:
     holdings_type_map = {
@@ -52,7 +60,12 @@ class Conditions:
         else:
             self.setup_reference_data_for_all()
             self.setup_reference_data_for_items_and_holdings(default_call_number_type_name)
-        self.condition_cache: dict = {}
+        self.parameter_patterns: Dict[str, re.Pattern] = {}
+        # Number of calls and total time per condition, when profiling
+        self.condition_statistics: Dict[str, List] = {}
+        self.condition_cache: Dict[str, Callable] = self.build_dispatch_table(
+            logging.getLogger().isEnabledFor(logging.DEBUG)
+        )
 
     def setup_reference_data_for_bibs(self):
         logging.info("Setting up reference data for bib transformation")
@@ -152,17 +165,144 @@ class Conditions:
         logging.info(f"{len(self.authority_note_types)} \tAuthority note types")
         logging.info(f"{len(self.folio.identifier_types)} \tidentifier types")
 
+    def build_dispatch_table(self, profile: bool) -> Dict[str, Callable]:
+        """Binds all condition_ methods once, by the condition type used in the mapping rules
+
+        Args:
+            profile (bool): Wrap the conditions to count the calls and time them
+
+        Returns:
+            Dict[str, Callable]: The bound conditions by condition type
+        """
+        dispatch_table = {}
+        for attribute_name in dir(type(self)):
+            if attribute_name.startswith("condition_") and callable(
+                getattr(type(self), attribute_name)
+            ):
+                condition_type = attribute_name[len("condition_") :]
+                condition = getattr(self, attribute_name)
+                dispatch_table[condition_type] = (
+                    self.profile_condition(condition_type, condition) if profile else condition
+                )
+        return dispatch_table
+
+    def profile_condition(self, condition_type: str, condition: Callable) -> Callable:
+        statistics = self.condition_statistics.setdefault(condition_type, [0, 0.0])
+
+        def profiled_condition(legacy_id, value, parameter, marc_field):
+            start = time.perf_counter()
+            try:
+                return condition(legacy_id, value, parameter, marc_field)
+            finally:
+                statistics[0] += 1
+                statistics[1] += time.perf_counter() - start
+
+        return profiled_condition
+
+    def get_bound_condition(self, name) -> Callable:
+        """Gets the condition from the dispatch table
+
+        Args:
+            name (_type_): The condition type, as named in the mapping rules
+
+        Raises:
+            AttributeError: If there is no such condition
+
+        Returns:
+            Callable: The bound condition
+        """
+        if name in self.condition_cache:
+            return self.condition_cache[name]
+        return getattr(self, "condition_" + str(name))
+
     def get_condition(
         self, name, legacy_id, value, parameter=None, marc_field: field.Field = None
     ):
-        try:
-            return self.condition_cache.get(name)(legacy_id, value, parameter, marc_field)
-        # Exception should only handle the missing condition from the cache.
-        # All other exceptions should propagate up
-        except Exception:
-            attr = getattr(self, "condition_" + str(name))
-            self.condition_cache[name] = attr
-            return attr(legacy_id, value, parameter, marc_field)
+        return self.get_bound_condition(name)(legacy_id, value, parameter, marc_field)
+
+    def get_parameter_pattern(self, pattern: str) -> re.Pattern:
+        if pattern not in self.parameter_patterns:
+            self.parameter_patterns[pattern] = re.compile(pattern)
+        return self.parameter_patterns[pattern]
+
+    @staticmethod
+    def condition_types_in_rules(mappings: dict) -> Iterator[Tuple[str, str]]:
+        """Lists the condition types used in the mapping rules
+
+        Args:
+            mappings (dict): The mapping rules, by tag
+
+        Yields:
+            Tuple[str, str]: tag and condition type
+        """
+
+        def condition_types(mapping: dict):
+            for rule in mapping.get("rules", []):
+                for condition in rule.get("conditions", []):
+                    for condition_type in condition.get("type", "").split(","):
+                        if condition_type.strip():
+                            yield condition_type.strip()
+            for entity_mapping in mapping.get("entity", []):
+                yield from condition_types(entity_mapping)
+            if "alternativeMapping" in mapping:
+                yield from condition_types(mapping["alternativeMapping"])
+
+        for tag, tag_mappings in mappings.items():
+            for mapping in tag_mappings if isinstance(tag_mappings, list) else []:
+                for condition_type in condition_types(mapping):
+                    yield tag, condition_type
+
+    def validate_condition_types(self, mappings: dict) -> List[str]:
+        """Checks that all conditions named in the mapping rules are implemented.
+        Fields with a missing condition will halt the transformation, so better tell up front.
+
+        Args:
+            mappings (dict): The mapping rules, by tag
+
+        Returns:
+            List[str]: The missing condition types
+        """
+        missing: Dict[str, List[str]] = {}
+        for tag, condition_type in self.condition_types_in_rules(mappings):
+            if condition_type not in self.condition_cache and not hasattr(
+                self, f"condition_{condition_type}"
+            ):
+                missing.setdefault(condition_type, [])
+                if tag not in missing[condition_type]:
+                    missing[condition_type].append(tag)
+        for condition_type, tags in missing.items():
+            logging.warning(
+                "Condition %s in the mapping rules for %s is not implemented. "
+                "Records with these fields will halt the transformation",
+                condition_type,
+                ", ".join(tags),
+            )
+        return list(missing)
+
+    def reset_statistics(self):
+        for statistics in self.condition_statistics.values():
+            statistics[0] = 0
+            statistics[1] = 0.0
+
+    def merge_statistics(self, condition_statistics: Dict[str, List]):
+        for condition_type, (calls, seconds) in condition_statistics.items():
+            statistics = self.condition_statistics.setdefault(condition_type, [0, 0.0])
+            statistics[0] += calls
+            statistics[1] += seconds
+
+    def log_statistics(self):
+        """Logs the number of calls and the time spent per condition, slowest first"""
+        for condition_type, (calls, seconds) in sorted(
+            self.condition_statistics.items(), key=lambda s: s[1][1], reverse=True
+        ):
+            if calls:
+                logging.debug(
+                    "Condition %s: %s calls, %.3f s (%.1f µs/call)",
+                    condition_type,
+                    calls,
+                    seconds,
+                    seconds / calls * 1_000_000,
+                )
 
     def condition_trim_punctuation(self, legacy_id, value, parameter, marc_field: field.Field):
         """
@@ -170,12 +310,10 @@ class Conditions:
         the period is preceded by a single alpha character (eg. "John D."). Also preserves any
         trailing "-" (eg. "1981-"). This condition was introduced in Poppy.
         """
-        pattern1 = re.compile(r"^(.*?)\s.[.]$")
-        pattern2 = re.compile(r"^(.*?)\s.,[.]$")
         value = value.strip()
-        if pattern1.match(value) or value.endswith("-"):
+        if TRIM_PUNCTUATION_INITIAL.match(value) or value.endswith("-"):
             return value
-        elif pattern2.match(value):
+        elif TRIM_PUNCTUATION_INITIAL_COMMA.match(value):
             return value.rstrip(",")
         elif value.endswith(".") or value.endswith(","):
             return value[:-1]
@@ -192,7 +330,7 @@ class Conditions:
     ):
         contributor_code_subfield = parameter.get("contributorCodeSubfield", "4")
         for subfield in marc_field.get_subfields(contributor_code_subfield):
-            normalized_subfield = re.sub(r"[^A-Za-z0-9 ]+", "", subfield.strip())
+            normalized_subfield = NON_ALPHANUMERIC.sub("", subfield.strip())
             t = self.get_ref_data_tuple_by_code(
                 self.folio.contributor_types, "contrib_types_c", normalized_subfield
             )
@@ -225,7 +363,7 @@ class Conditions:
         fallback_name_field = "j" if marc_field.tag in ["111", "711"] else "e"
         contributor_name_subfield = parameter.get("contributorNameSubfield", fallback_name_field)
         for subfield in marc_field.get_subfields(contributor_name_subfield):
-            normalized_subfield = re.sub(r"[^A-Za-z0-9 ]+", "", subfield.strip())
+            normalized_subfield = NON_ALPHANUMERIC.sub("", subfield.strip())
             t = self.get_ref_data_tuple_by_name(
                 self.folio.contributor_types, "contrib_types_n", normalized_subfield
             )
@@ -320,12 +458,11 @@ class Conditions:
     ):
         """Returns the index title according to the rules"""
         ind2 = marc_field.indicator2
-        reg_str = r"[\s:\/]{0,3}$"
         if ind2 not in map(str, range(1, 9)):
-            return re.sub(reg_str, "", value)
+            return TRAILING_TITLE_PUNCTUATION.sub("", value)
 
         num_take = int(ind2)
-        return re.sub(reg_str, "", value[num_take:])
+        return TRAILING_TITLE_PUNCTUATION.sub("", value[num_take:])
 
     def condition_capitalize(self, legacy_id, value, parameter, marc_field: field.Field):
         return value.capitalize()
@@ -356,7 +493,7 @@ class Conditions:
         self, legacy_id, value, parameter, marc_field: field.Field
     ):
         if "oclc_regex" in parameter:
-            if re.match(parameter["oclc_regex"], value):
+            if self.get_parameter_pattern(parameter["oclc_regex"]).match(value):
                 t = self.get_ref_data_tuple_by_name(
                     self.folio.identifier_types,
                     "identifier_types",
@@ -544,7 +681,7 @@ class Conditions:
         self, legacy_id, value, parameter, marc_field: field.Field
     ):
         for subfield in marc_field.get_subfields("4"):
-            normalized_subfield = re.sub(r"[^A-Za-z0-9 ]+", "", subfield.strip())
+            normalized_subfield = NON_ALPHANUMERIC.sub("", subfield.strip())
             t = self.get_ref_data_tuple_by_code(
                 self.folio.contributor_types, "contrib_types_c", normalized_subfield
             )
@@ -577,7 +714,7 @@ class Conditions:
                 return t[0]
         subfield_code = "j" if marc_field.tag in ["111", "711"] else "e"
         for subfield in marc_field.get_subfields(subfield_code):
-            normalized_subfield = re.sub(r"[^A-Za-z0-9 ]+", "", subfield.strip())
+            normalized_subfield = NON_ALPHANUMERIC.sub("", subfield.strip())
             t = self.get_ref_data_tuple_by_name(
                 self.folio.contributor_types, "contrib_types_n", normalized_subfield
             )
@@ -686,7 +823,7 @@ class Conditions:
         self, legacy_id, value, parameter, marc_field: field.Field
     ):
         for subfield in marc_field.get_subfields("4", "e"):
-            normalized_subfield = re.sub(r"[^A-Za-z0-9 ]+", "", subfield.strip())
+            normalized_subfield = NON_ALPHANUMERIC.sub("", subfield.strip())
             for cont_type in self.folio.contributor_types:
                 if normalized_subfield in [cont_type["code"], cont_type["name"]]:
                     return cont_type["name"]
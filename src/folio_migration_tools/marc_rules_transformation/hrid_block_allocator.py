@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+HRID_BLOCK_SIZE = 1000
+
+
+class HridBlockAllocator:
+    """Hands out HRID numbers in blocks, reserved in a journal file before they are used.
+
+    Every reservation is appended to the journal, and flushed to disk, before any number in
+    the block is handed out. When the transformation is done, the unused rest of the block
+    is released. Reservations are made under a lock on the journal, so transformations
+    running at the same time, sharing the journal, never get the same numbers. Should a
+    transformation crash, its reservations are never released, and the next transformation
+    continues after them instead of handing out the HRIDs the crashed one wrote to disk.
+
+    The journal also keeps the high-water mark of the numbers handed out: the end of the
+    open blocks, and the first unused number of the released ones. Blocks never start below
+    it, even when all blocks are released, since a transformation may have been set up with
+    HRID settings fetched before another one stored higher numbers.
+    """
+
+    def __init__(self, journal_path: Path, block_size: int = HRID_BLOCK_SIZE):
+        self.journal_path = Path(journal_path)
+        self.block_size = block_size
+
+    @contextmanager
+    def locked_journal(self):
+        with open(self.journal_path, "a+") as journal:
+            if fcntl:
+                fcntl.flock(journal.fileno(), fcntl.LOCK_EX)
+            try:
+                journal.seek(0)
+                yield journal
+                journal.flush()
+                os.fsync(journal.fileno())
+            finally:
+                if fcntl:
+                    fcntl.flock(journal.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def read_journal(journal) -> Dict[str, Tuple[int, dict]]:
+        """Replays the journal
+
+        Returns:
+            Dict[str, Tuple[int, dict]]: Per namespace, the first number after the ones
+            reserved or handed out, and the open reservations, by block end
+        """
+        namespaces: Dict[str, Tuple[int, dict]] = {}
+        for line in journal:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            released_high, open_blocks = namespaces.get(entry["namespace"], (0, {}))
+            if "reset" in entry:
+                released_high, open_blocks = 0, {}
+            elif "reserved" in entry:
+                start, end = entry["reserved"]
+                open_blocks[end] = start
+            elif "released" in entry:
+                first_unused, end = entry["released"]
+                open_blocks.pop(end, None)
+                released_high = max(released_high, first_unused)
+            namespaces[entry["namespace"]] = (released_high, open_blocks)
+        return {
+            namespace: (max([released_high, *open_blocks]), open_blocks)
+            for namespace, (released_high, open_blocks) in namespaces.items()
+        }
+
+    def reserve(self, namespace: str, start_number: int) -> Tuple[int, int]:
+        """Reserves the next block of numbers
+
+        Args:
+            namespace (str): instances or holdings
+            start_number (int): The lowest number to hand out, from the HRID settings
+
+        Returns:
+            Tuple[int, int]: The first number in the block, and the one after the last
+        """
+        with self.locked_journal() as journal:
+            next_free, _ = self.read_journal(journal).get(namespace, (0, {}))
+            start = max(start_number, next_free)
+            end = start + self.block_size
+            journal.write(json.dumps({"namespace": namespace, "reserved": [start, end]}) + "\n")
+        logging.info("Reserved %s HRIDs %s to %s in %s", namespace, start, end - 1, journal.name)
+        return start, end
+
+    def release(self, namespace: str, first_unused: int, end: int, journal=None):
+        """Releases what is left of a block. Later blocks still start after first_unused.
+
+        Args:
+            namespace (str): instances or holdings
+            first_unused (int): The first number in the block not handed out
+            end (int): The end of the block, as returned by reserve
+            journal (_type_, optional): The journal, if already locked by the caller.
+        """
+        if journal is None:
+            with self.locked_journal() as locked_journal:
+                self.release(namespace, first_unused, end, locked_journal)
+            return
+        journal.seek(0, os.SEEK_END)
+        journal.write(json.dumps({"namespace": namespace, "released": [first_unused, end]}) + "\n")
+
+    def reset(self, namespace: str):
+        """Forgets all reservations, when the HRID settings are reset
+
+        Args:
+            namespace (str): instances, holdings or items
+        """
+        with self.locked_journal() as journal:
+            journal.seek(0, os.SEEK_END)
+            journal.write(json.dumps({"namespace": namespace, "reset": True}) + "\n")
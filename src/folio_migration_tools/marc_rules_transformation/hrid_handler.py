@@ -1,8 +1,9 @@
 import json
 import logging
-from typing import Set
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
-import httpx
 import i18n
 from folio_uuid import FOLIONamespaces
 from folioclient import FolioClient
@@ -12,7 +13,12 @@ from pymarc import Subfield
 
 from folio_migration_tools.custom_exceptions import TransformationProcessError
 from folio_migration_tools.helper import Helper
+from folio_migration_tools.http_session import FolioHttpSession
 from folio_migration_tools.library_configuration import HridHandling
+from folio_migration_tools.marc_rules_transformation.hrid_block_allocator import (
+    HRID_BLOCK_SIZE,
+    HridBlockAllocator,
+)
 from folio_migration_tools.migration_report import MigrationReport
 
 
@@ -23,11 +29,13 @@ class HRIDHandler:
         handling: HridHandling,
         migration_report: MigrationReport,
         deactivate035_from001: bool,
+        http_session: FolioHttpSession = None,
     ):
         self.unique_001s: Set[str] = set()
         self.deactivate035_from001: bool = deactivate035_from001
         self.hrid_path = "/hrid-settings-storage/hrid-settings"
         self.folio_client: FolioClient = folio_client
+        self.http_session = http_session or FolioHttpSession(folio_client)
         self.handling: HridHandling = handling
         self.migration_report: MigrationReport = migration_report
         self.hrid_settings = self.folio_client.folio_get_single_object(self.hrid_path)
@@ -38,8 +46,25 @@ class HRIDHandler:
         self.items_hrid_prefix = self.hrid_settings["items"].get("prefix", "")
         self.items_hrid_counter = self.hrid_settings["items"]["startNumber"]
         self.common_retain_leading_zeroes: bool = self.hrid_settings["commonRetainLeadingZeroes"]
+        self.placeholder_prefix: str = ""
+        self.deferred_hrids: list = []
+        self.hrid_block_allocator: Optional[HridBlockAllocator] = None
+        self.hrid_blocks: Dict[FOLIONamespaces, List[Tuple[int, int]]] = {}
+        self.reset_namespaces: Set[FOLIONamespaces] = set()
         logging.info(f"HRID handling is set to: '{self.handling}'")
 
+    def use_hrid_journal(self, journal_path: Path, block_size: int = HRID_BLOCK_SIZE):
+        """Take the HRID numbers from blocks reserved in a journal file, so that
+        transformations running at the same time, or after a crash, do not hand out the
+        same HRIDs. See HridBlockAllocator.
+
+        Args:
+            journal_path (Path): The journal shared by the transformations
+            block_size (int, optional): The number of HRIDs to reserve at a time.
+        """
+        logging.info("Reserving HRIDs in blocks of %s in %s", block_size, journal_path)
+        self.hrid_block_allocator = HridBlockAllocator(journal_path, block_size)
+
     def handle_hrid(
         self,
         namespace: FOLIONamespaces,
@@ -83,15 +108,31 @@ class HRIDHandler:
     def enumerate_hrid(self, marc_record):
         return self.handling == HridHandling.default or "001" not in marc_record
 
+    def defer_hrids(self, placeholder_prefix: str):
+        """Hand out placeholders instead of HRIDs. Used by worker processes that cannot know
+        the next number in the sequence. The placeholders handed out are collected in
+        deferred_hrids, and are swapped for real HRIDs by the main process, in input order.
+
+        Args:
+            placeholder_prefix (str): A prefix unique for the run
+        """
+        self.placeholder_prefix = placeholder_prefix
+        self.deferred_hrids = []
+
     def get_next_hrid(self, namespace: FOLIONamespaces):
         hrid = ""
-        if namespace == FOLIONamespaces.instances:
+        if self.placeholder_prefix:
+            hrid = f"[{self.placeholder_prefix}:{len(self.deferred_hrids)}]"
+            self.deferred_hrids.append((namespace, hrid))
+        elif namespace == FOLIONamespaces.instances:
+            self.reserve_hrid_block(namespace)
             hrid = (
                 f"{self.instance_hrid_prefix}"
                 f"{self.generate_numeric_part(self.instance_hrid_counter)}"
             )
             self.instance_hrid_counter += 1
         elif namespace == FOLIONamespaces.holdings:
+            self.reserve_hrid_block(namespace)
             hrid = (
                 f"{self.holdings_hrid_prefix}"
                 f"{self.generate_numeric_part(self.holdings_hrid_counter)}"
@@ -101,6 +142,70 @@ class HRIDHandler:
             raise TransformationProcessError("", "Unimplemented namespace")
         return hrid
 
+    def reserve_hrid_block(self, namespace: FOLIONamespaces):
+        if not self.hrid_block_allocator:
+            return
+        counter_name = HRID_COUNTERS[namespace]
+        counter = int(getattr(self, counter_name))
+        blocks = self.hrid_blocks.setdefault(namespace, [])
+        if not blocks or counter >= blocks[-1][1]:
+            start, end = self.hrid_block_allocator.reserve(namespace.name, counter)
+            blocks.append((start, end))
+            setattr(self, counter_name, start)
+
+    def release_hrid_blocks(self, journal=None):
+        """Releases the unused part of the reserved HRID blocks
+
+        Args:
+            journal (_type_, optional): The HRID journal, if already locked by the caller.
+        """
+        for namespace, blocks in self.hrid_blocks.items():
+            counter = int(getattr(self, HRID_COUNTERS[namespace]))
+            for start, end in blocks:
+                first_unused = min(max(counter, start), end)
+                self.hrid_block_allocator.release(namespace.name, first_unused, end, journal)
+        self.hrid_blocks = {}
+
+    def locked_hrid_journal(self):
+        if self.hrid_block_allocator:
+            return self.hrid_block_allocator.locked_journal()
+        return nullcontext()
+
+    def merge_hrid_counters(self, current_settings: dict) -> bool:
+        """Moves the counters this handler advanced, or reset, into the current HRID settings.
+        Advanced counters are only moved forward, should another transformation have stored
+        higher numbers since the settings were fetched. The other counters are left as they
+        are in the current settings.
+
+        Args:
+            current_settings (dict): The HRID settings, as just fetched from FOLIO
+
+        Returns:
+            bool: True if any counter in the settings changed
+        """
+        changed = False
+        for namespace, counter_name in HRID_SETTINGS_COUNTERS.items():
+            counter = getattr(self, counter_name)
+            current_start = current_settings[namespace.name]["startNumber"]
+            if namespace in self.reset_namespaces:
+                new_start = counter
+            elif counter != self.hrid_settings[namespace.name]["startNumber"]:
+                new_start = max(current_start, counter)
+                if current_start > counter:
+                    logging.info(
+                        "%s HRID settings moved to %s by another transformation",
+                        namespace.name,
+                        current_start,
+                    )
+            else:
+                continue
+            setattr(self, counter_name, new_start)
+            if new_start != current_start:
+                current_settings[namespace.name]["startNumber"] = new_start
+                changed = True
+        self.reset_namespaces = set()
+        return changed
+
     def generate_numeric_part(self, counter):
         return str(counter).zfill(11) if self.common_retain_leading_zeroes else str(counter)
 
@@ -145,31 +250,29 @@ class HRIDHandler:
             else:
                 migration_report.add("HridHandling", i18n.t("Legacy bib records without 001"))
 
-    def hrids_not_updated(self):
-        return (
-            self.hrid_settings["instances"]["startNumber"] == self.instance_hrid_counter
-            and self.hrid_settings["holdings"]["startNumber"] == self.holdings_hrid_counter
-            and self.hrid_settings["items"]["startNumber"] == self.items_hrid_counter
-        )
-
     def store_hrid_settings(self):
+        """Stores the HRID counters this handler advanced, or reset, in FOLIO. The settings
+        are fetched again and stored under the lock on the HRID journal, so transformations
+        running at the same time never store each other's counters from stale settings.
+        """
         logging.info("Setting HRID counter to current")
         try:
-            if self.hrids_not_updated():
-                logging.info("NOT POSTing HRID settings, since did not change.")
-                return
-
-            self.hrid_settings["instances"]["startNumber"] = self.instance_hrid_counter
-            self.hrid_settings["holdings"]["startNumber"] = self.holdings_hrid_counter
-            self.hrid_settings["items"]["startNumber"] = self.items_hrid_counter
-            url = self.folio_client.okapi_url + self.hrid_path
-            resp = httpx.put(
-                url,
-                json=self.hrid_settings,
-                headers=self.folio_client.okapi_headers,
-            )
-            resp.raise_for_status()
-            logging.info("%s Successfully set HRID settings.", resp.status_code)
+            with self.locked_hrid_journal() as journal:
+                current_settings = self.folio_client.folio_get_single_object(self.hrid_path)
+                if self.merge_hrid_counters(current_settings):
+                    url = self.folio_client.okapi_url + self.hrid_path
+                    resp = self.http_session.put(
+                        url,
+                        json=current_settings,
+                        headers=self.folio_client.okapi_headers,
+                    )
+                    resp.raise_for_status()
+                    logging.info("%s Successfully set HRID settings.", resp.status_code)
+                else:
+                    logging.info("NOT POSTing HRID settings, since did not change.")
+                self.hrid_settings = current_settings
+                if self.hrid_block_allocator:
+                    self.release_hrid_blocks(journal)
             a = self.folio_client.folio_get_single_object(self.hrid_path)
             logging.info("Current hrid settings: %s", json.dumps(a, indent=4))
         except Exception:
@@ -181,6 +284,10 @@ class HRIDHandler:
     def reset_instance_hrid_counter(self):
         logging.info("Resetting Instances HRID settings to 1")
         self.instance_hrid_counter = 1
+        self.reset_namespaces.add(FOLIONamespaces.instances)
+        if self.hrid_block_allocator:
+            self.release_hrid_blocks()
+            self.hrid_block_allocator.reset("instances")
         self.migration_report.set(
             "GeneralStatistics",
             i18n.t("Instances HRID starting number"),
@@ -191,6 +298,10 @@ class HRIDHandler:
     def reset_holdings_hrid_counter(self):
         logging.info("Resetting Holdings HRID settings to 1")
         self.holdings_hrid_counter = 1
+        self.reset_namespaces.add(FOLIONamespaces.holdings)
+        if self.hrid_block_allocator:
+            self.release_hrid_blocks()
+            self.hrid_block_allocator.reset("holdings")
         self.migration_report.set(
             "GeneralStatistics", "Holdings HRID starting number", self.holdings_hrid_counter
         )
@@ -199,6 +310,10 @@ class HRIDHandler:
     def reset_item_hrid_counter(self):
         logging.info("Resetting Items HRID settings to 1")
         self.items_hrid_counter = 1
+        self.reset_namespaces.add(FOLIONamespaces.items)
+        if self.hrid_block_allocator:
+            self.release_hrid_blocks()
+            self.hrid_block_allocator.reset("items")
         self.migration_report.set(
             "GeneralStatistics", "Items HRID starting number", self.items_hrid_counter
         )
@@ -237,6 +352,16 @@ class HRIDHandler:
             self.migration_report.add("HridHandling", i18n.t("Took HRID from 001"))
 
 
+HRID_COUNTERS = {
+    FOLIONamespaces.instances: "instance_hrid_counter",
+    FOLIONamespaces.holdings: "holdings_hrid_counter",
+}
+HRID_SETTINGS_COUNTERS = {
+    **HRID_COUNTERS,
+    FOLIONamespaces.items: "items_hrid_counter",
+}
+
+
 def compare_fields(field1: Field, field2: Field) -> bool:
     bool_compare = (
         field1.tag == field2.tag
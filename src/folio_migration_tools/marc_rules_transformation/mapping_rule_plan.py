@@ -0,0 +1,236 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+
+
+class CompiledMappingRule:
+    """A mapping rule from the MARC mapping rules, parsed once.
+
+    Holds everything the rules mappers otherwise have to work out from the rule on every
+    MARC field: the condition chain bound to the Conditions methods, the subfields grouped
+    by their custom delimiters, the value to add, and the compiled entity rules.
+    """
+
+    def __init__(self, mapping: dict, plan: "MappingRulePlan"):
+        self.mapping = mapping
+        self.target: str = mapping.get("target", "")
+        self.target_key: str = self.target.split(".")[-1]
+        rules = mapping.get("rules", [])
+        first_rule = rules[0] if rules else {}
+        conditions = first_rule.get("conditions", [])
+        self.has_conditions = bool(conditions)
+        self.condition_types: List[str] = []
+        self.parameter: dict = {}
+        if self.has_conditions:
+            self.condition_types = [c.strip() for c in conditions[0]["type"].split(",")]
+            self.parameter = conditions[0].get("parameter", {})
+        self.condition_chain: List[Tuple[str, Optional[Callable]]] = [
+            (condition_type, plan.bind_condition(condition_type))
+            for condition_type in self.condition_types
+        ]
+        self.has_value_to_add = bool(first_rule.get("value", ""))
+        # Stupid construct to avoid bool("false") == True
+        self.value_to_add: list = {"true": [True], "false": [False]}.get(
+            first_rule.get("value", ""), [first_rule.get("value", "")]
+        )
+        self.subfields: List[str] = mapping.get("subfield", [])
+        self.apply_rules_on_concatenated_data = bool(
+            mapping.get("applyRulesOnConcatenatedData", "")
+        )
+        self.subfield_split = bool(mapping.get("subFieldSplit", ""))
+        self.ignore_subsequent_subfields = bool(mapping.get("ignoreSubsequentSubfields", False))
+        self.delimited_subfields = self.group_by_delimiter(
+            self.subfields, mapping.get("subFieldDelimiter")
+        )
+        self.is_entity = "entity" in mapping
+        self.entity: List[CompiledMappingRule] = []
+        self.entity_parent = ""
+        if self.is_entity:
+            self.entity = plan.rules(mapping["entity"]).rules
+            self.entity_parent = mapping["entity"][0]["target"].split(".")[0]
+        self.entity_per_repeated_subfield = bool(mapping.get("entityPerRepeatedSubfield", False))
+        self.alternative_mapping: Optional[CompiledMappingRule] = (
+            plan.rule(mapping["alternativeMapping"]) if "alternativeMapping" in mapping else None
+        )
+
+    @staticmethod
+    def group_by_delimiter(subfields: List[str], custom_delimiters) -> List[Tuple[str, List[str]]]:
+        """Groups the subfields by the custom delimiter to join their values with
+
+        Args:
+            subfields (List[str]): the subfields of the rule
+            custom_delimiters (_type_): the subFieldDelimiter setting of the rule
+
+        Returns:
+            List[Tuple[str, List[str]]]: delimiter and subfields, in the order of the setting
+        """
+        if not subfields or not custom_delimiters:
+            return []
+        delimiter_map = {sub_f: " " for sub_f in subfields}
+        for custom_delimiter in custom_delimiters:
+            delimiter_map.update(
+                {sub_f: custom_delimiter["value"] for sub_f in custom_delimiter["subfields"]}
+            )
+        return [
+            (
+                custom_delimiter["value"],
+                [
+                    sub_f
+                    for sub_f in subfields
+                    if custom_delimiter["subfields"]
+                    and delimiter_map[sub_f] == custom_delimiter["value"]
+                ],
+            )
+            for custom_delimiter in custom_delimiters
+        ]
+
+
+class CompiledFieldMappings:
+    """The compiled rules for one MARC tag"""
+
+    def __init__(self, mappings: list, plan: "MappingRulePlan"):
+        self.mappings = mappings
+        self.rules = [plan.rule(mapping) for mapping in mappings]
+        self.ignore_subsequent_fields = any(
+            m.get("ignoreSubsequentFields", False) for m in mappings
+        )
+
+
+class TargetStep:
+    """One level of a dotted target, with the schema property it resolves to"""
+
+    def __init__(self, name: str, schema_property: dict, schema_parent, parent):
+        self.name = name
+        self.schema_property = schema_property
+        self.schema_parent = schema_parent
+        self.parent = parent
+        self.is_array_of_strings = is_array_of(schema_property, "string")
+        self.is_array_of_objects = is_array_of(schema_property, "object")
+        self.is_string = schema_property.get("type", "string") == "string"
+        self.parent_is_array_of_objects = bool(schema_parent) and is_array_of(
+            schema_parent, "object"
+        )
+        self.property_count = len(schema_property.get("items", {}).get("properties", {}))
+
+
+class CompiledTarget:
+    """A dotted target like identifiers.value, resolved against the schema.
+
+    Should the target not be in the schema, the steps up to the failing level are kept
+    together with the error, so that the record is changed and the error raised just like
+    when the schema is walked for every value.
+    """
+
+    def __init__(self, target_string: str, schema_properties: dict):
+        self.steps: List[TargetStep] = []
+        self.error: Optional[Exception] = None
+        schema_parent = None
+        parent = None
+        sc_prop = schema_properties
+        try:
+            for target in target_string.split("."):
+                if target in sc_prop:
+                    sc_prop = sc_prop[target]
+                else:
+                    sc_prop = schema_parent["items"]["properties"][target]
+                self.steps.append(TargetStep(target, sc_prop, schema_parent, parent))
+                schema_parent = sc_prop
+                parent = target
+        except (KeyError, TypeError) as error:
+            self.error = error
+
+
+class MappingRulePlan:
+    """The MARC mapping rules compiled into an execution plan.
+
+    The rules are compiled the first time they are used, and kept for as long as the
+    plan is in use. Rules are looked up by identity, so the rules mappers can keep on
+    passing the mapping rules around as they come from FOLIO.
+    """
+
+    def __init__(self, schema: dict, conditions):
+        self.schema = schema
+        self.conditions = conditions
+        self.compiled_rules: Dict[int, CompiledMappingRule] = {}
+        self.compiled_field_mappings: Dict[int, CompiledFieldMappings] = {}
+        self.compiled_targets: Dict[str, CompiledTarget] = {}
+        self.required_properties: Dict[str, list] = {}
+
+    def is_compiled_for(self, schema: dict, conditions) -> bool:
+        return self.schema is schema and self.conditions is conditions
+
+    def rule(self, mapping: dict) -> CompiledMappingRule:
+        compiled_rule = self.compiled_rules.get(id(mapping))
+        if compiled_rule is None or compiled_rule.mapping is not mapping:
+            compiled_rule = CompiledMappingRule(mapping, self)
+            self.compiled_rules[id(mapping)] = compiled_rule
+        return compiled_rule
+
+    def rules(self, mappings: list) -> CompiledFieldMappings:
+        compiled_mappings = self.compiled_field_mappings.get(id(mappings))
+        if compiled_mappings is None or compiled_mappings.mappings is not mappings:
+            compiled_mappings = CompiledFieldMappings(mappings, self)
+            self.compiled_field_mappings[id(mappings)] = compiled_mappings
+        return compiled_mappings
+
+    def target(self, target_string: str) -> CompiledTarget:
+        compiled_target = self.compiled_targets.get(target_string)
+        if compiled_target is None:
+            compiled_target = CompiledTarget(target_string, self.schema["properties"])
+            self.compiled_targets[target_string] = compiled_target
+        return compiled_target
+
+    def required_entity_properties(self, entity_parent_key: str) -> list:
+        if entity_parent_key not in self.required_properties:
+            parent_schema_prop = self.schema.get("properties", {}).get(entity_parent_key, {})
+            if parent_schema_prop.get("type", "") == "array":
+                required = parent_schema_prop.get("items", {}).get("required", [])
+            elif parent_schema_prop.get("type", "") == "object":
+                required = parent_schema_prop.get("required", [])
+            else:
+                required = []
+            self.required_properties[entity_parent_key] = required
+        return self.required_properties[entity_parent_key]
+
+    def bind_condition(self, condition_type: str) -> Optional[Callable]:
+        try:
+            return self.conditions.get_bound_condition(condition_type)
+        except AttributeError:
+            return None
+
+    def apply_conditions(self, rule: CompiledMappingRule, legacy_id, value, marc_field):
+        """Runs the value through the condition chain of the rule
+
+        Args:
+            rule (CompiledMappingRule): _description_
+            legacy_id (_type_): _description_
+            value (_type_): _description_
+            marc_field (_type_): _description_
+
+        Raises:
+            TransformationProcessError: if a condition in the chain does not exist
+
+        Returns:
+            _type_: The value returned by the last condition in the chain
+        """
+        v = value
+        for condition_type, condition in rule.condition_chain:
+            try:
+                if condition is None:
+                    raise AttributeError(
+                        f"'{type(self.conditions).__name__}' object has no attribute "
+                        f"'condition_{condition_type}'"
+                    )
+                v = condition(legacy_id, v, rule.parameter, marc_field)
+            except AttributeError as attr_error:
+                raise TransformationProcessError(
+                    legacy_id, attr_error, condition_type
+                ) from attr_error
+        return v
+
+
+def is_array_of(schema_property: dict, items_type: str) -> bool:
+    return (
+        schema_property.get("type", "string") == "array"
+        and schema_property.get("items", {}).get("type", "") == items_type
+    )
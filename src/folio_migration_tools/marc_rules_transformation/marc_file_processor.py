@@ -10,6 +10,7 @@ from pymarc import Field
 from pymarc import Record
 from pymarc import Subfield
 
+from folio_migration_tools.background_writer import BackgroundWriter
 from folio_migration_tools.custom_exceptions import TransformationProcessError
 from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
 from folio_migration_tools.folder_structure import FolderStructure
@@ -19,30 +20,33 @@ from folio_migration_tools.library_configuration import HridHandling
 from folio_migration_tools.marc_rules_transformation.rules_mapper_base import (
     RulesMapperBase,
 )
-from folio_migration_tools.migration_report import MigrationReport
+from folio_migration_tools.migration_report import MigrationReport, ReportMetric
+
+INVENTORY_RECORDS_WRITTEN = ReportMetric("GeneralStatistics", "Inventory records written to disk")
+SRS_RECORDS_WRITTEN = ReportMetric("GeneralStatistics", "SRS records written to disk")
 
 
 class MarcFileProcessor:
     def __init__(
-        self, mapper: RulesMapperBase, folder_structure: FolderStructure, created_objects_file
+        self,
+        mapper: RulesMapperBase,
+        folder_structure: FolderStructure,
+        created_objects_file,
+        srs_records_file=None,
     ):
         self.object_type: FOLIONamespaces = folder_structure.object_type
         self.folder_structure: FolderStructure = folder_structure
         self.mapper: RulesMapperBase = mapper
         self.created_objects_file = created_objects_file
         if mapper.task_configuration.create_source_records:
-            self.srs_records_file = open(self.folder_structure.srs_records_path, "w+")
+            self.srs_records_file = srs_records_file or BackgroundWriter(
+                self.folder_structure.srs_records_path
+            )
         self.unique_001s: set = set()
         self.failed_records_count: int = 0
         self.records_count: int = 0
         self.start: float = time.time()
         self.legacy_ids: set = set()
-        if (
-            self.object_type == FOLIONamespaces.holdings
-            and self.mapper.task_configuration.create_source_records
-        ):
-            logging.info("Loading Parent HRID map for SRS creation")
-            self.parent_hrids = {entity[1]: entity[2] for entity in mapper.parent_id_map.values()}
 
     def process_record(self, idx: int, marc_record: Record, file_def: FileDefinition):
         """processes a marc holdings record and saves it
@@ -86,9 +90,7 @@ class MarcFileProcessor:
                             self.object_type,
                         )
                 Helper.write_to_file(self.created_objects_file, folio_rec)
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Inventory records written to disk")
-                )
+                self.mapper.migration_report.count(INVENTORY_RECORDS_WRITTEN)
                 self.exit_on_too_many_exceptions()
 
         except TransformationRecordFailedError as error:
@@ -145,7 +147,9 @@ class MarcFileProcessor:
                     i18n.t("008 length invalid. '%{rest}' was stripped out", rest=rest),
                 )
             self.add_mapped_location_code_to_record(marc_record, folio_rec)
-            new_004 = Field(tag="004", data=self.parent_hrids[folio_rec["instanceId"]])
+            # The instance was found through the legacy id in the 004
+            parent_entry = self.mapper.parent_id_map[marc_record["004"].data.strip()]
+            new_004 = Field(tag="004", data=parent_entry[2])
             marc_record.remove_fields("004")
             marc_record.add_ordered_field(new_004)
             for former_id in legacy_ids:
@@ -164,8 +168,9 @@ class MarcFileProcessor:
             folio_rec,
             legacy_ids,
             file_def.discovery_suppressed,
+            self.mapper.task_configuration.split_srs_records,
         )
-        self.mapper.migration_report.add_general_statistics(i18n.t("SRS records written to disk"))
+        self.mapper.migration_report.count(SRS_RECORDS_WRITTEN)
 
     def add_mapped_location_code_to_record(self, marc_record, folio_rec):
         location_code = next(
@@ -247,6 +252,8 @@ class MarcFileProcessor:
             )
         if self.mapper.task_configuration.create_source_records:
             self.srs_records_file.close()
+        if self.mapper.conditions:
+            self.mapper.conditions.log_statistics()
         self.mapper.wrap_up()
 
         logging.info("Transformation report written to %s", report_file.name)
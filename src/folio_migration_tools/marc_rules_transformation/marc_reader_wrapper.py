@@ -12,7 +12,10 @@ from folio_migration_tools.custom_exceptions import (
 )
 from folio_migration_tools.folder_structure import FolderStructure
 from folio_migration_tools.library_configuration import FileDefinition
-from folio_migration_tools.migration_report import MigrationReport
+from folio_migration_tools.migration_report import MigrationReport, ReportMetric
+
+RECORDS_BEFORE_PARSING = ReportMetric("GeneralStatistics", "Records in file before parsing")
+RECORDS_DECODED = ReportMetric("GeneralStatistics", "Records successfully decoded from MARC21")
 
 
 class MARCReaderWrapper:
@@ -48,11 +51,10 @@ class MARCReaderWrapper:
         source_file: FileDefinition,
         failed_records_file: IOBase,
         processor,
+        start_index: int = 0,
     ):
-        for idx, record in enumerate(reader):
-            processor.mapper.migration_report.add_general_statistics(
-                i18n.t("Records in file before parsing")
-            )
+        for idx, record in enumerate(reader, start_index):
+            processor.mapper.migration_report.count(RECORDS_BEFORE_PARSING)
             try:
                 # None = Something bad happened
                 if record is None:
@@ -66,9 +68,7 @@ class MARCReaderWrapper:
                 # The normal case
                 else:
                     MARCReaderWrapper.set_leader(record, processor.mapper.migration_report)
-                    processor.mapper.migration_report.add_general_statistics(
-                        i18n.t("Records successfully decoded from MARC21"),
-                    )
+                    processor.mapper.migration_report.count(RECORDS_DECODED)
                     processor.process_record(idx, record, source_file)
             except TransformationRecordFailedError as error:
                 error.log_it()
@@ -0,0 +1,344 @@
+import io
+import json
+import logging
+import multiprocessing
+import sys
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+import i18n
+from folio_uuid.folio_namespaces import FOLIONamespaces
+from pymarc import MARCReader
+from pymarc import Record
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
+from folio_migration_tools.folder_structure import FolderStructure
+from folio_migration_tools.helper import Helper
+from folio_migration_tools.library_configuration import FileDefinition
+from folio_migration_tools.marc_rules_transformation.marc_file_processor import (
+    INVENTORY_RECORDS_WRITTEN,
+    SRS_RECORDS_WRITTEN,
+    MarcFileProcessor,
+)
+from folio_migration_tools.marc_rules_transformation.marc_reader_wrapper import (
+    MARCReaderWrapper,
+)
+from folio_migration_tools.marc_rules_transformation.rules_mapper_base import (
+    RulesMapperBase,
+)
+
+# The shard transformer of the running ParallelMarcFileProcessor. The worker processes are
+# forked, and inherit it together with the fully initialized mapper, so nothing but the
+# raw MARC records and the results have to be sent between the processes.
+_shard_transformer = None
+
+
+def transform_chunk(file_def: FileDefinition, start_index: int, raw_records: List[bytes]):
+    return _shard_transformer.transform_chunk(file_def, start_index, raw_records)
+
+
+class TransformedRecord:
+    """The outcome of transforming one MARC record in a worker process"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.failed = False
+        self.legacy_ids: List[str] = []
+        self.id_holder: dict = {}
+        self.folio_records: List[str] = []
+        self.srs_record: str = ""
+        self.deferred_hrids: list = []
+
+
+class TransformedChunk:
+    """Everything a worker process produced while transforming a chunk of MARC records"""
+
+    def __init__(self):
+        self.records: List[TransformedRecord] = []
+        self.failed_marc_records: bytes = b""
+        self.migration_report: dict = {}
+        self.parsed_records: int = 0
+        self.mapped_folio_fields: dict = {}
+        self.mapped_legacy_fields: dict = {}
+        self.extradata: List[str] = []
+        self.condition_statistics: dict = {}
+
+
+class MarcShardTransformer:
+    """Transforms chunks of MARC records in the worker processes.
+
+    Nothing is written to disk by the workers. Legacy ID:s are not checked for duplicates
+    and HRIDs are not assigned, since that depends on the records in the other chunks.
+    That is left to the main process, which handles the results in input order.
+    """
+
+    def __init__(
+        self, mapper: RulesMapperBase, object_type: FOLIONamespaces, placeholder_prefix: str
+    ):
+        self.mapper = mapper
+        self.object_type = object_type
+        self.placeholder_prefix = placeholder_prefix
+        self.chunk = TransformedChunk()
+
+    def transform_chunk(
+        self, file_def: FileDefinition, start_index: int, raw_records: List[bytes]
+    ) -> TransformedChunk:
+        self.chunk = TransformedChunk()
+        self.mapper.migration_report.report = {}
+        self.mapper.mapped_folio_fields = {}
+        self.mapper.mapped_legacy_fields = {}
+        self.mapper.hrid_handler.defer_hrids(self.placeholder_prefix)
+        self.mapper.extradata_writer.cache_size = sys.maxsize
+        if self.mapper.conditions:
+            self.mapper.conditions.reset_statistics()
+        parsed_records = self.mapper.parsed_records
+        failed_records_file = io.BytesIO()
+        reader = MARCReader(io.BytesIO(b"".join(raw_records)), to_unicode=True, permissive=True)
+        reader.hide_utf8_warnings = True
+        reader.force_utf8 = False
+        MARCReaderWrapper.read_records(reader, file_def, failed_records_file, self, start_index)
+        self.chunk.failed_marc_records = failed_records_file.getvalue()
+        self.chunk.migration_report = self.mapper.migration_report.report
+        self.chunk.parsed_records = self.mapper.parsed_records - parsed_records
+        self.chunk.mapped_folio_fields = self.mapper.mapped_folio_fields
+        self.chunk.mapped_legacy_fields = self.mapper.mapped_legacy_fields
+        self.chunk.extradata = self.mapper.extradata_writer.cache
+        self.mapper.extradata_writer.cache = []
+        if self.mapper.conditions:
+            self.chunk.condition_statistics = self.mapper.conditions.condition_statistics
+        return self.chunk
+
+    def process_record(self, idx: int, marc_record: Record, file_def: FileDefinition):
+        """Transforms a MARC record, and keeps the serialized results for the main process
+
+        Args:
+            idx (int): Index in file being parsed
+            marc_record (Record): _description_
+            file_def (FileDefinition): _description_
+
+        Raises:
+            TransformationProcessError: _description_
+            TransformationRecordFailedError: _description_
+        """
+        transformed = TransformedRecord(idx)
+        self.chunk.records.append(transformed)
+        self.mapper.hrid_handler.deferred_hrids = []
+        try:
+            legacy_ids = self.mapper.get_legacy_ids(marc_record, idx)
+            if not legacy_ids:
+                raise TransformationRecordFailedError(
+                    f"Index in file: {idx}", "No legacy id found", idx
+                )
+            folio_recs = self.mapper.parse_record(marc_record, file_def, legacy_ids)
+            transformed.legacy_ids = legacy_ids
+            if folio_recs:
+                transformed.id_holder = {
+                    "id": folio_recs[0]["id"],
+                    "hrid": folio_recs[0].get("hrid", ""),
+                }
+                if (
+                    file_def.create_source_records
+                    and self.mapper.task_configuration.create_source_records
+                ):
+                    srs_records_file = io.StringIO()
+                    self.mapper.save_source_record(
+                        srs_records_file,
+                        self.object_type,
+                        self.mapper.folio_client,
+                        marc_record,
+                        folio_recs[0],
+                        legacy_ids,
+                        file_def.discovery_suppressed,
+                        self.mapper.task_configuration.split_srs_records,
+                    )
+                    transformed.srs_record = srs_records_file.getvalue()
+            transformed.folio_records = [json.dumps(folio_rec) for folio_rec in folio_recs]
+        except TransformationRecordFailedError as error:
+            transformed.failed = True
+            raise TransformationRecordFailedError(
+                f"{error.index_or_id} in {file_def.file_name}", error.message, error.data_value
+            ) from error
+        except TransformationProcessError as tpe:
+            raise TransformationProcessError(
+                f"{tpe.index_or_id} in {file_def.file_name}", tpe.message, tpe.data_value
+            ) from tpe
+        except Exception as inst:
+            transformed.failed = True
+            traceback.print_exc()
+            logging.error(type(inst))
+            logging.error(inst.args)
+            logging.error(inst)
+            logging.error(marc_record)
+            raise TransformationProcessError("", inst.args, "") from inst
+        finally:
+            transformed.deferred_hrids = self.mapper.hrid_handler.deferred_hrids
+
+
+class ParallelMarcFileProcessor(MarcFileProcessor):
+    """Transforms MARC files using a pool of worker processes.
+
+    The files are split into chunks of records by the record lengths in the leaders, and
+    the chunks are transformed by the workers. The results are merged back in input order,
+    so that the output files, the ID map, the HRIDs and the migration report come out the
+    same as when the records are transformed by MarcFileProcessor in a single process.
+
+    The workers are forked, so this only works on platforms supporting the fork start method.
+    """
+
+    chunk_size = 1000
+
+    def __init__(
+        self,
+        mapper: RulesMapperBase,
+        folder_structure: FolderStructure,
+        created_objects_file,
+        number_of_processes: int,
+        srs_records_file=None,
+    ):
+        super().__init__(mapper, folder_structure, created_objects_file, srs_records_file)
+        self.number_of_processes = number_of_processes
+        self.shard_transformer = MarcShardTransformer(
+            mapper, self.object_type, uuid.uuid4().hex
+        )
+
+    def process_file(self, file_def: FileDefinition, failed_records_path: Path):
+        global _shard_transformer
+        _shard_transformer = self.shard_transformer
+        try:
+            with open(failed_records_path, "ab") as failed_marc_records_file:
+                with open(
+                    self.folder_structure.legacy_records_folder / file_def.file_name,
+                    "rb",
+                ) as marc_file:
+                    logging.info(
+                        "Running %s using %s processes",
+                        file_def.file_name,
+                        self.number_of_processes,
+                    )
+                    self.transform_in_parallel(file_def, marc_file, failed_marc_records_file)
+        except TransformationProcessError as tpe:
+            logging.critical(tpe)
+            sys.exit(1)
+        except Exception:
+            logging.exception("Failure in Main: %s", file_def.file_name, stack_info=True)
+
+    def transform_in_parallel(self, file_def: FileDefinition, marc_file, failed_marc_records_file):
+        # Flush before forking, so the workers do not inherit buffered output
+        self.created_objects_file.flush()
+        if self.mapper.task_configuration.create_source_records:
+            self.srs_records_file.flush()
+        with ProcessPoolExecutor(
+            self.number_of_processes, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            pending: deque = deque()
+            for start_index, raw_records in self.read_chunks(marc_file, self.chunk_size):
+                if len(pending) >= 2 * self.number_of_processes:
+                    chunk = pending.popleft().result()
+                    self.merge_chunk(chunk, file_def, failed_marc_records_file)
+                pending.append(
+                    executor.submit(transform_chunk, file_def, start_index, raw_records)
+                )
+            while pending:
+                self.merge_chunk(pending.popleft().result(), file_def, failed_marc_records_file)
+
+    @staticmethod
+    def read_chunks(marc_file, chunk_size: int):
+        """Splits a MARC file into chunks of raw records, using the record length in the leader
+
+        Args:
+            marc_file (_type_): MARC file opened in binary mode
+            chunk_size (int): Number of records per chunk
+
+        Yields:
+            tuple: the index of the first record in the chunk and the raw records
+        """
+        start_index = 0
+        raw_records: List[bytes] = []
+        while first5 := marc_file.read(5):
+            try:
+                length = int(first5)
+            except ValueError:
+                # MARCReader stops reading at this point. Leave it to the worker to report it.
+                raw_records.append(first5 + marc_file.read())
+                break
+            raw_records.append(first5 + marc_file.read(length - 5))
+            if len(raw_records) == chunk_size:
+                yield start_index, raw_records
+                start_index += len(raw_records)
+                raw_records = []
+        if raw_records:
+            yield start_index, raw_records
+
+    def merge_chunk(
+        self, chunk: TransformedChunk, file_def: FileDefinition, failed_marc_records_file
+    ):
+        self.mapper.migration_report.merge(chunk.migration_report)
+        self.mapper.parsed_records += chunk.parsed_records
+        Helper.merge_mapping_stats(self.mapper.mapped_folio_fields, chunk.mapped_folio_fields)
+        Helper.merge_mapping_stats(self.mapper.mapped_legacy_fields, chunk.mapped_legacy_fields)
+        self.mapper.extradata_writer.write_cached(chunk.extradata)
+        if self.mapper.conditions:
+            self.mapper.conditions.merge_statistics(chunk.condition_statistics)
+        failed_marc_records_file.write(chunk.failed_marc_records)
+        for transformed in chunk.records:
+            try:
+                self.save_transformed_record(transformed, file_def)
+            except TransformationRecordFailedError as error:
+                error.log_it()
+                self.mapper.migration_report.add_general_statistics(
+                    i18n.t("Records that failed transformation. Check log for details"),
+                )
+
+    def save_transformed_record(self, transformed: TransformedRecord, file_def: FileDefinition):
+        """Assigns HRIDs to, and saves, a record transformed by a worker process
+
+        Args:
+            transformed (TransformedRecord): The record transformed by the worker
+            file_def (FileDefinition): _description_
+
+        Raises:
+            TransformationRecordFailedError: if none of the legacy ids are unique
+        """
+        self.records_count += 1
+        hrids = {
+            placeholder: self.mapper.hrid_handler.get_next_hrid(namespace)
+            for namespace, placeholder in transformed.deferred_hrids
+        }
+        if transformed.failed:
+            self.failed_records_count += 1
+            return
+        if not transformed.folio_records:
+            return
+        try:
+            filtered_legacy_ids = self.get_valid_folio_record_ids(
+                transformed.legacy_ids, self.legacy_ids, self.mapper.migration_report
+            )
+            id_holder = {
+                "id": transformed.id_holder["id"],
+                "hrid": hrids.get(transformed.id_holder["hrid"], transformed.id_holder["hrid"]),
+            }
+            self.add_legacy_ids_to_map(id_holder, filtered_legacy_ids)
+        except TransformationRecordFailedError as error:
+            self.failed_records_count += 1
+            raise TransformationRecordFailedError(
+                f"{error.index_or_id} in {file_def.file_name}", error.message, error.data_value
+            ) from error
+        if transformed.srs_record:
+            self.srs_records_file.write(replace_placeholders(transformed.srs_record, hrids))
+            self.mapper.migration_report.count(SRS_RECORDS_WRITTEN)
+        for folio_record in transformed.folio_records:
+            self.created_objects_file.write(f"{replace_placeholders(folio_record, hrids)}\n")
+            self.mapper.migration_report.count(INVENTORY_RECORDS_WRITTEN)
+            self.exit_on_too_many_exceptions()
+
+
+def replace_placeholders(serialized_record: str, hrids: dict) -> str:
+    for placeholder, hrid in hrids.items():
+        serialized_record = serialized_record.replace(placeholder, hrid)
+    return serialized_record
+
@@ -6,11 +6,10 @@ import urllib.parse
 import uuid
 from abc import abstractmethod
 from textwrap import wrap
-from typing import List, Tuple
+from typing import List
 
 import i18n
 import pymarc
-from dateutil.parser import parse
 from folio_uuid.folio_uuid import FOLIONamespaces, FolioUUID
 from folioclient import FolioClient
 from pymarc import Field, Record, Subfield
@@ -20,6 +19,7 @@ from folio_migration_tools.custom_exceptions import (
     TransformationProcessError,
     TransformationRecordFailedError,
 )
+from folio_migration_tools.date_parser import parse_date
 from folio_migration_tools.helper import Helper
 from folio_migration_tools.library_configuration import (
     FileDefinition,
@@ -27,6 +27,15 @@ from folio_migration_tools.library_configuration import (
 )
 from folio_migration_tools.mapper_base import MapperBase
 from folio_migration_tools.marc_rules_transformation.hrid_handler import HRIDHandler
+from folio_migration_tools.marc_rules_transformation.mapping_rule_plan import (
+    MappingRulePlan,
+)
+
+
+# Stand-ins for the MARC record in the SRS record envelope. The MARC record is serialized once,
+# and then spliced in as both the raw (string) and the parsed (object) content.
+SRS_RAW_CONTENT = "@@rawRecord.content@@"
+SRS_PARSED_CONTENT = "@@parsedRecord.content@@"
 
 
 class RulesMapperBase(MapperBase):
@@ -51,6 +60,7 @@ class RulesMapperBase(MapperBase):
         self.item_json_schema = ""
         self.mappings: dict = {}
         self.schema_properties = None
+        self._rule_plan: MappingRulePlan = MappingRulePlan(self.schema, self.conditions)
         if hasattr(self.task_configuration, "hrid_handling"):
             self.hrid_handler = HRIDHandler(
                 folio_client,
@@ -60,6 +70,13 @@ class RulesMapperBase(MapperBase):
             )
         logging.info("Current user id is %s", self.folio_client.current_user)
 
+    @property
+    def rule_plan(self) -> MappingRulePlan:
+        """The mapping rules, compiled against the current schema and conditions"""
+        if not self._rule_plan.is_compiled_for(self.schema, self.conditions):
+            self._rule_plan = MappingRulePlan(self.schema, self.conditions)
+        return self._rule_plan
+
     def print_progress(self):
         self.parsed_records += 1
         num_recs = 5000
@@ -94,9 +111,10 @@ class RulesMapperBase(MapperBase):
     def map_field_according_to_mapping(
         self, marc_field: pymarc.Field, mappings, folio_record, legacy_ids
     ):
-        for mapping in mappings:
+        for rule in self.rule_plan.rules(mappings).rules:
+            mapping = rule.mapping
             try:
-                if "entity" not in mapping:
+                if not rule.is_entity:
                     self.handle_normal_mapping(mapping, marc_field, folio_record, legacy_ids)
                 else:
                     self.handle_entity_mapping(
@@ -109,27 +127,21 @@ class RulesMapperBase(MapperBase):
                 tre.log_it()
 
     def handle_normal_mapping(self, mapping, marc_field: pymarc.Field, folio_record, legacy_ids):
-        target = mapping["target"]
-        if mapping.get("ignoreSubsequentSubfields", False):
+        rule = self.rule_plan.rule(mapping)
+        target = rule.target
+        if rule.ignore_subsequent_subfields:
             marc_field = self.remove_repeated_subfields(marc_field)
-        if has_conditions(mapping):
+        if rule.has_conditions:
             values = self.apply_rules(marc_field, mapping, legacy_ids)
             if marc_field.tag == "655":
                 values[0] = f"Genre: {values[0]}"
             self.add_value_to_target(folio_record, target, values)
-        elif has_value_to_add(mapping):
-            value = mapping["rules"][0]["value"]
-            # Stupid construct to avoid bool("false") == True
-            if value == "true":
-                self.add_value_to_target(folio_record, target, [True])
-            elif value == "false":
-                self.add_value_to_target(folio_record, target, [False])
-            else:
-                self.add_value_to_target(folio_record, target, [value])
+        elif rule.has_value_to_add:
+            self.add_value_to_target(folio_record, target, list(rule.value_to_add))
         else:
             # Adding stuff without rules/Conditions.
             # Might need more complex mapping for arrays etc
-            if any(mapping["subfield"]):
+            if any(rule.subfields):
                 values = self.handle_sub_field_delimiters(
                     ",".join(legacy_ids), mapping, marc_field
                 )
@@ -180,49 +192,26 @@ class RulesMapperBase(MapperBase):
         legacy_id: str,
         mapping,
         marc_field: pymarc.Field,
-        condition_types: List[str] = None,
-        parameter: dict = None,
     ):
+        rule = self.rule_plan.rule(mapping)
         values: List[str] = []
-        if mapping.get("subfield") and (custom_delimiters := mapping.get("subFieldDelimiter")):
-            delimiter_map = {sub_f: " " for sub_f in mapping.get("subfield")}
-            for custom_delimiter in custom_delimiters:
-                delimiter_map.update(
-                    {sub_f: custom_delimiter["value"] for sub_f in custom_delimiter["subfields"]}
-                )
-            custom_delimited_strings: List[Tuple[str, List[str]]] = []
-            subfields = mapping.get("subfield")
-            for custom_delimiter in custom_delimiters:
-                subfields_for_delimiter = [
-                    sub_f
-                    for sub_f in subfields
-                    if custom_delimiter["subfields"]
-                    and delimiter_map[sub_f] == custom_delimiter["value"]
-                ]
-                subfield_collection: Tuple[str, List[str]] = (custom_delimiter["value"], [])
-                subfield_collection[1].extend(marc_field.get_subfields(*subfields_for_delimiter))
-                custom_delimited_strings.append(subfield_collection)
-            for custom_delimited_string in custom_delimited_strings:
-                if mapping.get("applyRulesOnConcatenatedData", ""):
-                    values.extend(custom_delimited_string[1])
+        if rule.delimited_subfields:
+            for delimiter, subfields_for_delimiter in rule.delimited_subfields:
+                delimited_values = marc_field.get_subfields(*subfields_for_delimiter)
+                if rule.apply_rules_on_concatenated_data:
+                    values.extend(delimited_values)
                 else:
                     values.extend(
                         dict.fromkeys(
                             [
-                                self.apply_rule(
-                                    legacy_id,
-                                    x,
-                                    condition_types or [],
-                                    marc_field,
-                                    parameter or {},
-                                )
-                                for x in custom_delimited_string[1]
+                                self.rule_plan.apply_conditions(rule, legacy_id, x, marc_field)
+                                for x in delimited_values
                             ]
                         )
                     )
-                values = [custom_delimited_string[0].join(values)]
-        elif mapping.get("subfield", []):
-            values.extend(marc_field.get_subfields(*mapping["subfield"]))
+                values = [delimiter.join(values)]
+        elif rule.subfields:
+            values.extend(marc_field.get_subfields(*rule.subfields))
         return values
 
     def get_value_from_condition(
@@ -231,32 +220,24 @@ class RulesMapperBase(MapperBase):
         mapping,
         marc_field,
     ):
-        stripped_conds = mapping["rules"][0]["conditions"][0]["type"].split(",")
-        condition_types = list(map(str.strip, stripped_conds))
-        parameter = mapping["rules"][0]["conditions"][0].get("parameter", {})
+        rule = self.rule_plan.rule(mapping)
         values: List[str] = []
-        if mapping.get("subfield"):
-            values.extend(
-                self.handle_sub_field_delimiters(
-                    legacy_id, mapping, marc_field, condition_types, parameter
-                )
-            )
+        if rule.subfields:
+            values.extend(self.handle_sub_field_delimiters(legacy_id, mapping, marc_field))
         else:
             values.append(marc_field.format_field() if marc_field else "")
 
-        if not mapping.get("applyRulesOnConcatenatedData", "") and mapping.get("subfield", []):
+        if not rule.apply_rules_on_concatenated_data and rule.subfields:
             return " ".join(
                 dict.fromkeys(
                     [
-                        self.apply_rule(legacy_id, x, condition_types, marc_field, parameter)
+                        self.rule_plan.apply_conditions(rule, legacy_id, x, marc_field)
                         for x in values
                     ]
                 )
             )
         else:
-            return self.apply_rule(
-                legacy_id, " ".join(values), condition_types, marc_field, parameter
-            )
+            return self.rule_plan.apply_conditions(rule, legacy_id, " ".join(values), marc_field)
 
     def process_marc_field(
         self,
@@ -277,7 +258,7 @@ class RulesMapperBase(MapperBase):
         if mappings:
             try:
                 self.map_field_according_to_mapping(marc_field, mappings, folio_record, legacy_ids)
-                if any(m.get("ignoreSubsequentFields", False) for m in mappings):
+                if self.rule_plan.rules(mappings).ignore_subsequent_fields:
                     ignored_subsequent_fields.add(marc_field.tag)
             except Exception as ee:
                 logging.error(
@@ -360,24 +341,17 @@ class RulesMapperBase(MapperBase):
 
     def apply_rules(self, marc_field: pymarc.Field, mapping, legacy_ids):
         try:
-            values = []
-            value = ""
-            if has_conditions(mapping):
+            rule = self.rule_plan.rule(mapping)
+            if rule.has_conditions:
                 value = self.get_value_from_condition(",".join(legacy_ids), mapping, marc_field)
-            elif has_value_to_add(mapping):
-                value = mapping["rules"][0]["value"]
-                if value == "false":
-                    return [False]
-                elif value == "true":
-                    return [True]
-                else:
-                    return [value]
-            elif not mapping.get("rules", []) or not mapping["rules"][0].get("conditions", []):
+            elif rule.has_value_to_add:
+                return list(rule.value_to_add)
+            else:
                 values = self.handle_sub_field_delimiters(
                     ",".join(legacy_ids), mapping, marc_field
                 )
                 value = " ".join(values)
-            values = wrap(value, 3) if mapping.get("subFieldSplit", "") else [value]
+            values = wrap(value, 3) if rule.subfield_split else [value]
             return values
         except TransformationProcessError as trpe:
             self.handle_transformation_process_error(self.parsed_records, trpe)
@@ -417,28 +391,22 @@ class RulesMapperBase(MapperBase):
         if len(targets) == 1:
             self.add_value_to_first_level_target(rec, target_string, value)
         else:
-            schema_parent = None
-            parent = None
             schema_properties = self.schema["properties"]
-            sc_prop = schema_properties
-            for target in targets:  # Iterate over names in hierarcy
-                if target in sc_prop:  # property is on this level
-                    sc_prop = sc_prop[target]  # set current property
-                else:  # next level. take the properties from the items
-                    sc_prop = schema_parent["items"]["properties"][target]
+            # The schema properties of each level are resolved once per target
+            compiled_target = self.rule_plan.target(target_string)
+            for step in compiled_target.steps:  # Iterate over names in hierarcy
+                target = step.name
+                schema_parent = step.schema_parent
+                parent = step.parent
                 if target not in rec and not schema_parent:  # have we added this already?
-                    if is_array_of_strings(sc_prop):
+                    if step.is_array_of_strings:
                         rec[target] = []
                         # break
                         # prop[target].append({})
-                    elif is_array_of_objects(sc_prop):
+                    elif step.is_array_of_objects:
                         rec[target] = [{}]
                         # break
-                    elif (
-                        schema_parent
-                        and is_array_of_objects(schema_parent)
-                        and sc_prop.get("type", "string") == "string"
-                    ):
+                    elif schema_parent and step.parent_is_array_of_objects and step.is_string:
                         s = "This should be unreachable code. Check schema for changes"
                         logging.error(s)
                         logging.error(parent)
@@ -454,9 +422,7 @@ class RulesMapperBase(MapperBase):
                                 "The mapping of this needs to be investigated "
                                 f"{target_string} {schema_properties[target_string]}",
                             )
-                elif is_array_of_objects(sc_prop) and len(rec[target][-1]) == len(
-                    sc_prop["items"]["properties"]
-                ):
+                elif step.is_array_of_objects and len(rec[target][-1]) == step.property_count:
                     rec[target].append({})
                 elif schema_parent and target in rec[parent][-1]:
                     rec[parent].append({})
@@ -464,11 +430,7 @@ class RulesMapperBase(MapperBase):
                         rec[parent][-1][target] = value[0]
                     else:
                         rec[parent][-1] = {target: value[0]}
-                elif (
-                    schema_parent
-                    and is_array_of_objects(schema_parent)
-                    and sc_prop.get("type", "string") == "string"
-                ):
+                elif schema_parent and step.parent_is_array_of_objects and step.is_string:
                     if len(rec[parent][-1]) > 0:
                         rec[parent][-1][target] = value[0]
                     else:
@@ -476,8 +438,8 @@ class RulesMapperBase(MapperBase):
                 # if target == targets[-1]:
                 # prop[target] = value[0]
                 # prop = rec[target]
-                schema_parent = sc_prop
-                parent = target
+            if compiled_target.error:
+                raise compiled_target.error
 
     def add_value_to_first_level_target(self, rec, target_string, value):
         sch = self.schema["properties"]
@@ -487,7 +449,7 @@ class RulesMapperBase(MapperBase):
             and target_string == "catalogedDate"
         ):
             try:
-                value = [str(parse(value[0], fuzzy=True).date())]
+                value = [str(parse_date(value[0], fuzzy=True).date())]
             except Exception as ee:
                 Helper.log_data_issue("", f"Could not parse catalogedDate: {ee}", value)
                 self.migration_report.add(
@@ -542,15 +504,10 @@ class RulesMapperBase(MapperBase):
         self, entity_mappings, marc_field: Field, entity_parent_key, index_or_legacy_id
     ):
         entity = {}
-        parent_schema_prop = self.schema.get("properties", {}).get(entity_parent_key, {})
-        if parent_schema_prop.get("type", "") == "array":
-            req_entity_props = parent_schema_prop.get("items", {}).get("required", [])
-        elif parent_schema_prop.get("type", "") == "object":
-            req_entity_props = parent_schema_prop.get("required", [])
-        else:
-            req_entity_props = []
-        for entity_mapping in entity_mappings:
-            k = entity_mapping["target"].split(".")[-1]
+        req_entity_props = self.rule_plan.required_entity_properties(entity_parent_key)
+        for entity_rule in self.rule_plan.rules(entity_mappings).rules:
+            entity_mapping = entity_rule.mapping
+            k = entity_rule.target_key
             if k == "authorityId" and (legacy_subfield_9 := marc_field.get("9")):
                 marc_field.add_subfield("0", legacy_subfield_9)
                 marc_field.delete_subfield("9")
@@ -563,9 +520,9 @@ class RulesMapperBase(MapperBase):
                     entity[k] = my_values[0]
                 else:
                     entity = my_values[0]
-            elif "alternativeMapping" in entity_mapping:
-                alt_mapping = entity_mapping["alternativeMapping"]
-                alt_k = alt_mapping["target"].split(".")[-1]
+            elif entity_rule.alternative_mapping:
+                alt_mapping = entity_rule.alternative_mapping.mapping
+                alt_k = entity_rule.alternative_mapping.target_key
                 if alt_values := [
                     v
                     for v in self.apply_rules(marc_field, alt_mapping, index_or_legacy_id)
@@ -596,9 +553,10 @@ class RulesMapperBase(MapperBase):
         folio_record,
         legacy_ids,
     ):
+        rule = self.rule_plan.rule(mapping)
         entity_mapping = mapping["entity"]
-        e_parent = entity_mapping[0]["target"].split(".")[0]
-        if mapping.get("entityPerRepeatedSubfield", False):
+        e_parent = rule.entity_parent
+        if rule.entity_per_repeated_subfield:
             for temp_field in self.grouped(marc_field):
                 entity = self.create_entity(entity_mapping, temp_field, e_parent, legacy_ids)
                 if entity and (
@@ -607,7 +565,7 @@ class RulesMapperBase(MapperBase):
                 ):
                     self.add_entity_to_record(entity, e_parent, folio_record, self.schema)
         else:
-            if mapping.get("ignoreSubsequentSubfields", False):
+            if rule.ignore_subsequent_subfields:
                 marc_field = self.remove_repeated_subfields(marc_field)
             entity = self.create_entity(entity_mapping, marc_field, e_parent, legacy_ids)
             if e_parent in ["precedingTitles", "succeedingTitles"]:
@@ -689,19 +647,6 @@ class RulesMapperBase(MapperBase):
                 identifier, f"Unable to create {e_parent} entity. Missing title.", marc_field
             )
 
-    def apply_rule(self, legacy_id, value, condition_types, marc_field, parameter):
-        v = value
-        for condition_type in iter(condition_types):
-            try:
-                v = self.conditions.get_condition(
-                    condition_type, legacy_id, v, parameter, marc_field
-                )
-            except AttributeError as attr_error:
-                raise TransformationProcessError(
-                    legacy_id, attr_error, condition_type
-                ) from attr_error
-        return v
-
     @staticmethod
     def add_entity_to_record(entity, entity_parent_key, rec, schema):
         sch = schema["properties"]
@@ -781,6 +726,7 @@ class RulesMapperBase(MapperBase):
         folio_record,
         legacy_ids: List[str],
         suppress: bool,
+        split: bool = False,
     ):
         """Saves the source Marc_record to the Source record Storage module
 
@@ -792,6 +738,7 @@ class RulesMapperBase(MapperBase):
             folio_record (_type_): _description_
             legacy_ids (List[str]): _description_
             suppress (bool): _description_
+            split (bool): Write the envelope and the MARC record as separate columns
         """
         srs_id = RulesMapperBase.create_srs_id(record_type, folio_client.okapi_url, legacy_ids[-1])
 
@@ -818,6 +765,7 @@ class RulesMapperBase(MapperBase):
             srs_id,
             suppress,
             record_type,
+            split,
         )
         srs_records_file.write(f"{srs_record_string}\n")
 
@@ -878,7 +826,23 @@ class RulesMapperBase(MapperBase):
         srs_id,
         discovery_suppress: bool,
         record_type: FOLIONamespaces,
+        split: bool = False,
     ):
+        """Builds the SRS record. The MARC record is serialized once, and spliced into the
+        envelope as both the raw and the parsed content.
+
+        Args:
+            marc_record (Record): _description_
+            folio_object (dict): _description_
+            srs_id (_type_): _description_
+            discovery_suppress (bool): _description_
+            record_type (FOLIONamespaces): _description_
+            split (bool, optional): Return the envelope and the MARC record as tab separated
+                columns, to be joined by splice_srs_content. Defaults to False.
+
+        Returns:
+            str: The SRS record as JSON
+        """
         record_types = {
             FOLIONamespaces.holdings: "MARC_HOLDING",
             FOLIONamespaces.instances: "MARC_BIB",
@@ -902,9 +866,10 @@ class RulesMapperBase(MapperBase):
             FOLIONamespaces.edifact: {},
         }
 
-        my_tuple_json = marc_record.as_json()
-        raw_record = {"id": srs_id, "content": my_tuple_json}
-        parsed_record = {"id": srs_id, "content": json.loads(my_tuple_json)}
+        marc_json = marc_record.as_json()
+        raw_record = {"id": srs_id, "content": SRS_RAW_CONTENT}
+        parsed_record = {"id": srs_id, "content": SRS_PARSED_CONTENT}
+        leader = str(marc_record.leader)
         record = {
             "id": srs_id,
             "deleted": False,
@@ -916,26 +881,40 @@ class RulesMapperBase(MapperBase):
             "additionalInfo": {"suppressDiscovery": discovery_suppress},
             "externalIdsHolder": id_holders.get(record_type),
             "state": "ACTUAL",
-            "leaderRecordStatus": parsed_record["content"]["leader"][5]
-            if parsed_record["content"]["leader"][5] in [*"acdnposx"]
-            else "d",
+            "leaderRecordStatus": leader[5] if leader[5] in [*"acdnposx"] else "d",
         }
-        return json.dumps(record)
-
+        if split:
+            return f"{json.dumps(record)}\t{marc_json}"
+        return RulesMapperBase.splice_srs_content(json.dumps(record), marc_json)
 
-def has_conditions(mapping):
-    return mapping.get("rules", []) and mapping["rules"][0].get("conditions", [])
+    @staticmethod
+    def splice_srs_content(srs_envelope: str, marc_json: str) -> str:
+        """Splices the MARC record into the SRS record envelope from get_srs_string
 
+        Args:
+            srs_envelope (str): The SRS record as JSON, with stand-ins for the content
+            marc_json (str): The MARC record as MARC-in-JSON
 
-def has_value_to_add(mapping):
-    return mapping.get("rules", []) and mapping["rules"][0].get("value", "")
+        Returns:
+            str: The SRS record as JSON
+        """
+        return srs_envelope.replace(
+            json.dumps(SRS_RAW_CONTENT), json.dumps(marc_json), 1
+        ).replace(json.dumps(SRS_PARSED_CONTENT), marc_json, 1)
 
+    @staticmethod
+    def join_split_srs_record(row: str) -> str:
+        """Joins a row written by get_srs_string in split form into a SRS record.
+        Other rows are returned as they are.
 
-def is_array_of_strings(schema_property):
-    sc_prop_type = schema_property.get("type", "string")
-    return sc_prop_type == "array" and schema_property["items"]["type"] == "string"
+        Args:
+            row (str): A row from a results file
 
+        Returns:
+            str: The row, or the SRS record as JSON
+        """
+        columns = row.rstrip("\r\n").split("\t")
+        if len(columns) > 1 and SRS_RAW_CONTENT in columns[-2]:
+            return RulesMapperBase.splice_srs_content(columns[-2], columns[-1])
+        return row
 
-def is_array_of_objects(schema_property):
-    sc_prop_type = schema_property.get("type", "string")
-    return sc_prop_type == "array" and schema_property["items"]["type"] == "object"
@@ -70,6 +70,7 @@ class RulesMapperHoldings(RulesMapperBase):
         rules_endpoint = "/mapping-rules/marc-holdings"
         self.mappings = self.folio_client.folio_get_single_object(rules_endpoint)
         self.fix_853_bug_in_rules()
+        self.conditions.validate_condition_types(self.mappings)
 
     def fix_853_bug_in_rules(self):
         f852_mappings = self.mappings["852"]
@@ -234,7 +235,7 @@ class RulesMapperHoldings(RulesMapperBase):
                 marc_field, mappings, folio_holding, index_or_legacy_ids
             )
             self.report_legacy_mapping(marc_field.tag, True, True)
-            if any(m.get("ignoreSubsequentFields", False) for m in mappings):
+            if self.rule_plan.rules(mappings).ignore_subsequent_fields:
                 ignored_subsequent_fields.add(marc_field.tag)
 
     def perform_additional_mapping(
@@ -341,6 +342,7 @@ class RulesMapperHoldings(RulesMapperBase):
                 self.hrid_handler.store_hrid_settings()
             else:
                 logging.info("NOT storing HRID settings since that is managed by FOLIO")
+                self.hrid_handler.release_hrid_blocks()
 
     def fetch_holdings_schema(self, folio_client: FolioClient):
         logging.info("Fetching HoldingsRecord schema...")
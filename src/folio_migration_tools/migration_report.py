@@ -1,16 +1,80 @@
 import logging
-import i18n
+import threading
 from datetime import datetime
 from datetime import timezone
 
+import i18n
+
+
+class ReportMetric:
+    """A measure in the migration report, resolved once, and counted with
+    MigrationReport.count instead of being translated and looked up for every record.
+
+    Metrics are interned, so the same blurb, message and parameters always give the same
+    object. The message is translated when the counts are folded into the report, which
+    happens when the report is read or written.
+    """
+
+    __slots__ = ("blurb_id", "message", "params")
+    _metrics: dict = {}
+
+    def __new__(cls, blurb_id: str, message: str, **params):
+        params_key = tuple(sorted((k, str(v)) for k, v in params.items()))
+        key = (blurb_id, message, params_key)
+        if (metric := cls._metrics.get(key)) is None:
+            metric = super().__new__(cls)
+            metric.blurb_id = blurb_id
+            metric.message = message
+            metric.params = dict(params_key)
+            cls._metrics[key] = metric
+        return metric
+
+    def __getnewargs_ex__(self):
+        return (self.blurb_id, self.message), self.params
+
+    def translate(self) -> str:
+        return i18n.t(self.message, **self.params)
+
+    def __repr__(self):
+        return f"ReportMetric({self.blurb_id!r}, {self.message!r})"
+
 
 class MigrationReport:
     """Class responsible for handling the migration report"""
 
     def __init__(self):
-        self.report = {}
+        self._report = {}
+        self.counters = {}
         self.stats = {}
 
+    @property
+    def report(self) -> dict:
+        self.fold_counters()
+        return self._report
+
+    @report.setter
+    def report(self, report: dict):
+        self.counters = {}
+        self._report = report
+
+    def count(self, metric: ReportMetric, number=1):
+        """Counts a measure. Much cheaper than add, since nothing is translated or formatted.
+
+        Args:
+            metric (ReportMetric): The measure, resolved once by the caller
+            number (int, optional): _description_. Defaults to 1.
+        """
+        try:
+            self.counters[metric] += number
+        except KeyError:
+            self.counters[metric] = number
+
+    def fold_counters(self):
+        """Adds the counts made with count to the report"""
+        counters, self.counters = self.counters, {}
+        for metric, number in counters.items():
+            self.add(metric.blurb_id, metric.translate(), number)
+
     def add(self, blurb_id, measure_to_add, number=1):
         """Add section header and values to migration report.
 
@@ -20,12 +84,12 @@ class MigrationReport:
             number (int, optional): _description_. Defaults to 1.
         """
         try:
-            self.report[blurb_id][measure_to_add] += number
+            self._report[blurb_id][measure_to_add] += number
         except KeyError:
-            if blurb_id not in self.report:
-                self.report[blurb_id] = {"blurb_id": blurb_id}
-            if measure_to_add not in self.report[blurb_id]:
-                self.report[blurb_id][measure_to_add] = number
+            if blurb_id not in self._report:
+                self._report[blurb_id] = {"blurb_id": blurb_id}
+            if measure_to_add not in self._report[blurb_id]:
+                self._report[blurb_id][measure_to_add] = number
 
     def set(self, blurb_id, measure_to_add: str, number: int):
         """Set a section value  to a specific number
@@ -35,9 +99,21 @@ class MigrationReport:
             measure_to_add (str): _description_
             number (int): _description_
         """
-        if blurb_id not in self.report:
-            self.report[blurb_id] = {}
-        self.report[blurb_id][measure_to_add] = number
+        if blurb_id not in self._report:
+            self._report[blurb_id] = {"blurb_id": blurb_id}
+        self._report[blurb_id][measure_to_add] = number
+
+    def merge(self, report: dict):
+        """Adds the values of another migration report to this one,
+        e.g. a report collected by a worker process
+
+        Args:
+            report (dict): The report of the other MigrationReport
+        """
+        for blurb_id, measures in report.items():
+            for measure, number in measures.items():
+                if measure != "blurb_id":
+                    self.add(blurb_id, measure, number)
 
     def add_general_statistics(self, measure_to_add: str):
         """Shortcut for adding to the first breakdown
@@ -117,3 +193,29 @@ def as_str(s):
         return str(s), ""
     except ValueError:
         return "", s
+
+
+class LockingMigrationReport(MigrationReport):
+    """A migration report that can be added to from several threads at once"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def add(self, blurb_id, measure_to_add, number=1):
+        with self.lock:
+            super().add(blurb_id, measure_to_add, number)
+
+    def set(self, blurb_id, measure_to_add: str, number: int):
+        with self.lock:
+            super().set(blurb_id, measure_to_add, number)
+
+    def count(self, metric: ReportMetric, number=1):
+        with self.lock:
+            super().count(metric, number)
+
+    def fold_counters(self):
+        with self.lock:
+            counters, self.counters = self.counters, {}
+        for metric, number in counters.items():
+            self.add(metric.blurb_id, metric.translate(), number)
@@ -71,6 +71,17 @@ class AuthorityTransformer(MigrationTaskBase):
                 ),
             ),
         ] = True
+        split_srs_records: Annotated[
+            bool,
+            Field(
+                title="Split SRS records",
+                description=(
+                    "Writes the SRS records with the MARC record in a separate tab-separated "
+                    "column instead of twice in the record, which makes the file half the "
+                    "size. BatchPoster joins the columns when posting. Defaults to False"
+                ),
+            ),
+        ] = False
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -1,9 +1,10 @@
+import asyncio
 import copy
+import gzip
 import json
 import logging
 import sys
 import time
-import traceback
 from datetime import datetime
 from typing import Annotated, List
 from uuid import uuid4
@@ -13,6 +14,9 @@ import i18n
 from folio_uuid.folio_namespaces import FOLIONamespaces
 from pydantic import Field
 
+from folio_migration_tools.adaptive_batch_controller import AdaptiveBatchController
+from folio_migration_tools.background_writer import open_results_file, skip_bytes
+from folio_migration_tools.checkpoint_journal import CheckpointJournal
 from folio_migration_tools.custom_exceptions import (
     TransformationProcessError,
     TransformationRecordFailedError,
@@ -21,14 +25,24 @@ from folio_migration_tools.library_configuration import (
     FileDefinition,
     LibraryConfiguration,
 )
+from folio_migration_tools.marc_rules_transformation.rules_mapper_base import (
+    RulesMapperBase,
+)
 from folio_migration_tools.migration_report import MigrationReport
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
 
+# Rows posted one by one are checkpointed every this many rows, not after every row
+CHECKPOINT_INTERVAL = 1000
+
+
 def write_failed_batch_to_file(batch, file):
     for record in batch:
-        file.write(f"{json.dumps(record)}\n")
+        if isinstance(record, bytes):
+            file.write(f"{record.decode('utf-8')}\n")
+        else:
+            file.write(f"{json.dumps(record)}\n")
 
 
 class BatchPoster(MigrationTaskBase):
@@ -92,6 +106,103 @@ class BatchPoster(MigrationTaskBase):
                 )
             ),
         ] = False
+        max_concurrent_batches: Annotated[
+            int,
+            Field(
+                description=(
+                    "The number of batches to have in flight against FOLIO at the same time. "
+                    "Values larger than 1 switches to posting the batches concurrently. "
+                    "Only applies to object types that are posted in batches. Defaults to 1"
+                ),
+                ge=1,
+            ),
+        ] = 1
+        adaptive_batch_size: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles adaptive batching. If enabled, the batch size and the number of "
+                    "concurrent batches are adjusted while posting based on the response times "
+                    "and HTTP 413/5xx errors from FOLIO. batchSize is used as the starting and "
+                    "maximum batch size, and maxConcurrentBatches as the maximum concurrency. "
+                    "Defaults to False"
+                )
+            ),
+        ] = False
+        min_batch_size: Annotated[
+            int,
+            Field(
+                description=(
+                    "The smallest batch size adaptive batching will shrink the batches to. "
+                    "Defaults to 1"
+                ),
+                ge=1,
+            ),
+        ] = 1
+        target_response_time: Annotated[
+            float,
+            Field(
+                description=(
+                    "The response time, in seconds, adaptive batching aims to keep the "
+                    "batches under. Defaults to 10 seconds"
+                ),
+                gt=0,
+            ),
+        ] = 10.0
+        split_failed_batches: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles splitting of batches that fail with HTTP 422. If enabled, a failed "
+                    "batch is split in halves that are reposted, recursively, until the failing "
+                    "records are isolated. Only the failing records end up in the failed "
+                    "records file, and are reposted one by one again if rerunFailedRecords is "
+                    "enabled. Defaults to False"
+                )
+            ),
+        ] = False
+        resume: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles resuming an interrupted run. If enabled, BatchPoster continues "
+                    "each file after the last batch acknowledged by FOLIO in the previous run, "
+                    "as recorded in the checkpoint journal in the results folder. Files that "
+                    "were fully posted are skipped. Defaults to False"
+                )
+            ),
+        ] = False
+        keep_checkpoints: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles keeping the checkpoint journal in the results folder, recording "
+                    "how far the posting has gotten, so that an interrupted run can be "
+                    "resumed. Always on when resuming. Defaults to False"
+                )
+            ),
+        ] = False
+        pass_through_raw_json: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles posting the records as they are in the file, without parsing and "
+                    "re-serializing them. The fields BatchPoster adds (_version and snapshotId) "
+                    "are spliced into the raw JSON. Only applies to object types that are posted "
+                    "in batches. Defaults to False"
+                )
+            ),
+        ] = False
+        gzip_request_bodies: Annotated[
+            bool,
+            Field(
+                description=(
+                    "Toggles gzip compression of the batches posted when pass_through_raw_json "
+                    "is enabled. Only use this if the FOLIO endpoints accept gzip-encoded "
+                    "request bodies. Defaults to False"
+                )
+            ),
+        ] = False
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -101,9 +212,10 @@ class BatchPoster(MigrationTaskBase):
         self,
         task_config: TaskConfiguration,
         library_config: LibraryConfiguration,
+        folio_client,
         use_logging: bool = True,
     ):
-        super().__init__(library_config, task_config, use_logging)
+        super().__init__(library_config, task_config, folio_client, use_logging)
         self.migration_report = MigrationReport()
         self.performing_rerun = False
         self.failed_ids: list = []
@@ -121,6 +233,23 @@ class BatchPoster(MigrationTaskBase):
         self.failed_objects: list = []
         self.batch_size = self.task_configuration.batch_size
         logging.info("Batch size is %s", self.batch_size)
+        self.max_concurrent_batches = self.task_configuration.max_concurrent_batches
+        self.batch_controller = None
+        if self.task_configuration.adaptive_batch_size:
+            self.batch_controller = AdaptiveBatchController(
+                self.migration_report,
+                int(self.batch_size),
+                self.task_configuration.min_batch_size,
+                int(self.batch_size),
+                self.max_concurrent_batches,
+                self.task_configuration.target_response_time,
+            )
+        self.in_flight_batches = 0
+        self.checkpoint_journal = CheckpointJournal(
+            self.folder_structure.batch_poster_checkpoint_path,
+            self.task_configuration.resume,
+            self.task_configuration.keep_checkpoints or self.task_configuration.resume,
+        )
         self.processed = 0
         self.failed_batches = 0
         self.users_created = 0
@@ -131,10 +260,18 @@ class BatchPoster(MigrationTaskBase):
         self.num_posted = 0
         self.okapi_headers = self.folio_client.okapi_headers
         self.http_client = None
+        self.async_http_client = None
 
     def do_work(self):
-        with self.folio_client.get_folio_http_client() as httpx_client:
-            self.http_client = httpx_client
+        if (
+            self.max_concurrent_batches > 1
+            and self.task_configuration.object_type != "Extradata"
+            and self.api_info.get("is_batch", False)
+        ):
+            self.do_work_concurrently()
+            return
+        with self.http_session as http_session:
+            self.http_client = http_session
             try:
                 batch = []
                 if self.task_configuration.object_type == "SRS":
@@ -142,10 +279,23 @@ class BatchPoster(MigrationTaskBase):
                 with open(self.folder_structure.failed_recs_path, "w") as failed_recs_file:
                     for file_def in self.task_configuration.files:
                         path = self.folder_structure.results_folder / file_def.file_name
-                        with open(path) as rows:
+                        offset, first_line, done = self.checkpoint_journal.get_position(
+                            file_def.file_name
+                        )
+                        if done:
+                            logging.info("Skipping %s. Posted in a previous run", path)
+                            continue
+                        with open_results_file(path, "rb") as rows:
                             logging.info("Running %s", path)
+                            skip_bytes(rows, offset)
                             last_row = ""
-                            for self.processed, row in enumerate(rows, start=1):
+                            for self.processed, raw_row in enumerate(rows, start=first_line + 1):
+                                offset += len(raw_row)
+                                try:
+                                    row = raw_row.decode("utf-8")
+                                except UnicodeDecodeError as unicode_error:
+                                    self.handle_unicode_error(unicode_error, raw_row)
+                                    continue
                                 last_row = row
                                 if row.strip():
                                     try:
@@ -183,22 +333,218 @@ class BatchPoster(MigrationTaskBase):
                                             failed_recs_file,
                                         )
                                         batch = []
+                                if not any(batch) and self.is_checkpoint_row():
+                                    self.checkpoint_journal.acknowledge(
+                                        self.checkpoint_journal.register_batch(
+                                            file_def.file_name, offset, self.processed
+                                        )
+                                    )
 
-                    if self.task_configuration.object_type != "Extradata" and any(batch):
-                        try:
-                            self.post_batch(batch, failed_recs_file, self.processed)
-                        except Exception as exception:
-                            self.handle_generic_exception(
-                                exception, last_row, batch, self.processed, failed_recs_file
-                            )
+                        if self.task_configuration.object_type != "Extradata" and any(batch):
+                            try:
+                                self.post_batch(batch, failed_recs_file, self.processed)
+                            except Exception as exception:
+                                self.handle_generic_exception(
+                                    exception, last_row, batch, self.processed, failed_recs_file
+                                )
+                            batch = []
+                        self.checkpoint_journal.register_file_done(
+                            file_def.file_name, offset, self.processed
+                        )
                     logging.info("Done posting %s records. ", (self.processed))
             except Exception as ee:
                 if self.task_configuration.object_type == "SRS":
                     self.commit_snapshot()
                 raise ee
 
-    def post_record_batch(self, batch, failed_recs_file, row):
-        json_rec = json.loads(row.split("\t")[-1])
+    def is_checkpoint_row(self) -> bool:
+        """Batches are checkpointed once posted, single records every CHECKPOINT_INTERVAL rows"""
+        if not self.checkpoint_journal.enabled:
+            return False
+        if self.task_configuration.object_type == "Extradata" or not self.api_info["is_batch"]:
+            return self.processed % CHECKPOINT_INTERVAL == 0
+        return True
+
+    def do_work_concurrently(self):
+        """Posts the batches using asyncio, keeping max_concurrent_batches requests in flight.
+
+        The rows are read, decoded into batches and posted by separate coroutines connected
+        through bounded queues, so that the file is never read further ahead than the
+        senders can keep up with.
+        """
+        logging.info("Posting up to %s batches concurrently", self.max_concurrent_batches)
+        with self.http_session as http_session:
+            self.http_client = http_session
+            try:
+                if self.task_configuration.object_type == "SRS":
+                    self.create_snapshot()
+                with open(self.folder_structure.failed_recs_path, "w") as failed_recs_file:
+                    try:
+                        asyncio.run(self.post_files_concurrently(failed_recs_file))
+                    except TransformationProcessError as tpe:
+                        logging.critical("Halting %s", tpe)
+                        print(f"\n\t{tpe.message}")
+                        sys.exit(1)
+                logging.info("Done posting %s records. ", (self.processed))
+            except Exception as ee:
+                if self.task_configuration.object_type == "SRS":
+                    self.commit_snapshot()
+                raise ee
+
+    async def post_files_concurrently(self, failed_recs_file):
+        row_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=int(self.batch_size) * self.max_concurrent_batches
+        )
+        batch_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrent_batches)
+        self.sender_slots = asyncio.Condition()
+        # The same timeouts as the HTTP session, as set up in the library configuration
+        async with httpx.AsyncClient(
+            timeout=self.http_session.timeout, verify=self.folio_client.ssl_verify
+        ) as async_http_client:
+            self.async_http_client = async_http_client
+            tasks = [
+                asyncio.create_task(self.read_rows(row_queue)),
+                asyncio.create_task(self.decode_rows(row_queue, batch_queue)),
+            ] + [
+                asyncio.create_task(self.send_batches(batch_queue, failed_recs_file))
+                for _ in range(self.max_concurrent_batches)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.async_http_client = None
+
+    async def read_rows(self, row_queue: asyncio.Queue):
+        """Puts the rows on the queue as (file name, line number, byte offset, row) tuples.
+        The end of each file is signalled with a row that is None.
+        """
+        for file_def in self.task_configuration.files:
+            path = self.folder_structure.results_folder / file_def.file_name
+            offset, first_line, done = self.checkpoint_journal.get_position(file_def.file_name)
+            if done:
+                logging.info("Skipping %s. Posted in a previous run", path)
+                continue
+            with open_results_file(path, "rb") as rows:
+                logging.info("Running %s", path)
+                skip_bytes(rows, offset)
+                for self.processed, raw_row in enumerate(rows, start=first_line + 1):
+                    offset += len(raw_row)
+                    try:
+                        row = raw_row.decode("utf-8")
+                    except UnicodeDecodeError as unicode_error:
+                        self.handle_unicode_error(unicode_error, raw_row)
+                        continue
+                    if row.strip():
+                        await row_queue.put((file_def.file_name, self.processed, offset, row))
+                await row_queue.put((file_def.file_name, self.processed, offset, None))
+        await row_queue.put(None)
+
+    async def decode_rows(self, row_queue: asyncio.Queue, batch_queue: asyncio.Queue):
+        batch: list = []
+        batch_end = (0, 0)
+        while (queued_row := await row_queue.get()) is not None:
+            file_name, num_records, offset, row = queued_row
+            if row is None:
+                if any(batch):
+                    await self.dispatch_batch(batch_queue, batch, file_name, *batch_end)
+                    batch = []
+                self.checkpoint_journal.register_file_done(file_name, offset, num_records)
+                continue
+            batch.append(self.prepare_record(row, num_records))
+            batch_end = (num_records, offset)
+            if len(batch) >= int(self.batch_size):
+                await self.dispatch_batch(batch_queue, batch, file_name, *batch_end)
+                batch = []
+        for _ in range(self.max_concurrent_batches):
+            await batch_queue.put(None)
+
+    async def dispatch_batch(
+        self, batch_queue: asyncio.Queue, batch, file_name, num_records, offset
+    ):
+        journal_entry = self.checkpoint_journal.register_batch(file_name, offset, num_records)
+        await batch_queue.put((batch, num_records, journal_entry))
+
+    async def send_batches(self, batch_queue: asyncio.Queue, failed_recs_file):
+        while (queued_batch := await batch_queue.get()) is not None:
+            batch, num_records, journal_entry = queued_batch
+            async with self.sender_slots:
+                await self.sender_slots.wait_for(
+                    lambda: self.in_flight_batches < self.get_concurrency()
+                )
+                self.in_flight_batches += 1
+            try:
+                await self.post_batch_async(batch, failed_recs_file, num_records)
+            except TransformationRecordFailedError as exception:
+                self.handle_generic_exception(exception, "", batch, num_records, failed_recs_file)
+            except TransformationProcessError as tpe:
+                self.handle_generic_exception(tpe, "", batch, num_records, failed_recs_file)
+                raise
+            finally:
+                async with self.sender_slots:
+                    self.in_flight_batches -= 1
+                    self.sender_slots.notify_all()
+            self.checkpoint_journal.acknowledge(journal_entry)
+
+    def get_concurrency(self) -> int:
+        if self.batch_controller:
+            return self.batch_controller.concurrency
+        return self.max_concurrent_batches
+
+    def prepare_record(self, row: str, num_records: int):
+        if self.task_configuration.pass_through_raw_json:
+            return self.prepare_raw_record(row, num_records)
+        json_rec = json.loads(self.get_record_json(row))
+        json_rec.update(self.get_injected_fields())
+        if num_records == 1:
+            logging.info(json.dumps(json_rec, indent=True))
+        return json_rec
+
+    def prepare_raw_record(self, row: str, num_records: int) -> bytes:
+        """Returns the record as UTF-8 encoded JSON without parsing it. The injected fields
+        are spliced in before the closing brace. Records that already contain any of the
+        fields, or that does not look like a JSON object, are parsed and re-serialized.
+
+        Args:
+            row (str): the row from the results file
+            num_records (int): the row number
+
+        Returns:
+            bytes: the record, ready to be joined into the request body
+        """
+        raw_record = self.get_record_json(row).strip()
+        injected_fields = self.get_injected_fields()
+        if not (raw_record.startswith("{") and raw_record.endswith("}")) or any(
+            f'"{key}"' in raw_record for key in injected_fields
+        ):
+            json_rec = json.loads(raw_record)
+            json_rec.update(injected_fields)
+            raw_record = json.dumps(json_rec)
+        elif injected_fields:
+            head = raw_record[:-1].rstrip()
+            separator = "" if head == "{" else ", "
+            raw_record = f"{head}{separator}{json.dumps(injected_fields)[1:]}"
+        if num_records == 1:
+            logging.info(raw_record)
+        return raw_record.encode("utf-8")
+
+    def get_record_json(self, row: str) -> str:
+        """Gets the record from a row in a results file. SRS records written in split form
+        are joined.
+
+        Args:
+            row (str): the row from the results file
+
+        Returns:
+            str: the record as JSON
+        """
+        if self.task_configuration.object_type == "SRS":
+            row = RulesMapperBase.join_split_srs_record(row)
+        return row.split("\t")[-1]
+
+    def get_injected_fields(self) -> dict:
+        injected_fields: dict = {}
         if (
             self.task_configuration.object_type in ["Instances", "Holdings", "Items"]
             and not self.task_configuration.use_safe_inventory_endpoints
@@ -206,13 +552,14 @@ class BatchPoster(MigrationTaskBase):
             self.migration_report.add_general_statistics(
                 i18n.t("Set _version to -1 to enable upsert")
             )
-            json_rec["_version"] = -1
+            injected_fields["_version"] = -1
         if self.task_configuration.object_type == "SRS":
-            json_rec["snapshotId"] = self.snapshot_id
-        if self.processed == 1:
-            logging.info(json.dumps(json_rec, indent=True))
-        batch.append(json_rec)
-        if len(batch) == int(self.batch_size):
+            injected_fields["snapshotId"] = self.snapshot_id
+        return injected_fields
+
+    def post_record_batch(self, batch, failed_recs_file, row):
+        batch.append(self.prepare_record(row, self.processed))
+        if len(batch) >= int(self.batch_size):
             self.post_batch(batch, failed_recs_file, self.processed)
             batch = []
         return batch
@@ -302,8 +649,8 @@ class BatchPoster(MigrationTaskBase):
                 url, data=body.encode("utf-8"), headers=self.folio_client.okapi_headers
             )
         else:
-            return httpx.post(
-                url, headers=self.okapi_headers, data=body.encode("utf-8"), timeout=None
+            return self.http_session.post(
+                url, headers=self.okapi_headers, data=body.encode("utf-8")
             )
 
     def handle_generic_exception(self, exception, last_row, batch, num_records, failed_recs_file):
@@ -327,18 +674,185 @@ class BatchPoster(MigrationTaskBase):
             "%s Posting failed. Encoding error reading file",
             unicode_error,
         )
-        logging.info(
-            "Failing row, either the one shown here or the next row in %s",
-            self.task_configuration.file.file_name,
-        )
+        logging.info("Failing row (row number %s):", self.processed)
         logging.info(last_row)
-        logging.info("=========Stack trace==============")
-        traceback.logging.info_exc()
-        logging.info("=======================", flush=True)
+        logging.info("=======================")
 
-    def post_batch(self, batch, failed_recs_file, num_records, recursion_depth=0):
+    def post_batch(
+        self, batch, failed_recs_file, num_records, recursion_depth=0, split_failures=None
+    ):
         response = self.do_post(batch)
+        if self.adapt_to_response(response, batch):
+            for smaller_batch in chunks(batch, int(self.batch_size)):
+                self.post_batch(
+                    smaller_batch, failed_recs_file, num_records, split_failures=split_failures
+                )
+        elif self.is_retryable_srs_error(response):
+            self.log_srs_repost(response, recursion_depth)
+            time.sleep(30)
+            if recursion_depth > 4:
+                raise self.get_record_failed_error(response, response.text)
+            self.post_batch(
+                batch, failed_recs_file, num_records, recursion_depth + 1, split_failures
+            )
+        else:
+            try:
+                self.handle_batch_response(response, batch, failed_recs_file, num_records)
+            except TransformationRecordFailedError:
+                if not self.should_split_failed_batch(response, batch):
+                    raise
+                failures = [] if split_failures is None else split_failures
+                for half in self.split_failed_batch(batch):
+                    try:
+                        self.post_batch(
+                            half, failed_recs_file, num_records, split_failures=failures
+                        )
+                    except TransformationRecordFailedError as half_error:
+                        failures.append((half_error, half))
+                if split_failures is None and failures:
+                    self.handle_split_batch_failure(failures, num_records, failed_recs_file)
+
+    async def post_batch_async(
+        self, batch, failed_recs_file, num_records, recursion_depth=0, split_failures=None
+    ):
+        response = await self.do_post_async(batch)
+        if self.adapt_to_response(response, batch):
+            for smaller_batch in chunks(batch, int(self.batch_size)):
+                await self.post_batch_async(
+                    smaller_batch, failed_recs_file, num_records, split_failures=split_failures
+                )
+        elif self.is_retryable_srs_error(response):
+            self.log_srs_repost(response, recursion_depth)
+            await asyncio.sleep(30)
+            if recursion_depth > 4:
+                raise self.get_record_failed_error(response, response.text)
+            await self.post_batch_async(
+                batch, failed_recs_file, num_records, recursion_depth + 1, split_failures
+            )
+        else:
+            try:
+                self.handle_batch_response(response, batch, failed_recs_file, num_records)
+            except TransformationRecordFailedError:
+                if not self.should_split_failed_batch(response, batch):
+                    raise
+                failures = [] if split_failures is None else split_failures
+                for half in self.split_failed_batch(batch):
+                    try:
+                        await self.post_batch_async(
+                            half, failed_recs_file, num_records, split_failures=failures
+                        )
+                    except TransformationRecordFailedError as half_error:
+                        failures.append((half_error, half))
+                if split_failures is None and failures:
+                    self.handle_split_batch_failure(failures, num_records, failed_recs_file)
+
+    def should_split_failed_batch(self, response: httpx.Response, batch) -> bool:
+        return (
+            self.task_configuration.split_failed_batches
+            and response.status_code == 422
+            and len(batch) > 1
+        )
+
+    def split_failed_batch(self, batch):
+        """Splits a batch that FOLIO rejected in two halves, so that the failing records
+        can be isolated in O(k log n) requests instead of reposting them one by one.
+
+        Args:
+            batch (_type_): the failed batch
+
+        Returns:
+            _type_: the two halves of the batch
+        """
+        logging.info("Splitting failed batch of %s records in halves and reposting", len(batch))
+        self.migration_report.add("Details", i18n.t("Failed batches split and reposted"))
+        middle = len(batch) // 2
+        return [batch[:middle], batch[middle:]]
+
+    def handle_split_batch_failure(self, failures, num_records, failed_recs_file):
+        """Writes the records that still failed once a batch was split to the failed records
+        file. They all come from the same batch, so it counts as one failed batch.
+
+        Args:
+            failures (_type_): The errors, and the parts of the batch that failed
+            num_records (_type_): The number of records processed
+            failed_recs_file (_type_): The failed records file
+        """
+        for error, records in failures:
+            if len(records) == 1:
+                self.migration_report.add(
+                    "Details", i18n.t("Failing records isolated by splitting batches")
+                )
+            logging.error("%s", error)
+            self.migration_report.add(
+                "Details", i18n.t("Generic exceptions (see log for details)")
+            )
+            self.num_failures += len(records)
+            write_failed_batch_to_file(records, failed_recs_file)
+        self.failed_batches += 1
+        logging.info("Number of failed batches: %s", self.failed_batches)
+        if self.failed_batches > 50000:
+            logging.error("Exceeded number of failed batches at row %s", num_records)
+            logging.critical("Halting")
+            sys.exit(1)
+
+    def adapt_to_response(self, response: httpx.Response, batch) -> bool:
+        """Lets the adaptive batch controller, if any, adjust the batch size
+
+        Args:
+            response (httpx.Response): The response from FOLIO
+            batch (_type_): The batch that was posted
+
+        Returns:
+            bool: True if the batch was rejected for being too large and should be split
+            into smaller batches and reposted
+        """
+        if not self.batch_controller:
+            return False
+        self.batch_controller.register_response(
+            response.status_code,
+            response.elapsed.total_seconds(),
+            len(response.request.content),
+            len(batch),
+        )
+        self.batch_size = self.batch_controller.batch_size
+        if (
+            response.status_code == 413
+            and "DB_ALLOW_SUPPRESS_OPTIMISTIC_LOCKING" not in response.text
+            and len(batch) > self.batch_size
+        ):
+            self.migration_report.add(
+                "AdaptiveBatching", i18n.t("Batch split and reposted after HTTP 413")
+            )
+            return True
+        return False
+
+    def is_retryable_srs_error(self, response: httpx.Response) -> bool:
+        return self.task_configuration.object_type == "SRS" and response.status_code >= 500
+
+    @staticmethod
+    def log_srs_repost(response: httpx.Response, recursion_depth: int):
+        logging.info(
+            "Post failed. Size: %s Waiting 30s until reposting. Number of tries: %s of 5",
+            get_req_size(response),
+            recursion_depth,
+        )
+        logging.info(response.text)
+
+    @staticmethod
+    def get_record_failed_error(response: httpx.Response, data_value):
+        return TransformationRecordFailedError(
+            "",
+            f"HTTP {response.status_code}\t"
+            f"Request size: {get_req_size(response)}"
+            f"{datetime.utcnow().isoformat()} UTC\n",
+            data_value,
+        )
+
+    def handle_batch_response(
+        self, response: httpx.Response, batch, failed_recs_file, num_records
+    ):
         if response.status_code == 201:
+            self.num_posted += len(batch)
             logging.info(
                 (
                     "Posting successful! Total rows: %s Total failed: %s "
@@ -390,35 +904,11 @@ class BatchPoster(MigrationTaskBase):
             )
         elif response.status_code == 422:
             resp = json.loads(response.text)
-            raise TransformationRecordFailedError(
-                "",
-                f"HTTP {response.status_code}\t"
-                f"Request size: {get_req_size(response)}"
-                f"{datetime.utcnow().isoformat()} UTC\n",
-                json.dumps(resp, indent=4),
-            )
+            raise self.get_record_failed_error(response, json.dumps(resp, indent=4))
         elif response.status_code == 400:
             # Likely a json parsing error
             logging.error(response.text)
             raise TransformationProcessError("", "HTTP 400. Something is wrong. Quitting")
-        elif self.task_configuration.object_type == "SRS" and response.status_code >= 500:
-            logging.info(
-                "Post failed. Size: %s Waiting 30s until reposting. Number of tries: %s of 5",
-                get_req_size(response),
-                recursion_depth,
-            )
-            logging.info(response.text)
-            time.sleep(30)
-            if recursion_depth > 4:
-                raise TransformationRecordFailedError(
-                    "",
-                    f"HTTP {response.status_code}\t"
-                    f"Request size: {get_req_size(response)}"
-                    f"{datetime.utcnow().isoformat()} UTC\n",
-                    response.text,
-                )
-            else:
-                self.post_batch(batch, failed_recs_file, num_records, recursion_depth + 1)
         elif (
             response.status_code == 413 and "DB_ALLOW_SUPPRESS_OPTIMISTIC_LOCKING" in response.text
         ):
@@ -434,29 +924,48 @@ class BatchPoster(MigrationTaskBase):
             except Exception:
                 logging.exception("something unexpected happened")
                 resp = response
-            raise TransformationRecordFailedError(
-                "",
-                f"HTTP {response.status_code}\t"
-                f"Request size: {get_req_size(response)}"
-                f"{datetime.utcnow().isoformat()} UTC\n",
-                resp,
-            )
+            raise self.get_record_failed_error(response, resp)
 
-    def do_post(self, batch):
-        path = self.api_info["api_endpoint"]
-        url = self.folio_client.okapi_url + path
+    def get_batch_payload(self, batch):
         if self.api_info["object_name"] == "users":
-            payload = {self.api_info["object_name"]: list(batch), "totalRecords": len(batch)}
+            return {self.api_info["object_name"]: list(batch), "totalRecords": len(batch)}
         elif self.api_info["total_records"]:
-            payload = {"records": list(batch), "totalRecords": len(batch)}
+            return {"records": list(batch), "totalRecords": len(batch)}
         else:
-            payload = {self.api_info["object_name"]: batch}
+            return {self.api_info["object_name"]: batch}
+
+    def get_raw_batch_payload(self, batch: List[bytes]) -> bytes:
+        """Builds the same envelope as get_batch_payload by concatenating the raw records"""
+        payload = b'{"%s": [%s]' % (self.api_info["object_name"].encode(), b",".join(batch))
+        if self.api_info["total_records"]:
+            payload += b', "totalRecords": %d' % len(batch)
+        return payload + b"}"
+
+    def get_request_arguments(self, batch) -> dict:
+        okapi_headers = self.folio_client.okapi_headers
+        if not (batch and isinstance(batch[0], bytes)):
+            return {"json": self.get_batch_payload(batch), "headers": okapi_headers}
+        headers = {**okapi_headers, "content-type": "application/json"}
+        content = self.get_raw_batch_payload(batch)
+        if self.task_configuration.gzip_request_bodies:
+            headers["content-encoding"] = "gzip"
+            content = gzip.compress(content, compresslevel=1)
+        return {"content": content, "headers": headers}
+
+    async def do_post_async(self, batch):
+        url = self.folio_client.okapi_url + self.api_info["api_endpoint"]
+        return await self.async_http_client.post(
+            url, params=self.query_params, **self.get_request_arguments(batch)
+        )
+
+    def do_post(self, batch):
+        path = self.api_info["api_endpoint"]
+        url = self.folio_client.okapi_url + path
+        request_arguments = self.get_request_arguments(batch)
         if self.http_client and not self.http_client.is_closed:
-            return self.http_client.post(
-                url, json=payload, headers=self.folio_client.okapi_headers, params=self.query_params
-            )
+            return self.http_client.post(url, params=self.query_params, **request_arguments)
         else:
-            return httpx.post(url, headers=self.okapi_headers, json=payload, params=self.query_params, timeout=None)
+            return self.http_session.post(url, params=self.query_params, **request_arguments)
 
     def wrap_up(self):
         logging.info("Done. Wrapping up")
@@ -496,14 +1005,21 @@ class BatchPoster(MigrationTaskBase):
                 self.num_failures,
             )
             try:
+                failed_recs_name = str(self.folder_structure.failed_recs_path.name)
                 self.task_configuration.batch_size = 1
-                self.task_configuration.files = [
-                    FileDefinition(file_name=str(self.folder_structure.failed_recs_path.name))
-                ]
+                self.task_configuration.files = [FileDefinition(file_name=failed_recs_name)]
                 temp_report = copy.deepcopy(self.migration_report)
                 temp_start = self.start_datetime
+                checkpoint_positions = self.checkpoint_journal.positions
                 self.task_configuration.rerun_failed_records = False
-                self.__init__(self.task_configuration, self.library_configuration)
+                self.http_session.close()
+                self.__init__(
+                    self.task_configuration, self.library_configuration, self.folio_client
+                )
+                # Add to the checkpoints of the first pass instead of overwriting them. The
+                # failed records file was just written, so it is posted from the start.
+                checkpoint_positions.pop(failed_recs_name, None)
+                self.checkpoint_journal.positions = checkpoint_positions
                 self.performing_rerun = True
                 self.migration_report = temp_report
                 self.start_datetime = temp_start
@@ -535,7 +1051,7 @@ class BatchPoster(MigrationTaskBase):
                     url, json=snapshot, headers=self.folio_client.okapi_headers
                 )
             else:
-                res = httpx.post(url, headers=self.okapi_headers, json=snapshot, timeout=None)
+                res = self.http_session.post(url, headers=self.okapi_headers, json=snapshot)
             res.raise_for_status()
             logging.info("Posted Snapshot to FOLIO: %s", json.dumps(snapshot, indent=4))
             get_url = f"{self.folio_client.okapi_url}/source-storage/snapshots/{self.snapshot_id}"
@@ -546,7 +1062,7 @@ class BatchPoster(MigrationTaskBase):
                 if self.http_client and not self.http_client.is_closed:
                     res = self.http_client.get(get_url, headers=self.folio_client.okapi_headers)
                 else:
-                    res = httpx.get(get_url, headers=self.okapi_headers, timeout=None)
+                    res = self.http_session.get(get_url, headers=self.okapi_headers)
                 if res.status_code == 200:
                     getted = True
                 else:
@@ -564,7 +1080,7 @@ class BatchPoster(MigrationTaskBase):
                     url, json=snapshot, headers=self.folio_client.okapi_headers
                 )
             else:
-                res = httpx.put(url, headers=self.okapi_headers, json=snapshot, timeout=None)
+                res = self.http_session.put(url, headers=self.okapi_headers, json=snapshot)
             res.raise_for_status()
             logging.info("Posted Committed snapshot to FOLIO: %s", json.dumps(snapshot, indent=4))
         except Exception:
@@ -700,5 +1216,4 @@ def get_req_size(response: httpx.Response):
     size = response.request.method
     size += str(response.request.url)
     size += "\r\n".join(f"{k}{v}" for k, v in response.request.headers.items())
-    size += response.request.content.decode("utf-8") or ""
-    return get_human_readable(len(size.encode("utf-8")))
+    return get_human_readable(len(size.encode("utf-8")) + len(response.request.content))
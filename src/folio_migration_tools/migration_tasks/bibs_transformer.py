@@ -19,6 +19,7 @@ from folio_migration_tools.marc_rules_transformation.rules_mapper_bibs import (
     BibsRulesMapper,
 )
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
+from folio_migration_tools.results_index import HRID_INDEX, ResultsIndexWriter
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
 
@@ -97,6 +98,17 @@ class BibsTransformer(MigrationTaskBase):
                 ),
             ),
         ] = True
+        split_srs_records: Annotated[
+            bool,
+            Field(
+                title="Split SRS records",
+                description=(
+                    "Writes the SRS records with the MARC record in a separate tab-separated "
+                    "column instead of twice in the record, which makes the file half the "
+                    "size. BatchPoster joins the columns when posting. Defaults to False"
+                ),
+            ),
+        ] = False
         parse_cataloged_date: Annotated[
             bool,
             Field(
@@ -145,6 +157,19 @@ class BibsTransformer(MigrationTaskBase):
                 ),
             ),
         ] = False
+        number_of_processes: Annotated[
+            int,
+            Field(
+                title="Number of processes",
+                description=(
+                    "The number of worker processes transforming the records in parallel. "
+                    "The results are merged in the order of the source files, so the output "
+                    "is the same as when running in a single process. Not available together "
+                    "with hridHandling set to preserve001"
+                ),
+                ge=1,
+            ),
+        ] = 1
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -164,6 +189,9 @@ class BibsTransformer(MigrationTaskBase):
         )
         self.mapper = BibsRulesMapper(self.folio_client, library_config, self.task_configuration)
         self.bib_ids: set = set()
+        if self.task_configuration.update_hrid_settings:
+            self.mapper.hrid_handler.http_session = self.http_session
+            self.mapper.hrid_handler.use_hrid_journal(self.folder_structure.hrid_journal_path)
         if (
             self.task_configuration.reset_hrid_settings
             and self.task_configuration.update_hrid_settings
@@ -172,12 +200,25 @@ class BibsTransformer(MigrationTaskBase):
         logging.info("Init done")
 
     def do_work(self):
-        self.do_work_marc_transformer()
+        self.do_work_marc_transformer(self.get_number_of_processes())
+
+    def get_number_of_processes(self) -> int:
+        if (
+            self.task_configuration.number_of_processes > 1
+            and self.task_configuration.hrid_handling == HridHandling.preserve001
+        ):
+            logging.warning(
+                "Preserving 001:s as HRIDs requires checking all 001:s for duplicates in order. "
+                "Transforming the records in a single process"
+            )
+            return 1
+        return super().get_number_of_processes()
 
     def wrap_up(self):
         logging.info("Done. Transformer wrapping up...")
         self.extradata_writer.flush()
         self.processor.wrap_up()
+        self.write_hrid_index()
         with open(self.folder_structure.migration_reports_file, "w+") as report_file:
             self.mapper.migration_report.write_migration_report(
                 i18n.t("Bibliographic records transformation report"),
@@ -196,3 +237,15 @@ class BibsTransformer(MigrationTaskBase):
             self.folder_structure.migration_reports_file.name,
         )
         self.clean_out_empty_logs()
+
+    def write_hrid_index(self):
+        """Writes the HRIDs of the created instances, and their ids, next to the instances.
+        The rows of the instance ID map hold the legacy id, the id and the HRID.
+        """
+        hrid_index = ResultsIndexWriter(self.folder_structure.created_objects_path, HRID_INDEX)
+        hrid_index.add_all(
+            (id_map_row[2], id_map_row[1])
+            for id_map_row in self.mapper.id_map.values()
+            if len(id_map_row) > 2
+        )
+        hrid_index.write()
@@ -23,9 +23,12 @@ from folio_migration_tools.mapping_file_transformation.courses_mapper import (
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
+from folio_migration_tools.migration_report import ReportMetric
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
+ITEMS_IN_TOTAL = ReportMetric("GeneralStatistics", "Number of Legacy items in total")
+
 
 class CoursesMigrator(MigrationTaskBase):
     class TaskConfiguration(AbstractTaskConfiguration):
@@ -88,6 +91,9 @@ class CoursesMigrator(MigrationTaskBase):
         )
         logging.info("Processing %s", full_path)
         start = time.time()
+        items_in_file = ReportMetric(
+            "GeneralStatistics", "Number of Legacy items in %{container}", container=full_path
+        )
         with open(full_path, encoding="utf-8-sig") as records_file:
             for idx, record in enumerate(self.mapper.get_objects(records_file, full_path)):
                 try:
@@ -118,17 +124,13 @@ class CoursesMigrator(MigrationTaskBase):
                     sys.exit(1)
                 except Exception as excepion:
                     self.mapper.handle_generic_exception(idx, excepion)
-                self.mapper.migration_report.add(
-                    "GeneralStatistics",
-                    i18n.t("Number of Legacy items in %{container}", container=full_path),
-                )
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Number of Legacy items in total")
-                )
+                self.mapper.migration_report.count(items_in_file)
+                self.mapper.migration_report.count(ITEMS_IN_TOTAL)
                 self.print_progress(idx, start)
 
     def wrap_up(self):
         self.extradata_writer.flush()
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w+") as report_file:
             self.mapper.migration_report.write_migration_report(
                 i18n.t("Courses migration report"), report_file, self.mapper.start_datetime
@@ -1,5 +1,6 @@
 import csv
 import ctypes
+import functools
 import json
 import logging
 import sys
@@ -18,6 +19,7 @@ from folio_migration_tools.custom_exceptions import (
 )
 from folio_migration_tools.helper import Helper
 from folio_migration_tools.holdings_helper import HoldingsHelper
+from folio_migration_tools.holdings_spill_merger import HoldingsSpillMerger
 from folio_migration_tools.library_configuration import (
     FileDefinition,
     HridHandling,
@@ -29,13 +31,21 @@ from folio_migration_tools.mapping_file_transformation.holdings_mapper import (
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
+from folio_migration_tools.mapping_file_transformation.parallel_row_mapper import (
+    ParallelRowMapper,
+)
 from folio_migration_tools.marc_rules_transformation.hrid_handler import HRIDHandler
+from folio_migration_tools.migration_report import ReportMetric
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
+from folio_migration_tools.results_index import MERGE_KEY_INDEX, ResultsIndexWriter
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
 csv.field_size_limit(int(ctypes.c_ulong(-1).value // 2))
 csv.register_dialect("tsv", delimiter="\t")
 
+ITEMS_IN_FILE = ReportMetric("GeneralStatistics", "Number of Legacy items in file")
+HOLDINGS_WRITTEN = ReportMetric("GeneralStatistics", "Holdings Records Written to disk")
+
 
 class HoldingsCsvTransformer(MigrationTaskBase):
     class TaskConfiguration(AbstractTaskConfiguration):
@@ -72,6 +82,32 @@ class HoldingsCsvTransformer(MigrationTaskBase):
                 description="At the end of the run, update FOLIO with the HRID settings",
             ),
         ] = True
+        number_of_processes: Annotated[
+            int,
+            Field(
+                title="Number of processes",
+                description=(
+                    "The number of worker processes mapping the rows in parallel. Legacy IDs "
+                    "are still checked for duplicates, and holdings merged, in file order, so "
+                    "the output is the same as when running in a single process"
+                ),
+                ge=1,
+            ),
+        ] = 1
+        max_holdings_in_memory: Annotated[
+            int,
+            Field(
+                title="Max holdings in memory",
+                description=(
+                    "When set, holdings are not merged in memory as the items are mapped. "
+                    "Instead, they are written to sorted spill files this many at a time, "
+                    "and merged when all files are processed. This keeps the memory use "
+                    "down for large numbers of items. The holdings are the same, but are "
+                    "written ordered by their merge key. 0 merges all holdings in memory"
+                ),
+                ge=0,
+            ),
+        ] = 0
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -94,7 +130,7 @@ class HoldingsCsvTransformer(MigrationTaskBase):
                 self.load_mapped_fields(),
                 self.load_location_map(),
                 self.load_call_number_type_map(),
-                self.load_id_map(self.folder_structure.instance_id_map_path, True),
+                self.load_id_map(self.folder_structure.instance_id_map_path, True, True),
                 library_config,
             )
             self.holdings = {}
@@ -142,15 +178,32 @@ class HoldingsCsvTransformer(MigrationTaskBase):
 
             else:
                 logging.info("No file of legacy holdings setup.")
+            self.holdings_spill_merger = None
+            self.previously_generated_holdings_count = 0
+            if self.task_config.max_holdings_in_memory:
+                self.holdings_spill_merger = HoldingsSpillMerger(
+                    self.folder_structure.results_folder,
+                    self.task_config.max_holdings_in_memory,
+                )
+                for holdings_key, holding in self.holdings.items():
+                    self.holdings_spill_merger.add(holdings_key, holding)
+                self.previously_generated_holdings_count = len(self.holdings)
+                self.holdings = {}
 
             if (
                 self.task_configuration.reset_hrid_settings
                 and self.task_configuration.update_hrid_settings
             ):
                 hrid_handler = HRIDHandler(
-                    self.folio_client, HridHandling.default, self.mapper.migration_report, True
+                    self.folio_client,
+                    HridHandling.default,
+                    self.mapper.migration_report,
+                    True,
+                    self.http_session,
                 )
+                hrid_handler.use_hrid_journal(self.folder_structure.hrid_journal_path)
                 hrid_handler.reset_holdings_hrid_counter()
+            self.number_of_processes = self.get_number_of_processes()
 
         except HTTPError as http_error:
             logging.critical(http_error)
@@ -241,13 +294,20 @@ class HoldingsCsvTransformer(MigrationTaskBase):
     def wrap_up(self):
         logging.info("Done. Transformer wrapping up...")
         self.extradata_writer.flush()
-        if any(self.holdings):
+        if any(self.holdings) or (
+            self.holdings_spill_merger and self.holdings_spill_merger.holdings_added
+        ):
             logging.info(
                 "Saving holdings created to %s",
                 self.folder_structure.created_objects_path,
             )
-            with open(self.folder_structure.created_objects_path, "w+") as holdings_file:
-                for holding in self.holdings.values():
+            merge_key_index = ResultsIndexWriter(
+                self.folder_structure.created_objects_path, MERGE_KEY_INDEX
+            )
+            with self.open_results_writer(
+                self.folder_structure.created_objects_path
+            ) as holdings_file:
+                for holdings_key, holding in self.get_holdings_to_write():
                     for legacy_id in holding["formerIds"]:
                         # Prevent the first item in a boundwith to be overwritten
                         # TODO: Find out why not
@@ -256,12 +316,13 @@ class HoldingsCsvTransformer(MigrationTaskBase):
                             legacy_id, holding, self.object_type
                         )
                     Helper.write_to_file(holdings_file, holding)
-                    self.mapper.migration_report.add_general_statistics(
-                        i18n.t("Holdings Records Written to disk")
-                    )
+                    merge_key_index.add(holdings_key, holding["id"])
+                    self.mapper.migration_report.count(HOLDINGS_WRITTEN)
+            merge_key_index.write()
             self.mapper.save_id_map_file(
                 self.folder_structure.holdings_id_map_path, self.holdings_id_map
             )
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             self.mapper.migration_report.write_migration_report(
                 i18n.t("Holdings transformation report"),
@@ -277,6 +338,28 @@ class HoldingsCsvTransformer(MigrationTaskBase):
         logging.info("All done!")
         self.clean_out_empty_logs()
 
+    def get_holdings_to_write(self):
+        yield from self.holdings.items()
+        if self.holdings_spill_merger:
+            for (
+                holdings_key,
+                holding,
+                first_order,
+                merged_count,
+            ) in self.holdings_spill_merger.merge_by_key():
+                if first_order >= self.previously_generated_holdings_count:
+                    self.mapper.migration_report.add_general_statistics(
+                        i18n.t("Unique Holdings created from Items")
+                    )
+                    merged_count -= 1
+                if merged_count:
+                    self.mapper.migration_report.add(
+                        "GeneralStatistics",
+                        i18n.t("Holdings already created from Item"),
+                        merged_count,
+                    )
+                yield holdings_key, holding
+
     def validate_merge_criterias(self):
         holdings_schema = self.folio_client.get_holdings_schema()
         properties = holdings_schema["properties"].keys()
@@ -301,23 +384,24 @@ class HoldingsCsvTransformer(MigrationTaskBase):
             )
             start = time.time()
             records_processed = 0
-            for idx, legacy_record in enumerate(self.mapper.get_objects(records_file, full_path)):
-                records_processed = idx + 1
-                try:
-                    self.mapper.verify_legacy_record(legacy_record, idx)
-                    folio_rec, legacy_id = self.mapper.do_map(
-                        legacy_record, f"row # {idx}", FOLIONamespaces.holdings
-                    )
-                    self.post_process_holding(folio_rec, legacy_id, file_def)
-                except TransformationProcessError as process_error:
-                    self.mapper.handle_transformation_process_error(idx, process_error)
-                except TransformationRecordFailedError as error:
-                    self.mapper.handle_transformation_record_failed_error(idx, error)
-                except Exception as excepion:
-                    self.mapper.handle_generic_exception(idx, excepion)
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Number of Legacy items in file")
+            legacy_records = self.mapper.get_objects(records_file, full_path)
+            if self.number_of_processes > 1:
+                mapped_rows = self.map_rows_in_parallel(legacy_records, file_def)
+            else:
+                mapped_rows = (
+                    (idx, self.map_row(idx, legacy_record, file_def))
+                    for idx, legacy_record in enumerate(legacy_records)
                 )
+            for idx, mapped_row in mapped_rows:
+                records_processed = idx + 1
+                if mapped_row:
+                    try:
+                        self.merge_holdings_in(*mapped_row)
+                    except TransformationRecordFailedError as error:
+                        self.mapper.handle_transformation_record_failed_error(idx, error)
+                    except Exception as excepion:
+                        self.mapper.handle_generic_exception(idx, excepion)
+                self.mapper.migration_report.count(ITEMS_IN_FILE)
                 if idx > 1 and idx % 10000 == 0:
                     elapsed = idx / (time.time() - start)
                     elapsed_formatted = "{0:.4g}".format(elapsed)
@@ -328,6 +412,75 @@ class HoldingsCsvTransformer(MigrationTaskBase):
                 f"Total records processed: {self.total_records:,}"
             )
 
+    def map_row(
+        self, idx: int, legacy_record: dict, file_def: FileDefinition, accept_duplicate_ids=False
+    ):
+        """Maps a row into one or more holdings, ready to be merged with the ones already created
+
+        Args:
+            idx (int): Index of the row in the file
+            legacy_record (dict): The legacy row
+            file_def (FileDefinition): _description_
+            accept_duplicate_ids (bool, optional): Set when already checked. Defaults to False.
+
+        Returns:
+            tuple: The holdings, the instance ids and the legacy id, or None if the mapping failed
+        """
+        try:
+            self.mapper.verify_legacy_record(legacy_record, idx)
+            folio_rec, legacy_id = self.mapper.do_map(
+                legacy_record, f"row # {idx}", FOLIONamespaces.holdings, accept_duplicate_ids
+            )
+            holdings_from_row, all_instance_ids = self.post_process_holding(
+                folio_rec, legacy_id, file_def
+            )
+            return holdings_from_row, all_instance_ids, legacy_id
+        except TransformationProcessError as process_error:
+            self.mapper.handle_transformation_process_error(idx, process_error)
+        except TransformationRecordFailedError as error:
+            self.mapper.handle_transformation_record_failed_error(idx, error)
+        except Exception as excepion:
+            self.mapper.handle_generic_exception(idx, excepion)
+        return None
+
+    def map_rows_in_parallel(self, legacy_records, file_def: FileDefinition):
+        """Maps the rows in worker processes. Legacy ID:s are checked for duplicates here,
+        in file order, and the holdings are merged by the caller, so that the outcome is the
+        same as when mapping the rows in a single process.
+
+        Args:
+            legacy_records (_type_): The legacy rows
+            file_def (FileDefinition): _description_
+
+        Returns:
+            Iterator: index and the result of map_row
+        """
+        row_mapper = ParallelRowMapper(
+            self.mapper,
+            functools.partial(self.map_row_in_worker, file_def),
+            self.number_of_processes,
+        )
+        checked_records = (
+            (idx, self.check_row(idx, legacy_record))
+            for idx, legacy_record in enumerate(legacy_records)
+        )
+        return row_mapper.map_rows(checked_records)
+
+    def check_row(self, idx: int, legacy_record: dict):
+        try:
+            self.mapper.instantiate_record(
+                legacy_record, f"row # {idx}", FOLIONamespaces.holdings
+            )
+            return legacy_record
+        except TransformationRecordFailedError as error:
+            self.mapper.handle_transformation_record_failed_error(idx, error)
+        return None
+
+    def map_row_in_worker(self, file_def: FileDefinition, idx: int, legacy_record: dict):
+        if legacy_record is None:
+            return None
+        return self.map_row(idx, legacy_record, file_def, True)
+
     def post_process_holding(self, folio_rec: dict, legacy_id: str, file_def: FileDefinition):
         HoldingsHelper.handle_notes(folio_rec)
         HoldingsHelper.remove_empty_holdings_statements(folio_rec)
@@ -351,8 +504,14 @@ class HoldingsCsvTransformer(MigrationTaskBase):
 
         for folio_holding in holdings_from_row:
             self.mapper.perform_additional_mappings(folio_holding, file_def)
-            self.merge_holding_in(folio_holding, all_instance_ids, legacy_id)
         self.mapper.report_folio_mapping(folio_holding, self.mapper.schema)
+        return holdings_from_row, all_instance_ids
+
+    def merge_holdings_in(
+        self, holdings_from_row: list[dict], instance_ids: list[str], legacy_item_id: str
+    ) -> None:
+        for folio_holding in holdings_from_row:
+            self.merge_holding_in(folio_holding, instance_ids, legacy_item_id)
 
     def create_bound_with_holdings(self, folio_holding, legacy_id: str):
         folio_holding["formerIds"] = explode_former_ids(folio_holding)
@@ -408,7 +567,10 @@ class HoldingsCsvTransformer(MigrationTaskBase):
                 self.mapper.migration_report,
                 self.task_config.holdings_type_uuid_for_boundwiths,
             )
-            if self.holdings.get(new_holding_key, None):
+            if self.holdings_spill_merger:
+                # Merged, and counted, when wrapping up
+                self.holdings_spill_merger.add(new_holding_key, incoming_holding)
+            elif self.holdings.get(new_holding_key, None):
                 self.mapper.migration_report.add_general_statistics(
                     i18n.t("Holdings already created from Item")
                 )
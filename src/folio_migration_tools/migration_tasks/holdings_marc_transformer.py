@@ -96,6 +96,17 @@ class HoldingsMarcTransformer(MigrationTaskBase):
                 ),
             ),
         ] = True
+        split_srs_records: Annotated[
+            bool,
+            Field(
+                title="Split SRS records",
+                description=(
+                    "Writes the SRS records with the MARC record in a separate tab-separated "
+                    "column instead of twice in the record, which makes the file half the "
+                    "size. BatchPoster joins the columns when posting. Defaults to False"
+                ),
+            ),
+        ] = False
         update_hrid_settings: Annotated[
             bool,
             Field(
@@ -217,7 +228,9 @@ class HoldingsMarcTransformer(MigrationTaskBase):
         self.check_source_files(
             self.folder_structure.legacy_records_folder, self.task_config.files
         )
-        self.instance_id_map = self.load_id_map(self.folder_structure.instance_id_map_path, True)
+        self.instance_id_map = self.load_id_map(
+            self.folder_structure.instance_id_map_path, True, True
+        )
         self.mapper = RulesMapperHoldings(
             self.folio_client,
             self.location_map,
@@ -226,6 +239,9 @@ class HoldingsMarcTransformer(MigrationTaskBase):
             self.instance_id_map,
             self.boundwith_relationship_map,
         )
+        if self.task_configuration.update_hrid_settings:
+            self.mapper.hrid_handler.http_session = self.http_session
+            self.mapper.hrid_handler.use_hrid_journal(self.folder_structure.hrid_journal_path)
         if (
             self.task_configuration.reset_hrid_settings
             and self.task_configuration.update_hrid_settings
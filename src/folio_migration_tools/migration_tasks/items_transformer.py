@@ -1,13 +1,14 @@
 '''Main "script."'''
 import csv
 import ctypes
+import functools
 import json
 import logging
 import sys
 import time
 import traceback
 import uuid
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Optional, Tuple
 
 import i18n
 from folio_uuid.folio_namespaces import FOLIONamespaces
@@ -27,12 +28,20 @@ from folio_migration_tools.mapping_file_transformation.item_mapper import ItemMa
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
+from folio_migration_tools.mapping_file_transformation.parallel_row_mapper import (
+    ParallelRowMapper,
+)
 from folio_migration_tools.marc_rules_transformation.hrid_handler import HRIDHandler
+from folio_migration_tools.migration_report import ReportMetric
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
+from folio_migration_tools.results_index import BARCODE_INDEX, ResultsIndexWriter
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
 csv.field_size_limit(int(ctypes.c_ulong(-1).value // 2))
 
+RECORDS_WRITTEN = ReportMetric("GeneralStatistics", "Number of records written to disk")
+ITEMS_IN_TOTAL = ReportMetric("GeneralStatistics", "Number of Legacy items in total")
+
 
 class ItemsTransformer(MigrationTaskBase):
     class TaskConfiguration(AbstractTaskConfiguration):
@@ -68,6 +77,18 @@ class ItemsTransformer(MigrationTaskBase):
                 ),
             ),
         ] = ""
+        number_of_processes: Annotated[
+            int,
+            Field(
+                title="Number of processes",
+                description=(
+                    "The number of worker processes mapping the items in parallel. Legacy IDs "
+                    "and barcodes are still checked for duplicates in file order, so the "
+                    "output is the same as when running in a single process"
+                ),
+                ge=1,
+            ),
+        ] = 1
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -179,7 +200,7 @@ class ItemsTransformer(MigrationTaskBase):
                 self.folio_keys,
                 False,
             ),
-            self.load_id_map(self.folder_structure.holdings_id_map_path),
+            self.load_id_map(self.folder_structure.holdings_id_map_path, read_only=True),
             statcode_mapping,
             self.load_ref_data_mapping_file(
                 "status.name",
@@ -197,15 +218,23 @@ class ItemsTransformer(MigrationTaskBase):
             and self.task_configuration.update_hrid_settings
         ):
             hrid_handler = HRIDHandler(
-                self.folio_client, HridHandling.default, self.mapper.migration_report, True
+                self.folio_client,
+                HridHandling.default,
+                self.mapper.migration_report,
+                True,
+                self.http_session,
             )
+            hrid_handler.use_hrid_journal(self.folder_structure.hrid_journal_path)
             hrid_handler.reset_item_hrid_counter()
-
+        self.number_of_processes = self.get_number_of_processes()
         logging.info("Init done")
 
     def do_work(self):
         logging.info("Starting....")
-        with open(self.folder_structure.created_objects_path, "w+") as results_file:
+        self.barcode_index = ResultsIndexWriter(
+            self.folder_structure.created_objects_path, BARCODE_INDEX
+        )
+        with self.open_results_writer(self.folder_structure.created_objects_path) as results_file:
             for file_def in self.task_config.files:
                 try:
                     self.process_single_file(file_def, results_file)
@@ -218,6 +247,7 @@ class ItemsTransformer(MigrationTaskBase):
                     )
                     logging.fatal(error_str)
                     sys.exit(1)
+        self.barcode_index.write()
         logging.info(
             f"processed {self.total_records:,} records in {len(self.task_config.files)} files"
         )
@@ -231,59 +261,27 @@ class ItemsTransformer(MigrationTaskBase):
                 i18n.t("Number of files processed")
             )
             start = time.time()
-            for idx, record in enumerate(self.mapper.get_objects(records_file, full_path)):
-                try:
-                    if idx == 0:
-                        logging.info("First legacy record:")
-                        logging.info(json.dumps(record, indent=4))
-                        self.mapper.verify_legacy_record(record, idx)
-                    folio_rec, legacy_id = self.mapper.do_map(
-                        record, f"row {idx}", FOLIONamespaces.items
-                    )
-
-                    self.mapper.perform_additional_mappings(folio_rec, file_def)
-                    self.handle_circiulation_notes(folio_rec, self.folio_client.current_user)
-                    self.handle_notes(folio_rec)
-                    if folio_rec["holdingsRecordId"] in self.mapper.boundwith_relationship_map:
-                        for idx, instance_id in enumerate(
-                            self.mapper.boundwith_relationship_map.get(
-                                folio_rec["holdingsRecordId"]
-                            )
-                        ):
-                            if idx == 0:
-                                bw_id = folio_rec["holdingsRecordId"]
-                            else:
-                                bw_id = self.mapper.generate_boundwith_holding_uuid(
-                                    folio_rec["holdingsRecordId"], instance_id
-                                )
-                            self.mapper.create_and_write_boundwith_part(legacy_id, bw_id)
+            records = self.mapper.get_objects(records_file, full_path)
+            items_in_file = ReportMetric(
+                "GeneralStatistics", "Number of Legacy items in %{container}", container=file_def
+            )
+            if self.number_of_processes > 1:
+                mapped_items = self.map_items_in_parallel(records, file_def)
+            else:
+                mapped_items = (
+                    (idx, self.map_item(idx, record, file_def))
+                    for idx, record in enumerate(records)
+                )
+            for idx, (folio_rec, barcode, item_id) in mapped_items:
+                if folio_rec:
                     if idx == 0:
                         logging.info("First FOLIO record:")
-                        logging.info(json.dumps(folio_rec, indent=4))
-                    # TODO: turn this into a asynchrounous task
-                    Helper.write_to_file(results_file, folio_rec)
-                    self.mapper.migration_report.add_general_statistics(
-                        i18n.t("Number of records written to disk")
-                    )
-                    self.mapper.report_folio_mapping(folio_rec, self.mapper.schema)
-                except TransformationProcessError as process_error:
-                    self.mapper.handle_transformation_process_error(idx, process_error)
-                except TransformationRecordFailedError as data_error:
-                    self.mapper.handle_transformation_record_failed_error(idx, data_error)
-                except AttributeError as attribute_error:
-                    traceback.print_exc()
-                    logging.fatal(attribute_error)
-                    logging.info("Quitting...")
-                    sys.exit(1)
-                except Exception as excepion:
-                    self.mapper.handle_generic_exception(idx, excepion)
-                self.mapper.migration_report.add(
-                    "GeneralStatistics",
-                    i18n.t("Number of Legacy items in %{container}", container=file_def),
-                )
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Number of Legacy items in total")
-                )
+                        logging.info(json.dumps(json.loads(folio_rec), indent=4))
+                    results_file.write(f"{folio_rec}\n")
+                    self.barcode_index.add(barcode, item_id)
+                    self.mapper.migration_report.count(RECORDS_WRITTEN)
+                self.mapper.migration_report.count(items_in_file)
+                self.mapper.migration_report.count(ITEMS_IN_TOTAL)
                 self.print_progress(idx, start)
                 records_in_file = idx + 1
 
@@ -293,6 +291,108 @@ class ItemsTransformer(MigrationTaskBase):
             )
         self.total_records += records_in_file
 
+    def map_item(
+        self, idx: int, record: dict, file_def: FileDefinition, accept_duplicate_ids=False
+    ) -> Tuple[str, str, str]:
+        """Maps a legacy item
+
+        Args:
+            idx (int): Index of the row in the file
+            record (dict): The legacy item
+            file_def (FileDefinition): _description_
+            accept_duplicate_ids (bool, optional): Set when already checked. Defaults to False.
+
+        Returns:
+            Tuple[str, str, str]: The serialized FOLIO item, its barcode and its id. Empty
+            strings if the mapping failed
+        """
+        try:
+            if idx == 0:
+                logging.info("First legacy record:")
+                logging.info(json.dumps(record, indent=4))
+                self.mapper.verify_legacy_record(record, idx)
+            folio_rec, legacy_id = self.mapper.do_map(
+                record, f"row {idx}", FOLIONamespaces.items, accept_duplicate_ids
+            )
+
+            self.mapper.perform_additional_mappings(folio_rec, file_def)
+            self.handle_circiulation_notes(folio_rec, self.folio_client.current_user)
+            self.handle_notes(folio_rec)
+            if folio_rec["holdingsRecordId"] in self.mapper.boundwith_relationship_map:
+                for bw_idx, instance_id in enumerate(
+                    self.mapper.boundwith_relationship_map.get(folio_rec["holdingsRecordId"])
+                ):
+                    if bw_idx == 0:
+                        bw_id = folio_rec["holdingsRecordId"]
+                    else:
+                        bw_id = self.mapper.generate_boundwith_holding_uuid(
+                            folio_rec["holdingsRecordId"], instance_id
+                        )
+                    self.mapper.create_and_write_boundwith_part(legacy_id, bw_id)
+            self.mapper.report_folio_mapping(folio_rec, self.mapper.schema)
+            return json.dumps(folio_rec), folio_rec.get("barcode", ""), folio_rec["id"]
+        except TransformationProcessError as process_error:
+            self.mapper.handle_transformation_process_error(idx, process_error)
+        except TransformationRecordFailedError as data_error:
+            self.mapper.handle_transformation_record_failed_error(idx, data_error)
+        except AttributeError as attribute_error:
+            traceback.print_exc()
+            logging.fatal(attribute_error)
+            logging.info("Quitting...")
+            sys.exit(1)
+        except Exception as excepion:
+            self.mapper.handle_generic_exception(idx, excepion)
+        return "", "", ""
+
+    def map_items_in_parallel(self, records, file_def: FileDefinition):
+        """Maps the items in worker processes. Legacy ID:s and barcodes are checked for
+        duplicates here, in file order, so that the outcome is the same as when mapping
+        the items in a single process.
+
+        Args:
+            records (_type_): The legacy items
+            file_def (FileDefinition): _description_
+
+        Yields:
+            tuple: index and what map_item returns for the item
+        """
+        # Fetch the current user before forking, so that the workers do not have to
+        self.folio_client.current_user
+        row_mapper = ParallelRowMapper(
+            self.mapper,
+            functools.partial(self.map_item_in_worker, file_def),
+            self.number_of_processes,
+        )
+        checked_records = (
+            (idx, self.check_item(idx, record)) for idx, record in enumerate(records)
+        )
+        for idx, ((folio_rec, item_barcode, item_id), barcodes) in row_mapper.map_rows(
+            checked_records
+        ):
+            for barcode in barcodes:
+                unique_barcode = self.mapper.get_unique_barcode(barcode, f"row {idx}")
+                if folio_rec and unique_barcode != barcode:
+                    folio_item = json.loads(folio_rec)
+                    folio_item["barcode"] = unique_barcode
+                    folio_rec = json.dumps(folio_item)
+                    item_barcode = unique_barcode
+            yield idx, (folio_rec, item_barcode, item_id)
+
+    def check_item(self, idx: int, record: dict):
+        try:
+            self.mapper.instantiate_record(record, f"row {idx}", FOLIONamespaces.items)
+            return record
+        except TransformationRecordFailedError as data_error:
+            self.mapper.handle_transformation_record_failed_error(idx, data_error)
+        return None
+
+    def map_item_in_worker(self, file_def: FileDefinition, idx: int, record: dict):
+        if record is None:
+            return ("", "", ""), []
+        self.mapper.deferred_barcodes = []
+        mapped_item = self.map_item(idx, record, file_def, True)
+        return mapped_item, self.mapper.deferred_barcodes
+
     @staticmethod
     def handle_notes(folio_object):
         if folio_object.get("notes", []):
@@ -336,6 +436,7 @@ class ItemsTransformer(MigrationTaskBase):
     def wrap_up(self):
         logging.info("Done. Transformer wrapping up...")
         self.extradata_writer.flush()
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             self.mapper.migration_report.write_migration_report(
                 i18n.t("Item transformation report"),
@@ -5,8 +5,10 @@ import logging
 import sys
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.error import HTTPError
 
 import i18n
@@ -24,7 +26,7 @@ from folio_migration_tools.library_configuration import (
 from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
     MappingFileMapperBase,
 )
-from folio_migration_tools.migration_report import MigrationReport
+from folio_migration_tools.migration_report import LockingMigrationReport
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 from folio_migration_tools.transaction_migration.legacy_loan import LegacyLoan
@@ -33,6 +35,10 @@ from folio_migration_tools.transaction_migration.transaction_result import (
 )
 
 
+LOANS_CHUNK_SIZE = 10000
+VALIDATION_SAMPLE_SIZE = 10000
+
+
 class LoansMigrator(MigrationTaskBase):
     class TaskConfiguration(AbstractTaskConfiguration):
         name: str
@@ -42,6 +48,7 @@ class LoansMigrator(MigrationTaskBase):
         starting_row: Optional[int] = 1
         item_files: Optional[list[FileDefinition]] = []
         patron_files: Optional[list[FileDefinition]] = []
+        number_of_threads: Optional[int] = 1
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -61,13 +68,13 @@ class LoansMigrator(MigrationTaskBase):
         self.processed_items: set = set()
         self.failed: dict = {}
         self.failed_and_not_dupe: dict = {}
-        self.migration_report = MigrationReport()
-        self.valid_legacy_loans = []
+        self.migration_report = LockingMigrationReport()
         super().__init__(library_config, task_configuration, folio_client)
         self.circulation_helper = CirculationHelper(
             self.folio_client,
             task_configuration.fallback_service_point_id,
             self.migration_report,
+            self.http_session,
         )
         logging.info("Check that SMTP is disabled before migrating loans")
         self.check_smtp_config()
@@ -83,52 +90,63 @@ class LoansMigrator(MigrationTaskBase):
             logging.info('Tenant locale settings not available. Using "UTC".')
             self.tenant_timezone_str = "UTC"
         self.tenant_timezone = ZoneInfo(self.tenant_timezone_str)
-        self.semi_valid_legacy_loans = []
-        for file_def in task_configuration.open_loans_files:
+        self.item_barcodes = self.circulation_helper.load_migrated_item_barcodes(
+            task_configuration.item_files, self.folder_structure
+        )
+        self.user_barcodes = self.circulation_helper.load_migrated_user_barcodes(
+            task_configuration.patron_files, self.folder_structure
+        )
+        if not any(task_configuration.item_files) and not any(task_configuration.patron_files):
+            logging.info(
+                "No item or user files supplied. Not validating against"
+                "previously migrated objects"
+            )
+        logging.info("Starting row number is %s", task_configuration.starting_row)
+        logging.info("Init completed")
+
+    def get_valid_legacy_loans(self) -> Iterator[LegacyLoan]:
+        """Reads, validates and checks the barcodes of the loans in the loans files, one loan
+        at a time, so that checking out the first loans starts before the rest are read
+
+        Yields:
+            Iterator[LegacyLoan]: The loans that passed validation
+        """
+        num_valid_loans = 0
+        for file_def in self.task_configuration.open_loans_files:
             loans_file_path = self.folder_structure.legacy_records_folder / file_def.file_name
             with open(loans_file_path, "r", encoding="utf-8") as loans_file:
-                total_rows, empty_rows, reader = MappingFileMapperBase._get_delimited_file_reader(
+                reader = MappingFileMapperBase._get_delimited_file_reader(
                     loans_file, loans_file_path
                 )
-                logging.info("Source data file contains %d rows", total_rows)
-                logging.info("Source data file contains %d empty rows", empty_rows)
+                num_loans_in_file = 0
+                for legacy_loan in self.check_barcodes(
+                    self.load_and_validate_legacy_loans(
+                        reader,
+                        file_def.service_point_id
+                        or self.task_configuration.fallback_service_point_id,
+                    )
+                ):
+                    num_loans_in_file += 1
+                    yield legacy_loan
+                logging.info("Source data file contains %d rows", reader.total_rows)
+                logging.info("Source data file contains %d empty rows", reader.empty_rows)
                 self.migration_report.set(
                     "GeneralStatistics",
                     f"Total rows in {loans_file_path.name}",
-                    total_rows,
+                    reader.total_rows,
                 )
                 self.migration_report.set(
                     "GeneralStatistics",
                     f"Empty rows in {loans_file_path.name}",
-                    empty_rows,
+                    reader.empty_rows,
                 )
-                self.semi_valid_legacy_loans.extend(
-                    self.load_and_validate_legacy_loans(
-                        reader,
-                        file_def.service_point_id or task_configuration.fallback_service_point_id,
-                    )
-                )
-
                 logging.info(
                     "Loaded and validated %s loans in file from %s",
-                    len(self.semi_valid_legacy_loans),
+                    num_loans_in_file,
                     file_def.file_name,
                 )
-        logging.info("Loaded and validated %s loans in total", len(self.semi_valid_legacy_loans))
-        if any(self.task_configuration.item_files) or any(self.task_configuration.patron_files):
-            self.valid_legacy_loans = list(self.check_barcodes())
-            logging.info(
-                "Loaded and validated %s loans against barcodes",
-                len(self.valid_legacy_loans),
-            )
-        else:
-            logging.info(
-                "No item or user files supplied. Not validating against"
-                "previously migrated objects"
-            )
-            self.valid_legacy_loans = self.semi_valid_legacy_loans
-        logging.info("Starting row number is %s", task_configuration.starting_row)
-        logging.info("Init completed")
+                num_valid_loans += num_loans_in_file
+        logging.info("Loaded and validated %s loans in total", num_valid_loans)
 
     def check_smtp_config(self):
         if self.library_configuration.folio_release.lower() == FolioRelease.morning_glory:
@@ -169,7 +187,7 @@ class LoansMigrator(MigrationTaskBase):
             logging.info("SMTP connection is disabled...")
 
     def do_work(self):
-        with self.folio_client.get_folio_http_client() as self.http_client:
+        with self.http_session as self.http_client:
             logging.info("Starting")
             starting_index = (
                 self.task_configuration.starting_row - 1
@@ -178,22 +196,60 @@ class LoansMigrator(MigrationTaskBase):
             )
             if self.task_configuration.starting_row > 1:
                 logging.info(f"Skipping {(starting_index)} records")
-            for num_loans, legacy_loan in enumerate(
-                self.valid_legacy_loans[starting_index:], start=1
-            ):
-                t0_migration = time.time()
-                self.migration_report.add_general_statistics(
-                    i18n.t("Processed pre-validated loans")
-                )
-                try:
-                    self.checkout_single_loan(legacy_loan)
-                except Exception as ee:
-                    logging.exception(
-                        f"Error in row {num_loans}  Item barcode: {legacy_loan.item_barcode} "
-                        f"Patron barcode: {legacy_loan.patron_barcode} {ee}"
-                    )
-                if num_loans % 25 == 0:
-                    logging.info(f"{timings(self.t0, t0_migration, num_loans)} {num_loans}")
+            numbered_loans = enumerate(
+                islice(self.get_valid_legacy_loans(), starting_index, None), start=1
+            )
+            if (self.task_configuration.number_of_threads or 1) > 1:
+                # Loans are partitioned and checked out a chunk at a time, to keep the memory
+                # used bounded however large the loans files are
+                while chunk := list(islice(numbered_loans, LOANS_CHUNK_SIZE)):
+                    self.migrate_loans_concurrently(chunk)
+            else:
+                for num_loans, legacy_loan in numbered_loans:
+                    self.migrate_loan(num_loans, legacy_loan)
+
+    def migrate_loans_concurrently(self, numbered_loans: List[Tuple[int, LegacyLoan]]):
+        """Checks out the loans in several threads over the same connection pool.
+
+        Loans of the same item or the same patron, or proxy, are checked out by the same
+        thread, in file order, since checking out one of them might depend on, or change,
+        the state the others are checked out in. Independent loans run at the same time.
+
+        Args:
+            numbered_loans (List[Tuple[int, LegacyLoan]]): The loans with their row numbers
+        """
+        partitions = partition_loans(numbered_loans)
+        logging.info(
+            "Checking out %s loans in %s independent groups using %s threads",
+            len(numbered_loans),
+            len(partitions),
+            self.task_configuration.number_of_threads,
+        )
+        with ThreadPoolExecutor(self.task_configuration.number_of_threads) as executor:
+            # The largest groups first, so they do not hold up the end of the migration
+            futures = [
+                executor.submit(self.migrate_loans, partition)
+                for partition in sorted(partitions, key=len, reverse=True)
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    def migrate_loans(self, numbered_loans: List[Tuple[int, LegacyLoan]]):
+        for num_loans, legacy_loan in numbered_loans:
+            self.migrate_loan(num_loans, legacy_loan)
+
+    def migrate_loan(self, num_loans: int, legacy_loan: LegacyLoan):
+        t0_migration = time.time()
+        self.migration_report.add_general_statistics(i18n.t("Processed pre-validated loans"))
+        try:
+            self.checkout_single_loan(legacy_loan)
+        except Exception as ee:
+            logging.exception(
+                f"Error in row {num_loans}  Item barcode: {legacy_loan.item_barcode} "
+                f"Patron barcode: {legacy_loan.patron_barcode} {ee}"
+            )
+        if num_loans % 25 == 0:
+            logging.info(f"{timings(self.t0, t0_migration, num_loans)} {num_loans}")
 
     def checkout_single_loan(self, legacy_loan: LegacyLoan):
         """Checks a legacy loan out. Retries once if it fails.
@@ -297,22 +353,30 @@ class LoansMigrator(MigrationTaskBase):
             for _k, failed_loan in self.failed_and_not_dupe.items():
                 writer.writerow(failed_loan[0])
 
-    def check_barcodes(self):
-        user_barcodes = set()
-        item_barcodes = set()
-        self.circulation_helper.load_migrated_item_barcodes(
-            item_barcodes, self.task_configuration.item_files, self.folder_structure
-        )
-        self.circulation_helper.load_migrated_user_barcodes(
-            user_barcodes, self.task_configuration.patron_files, self.folder_structure
-        )
-        for loan in self.semi_valid_legacy_loans:
-            has_item_barcode = loan.item_barcode in item_barcodes or not any(item_barcodes)
-            has_patron_barcode = loan.patron_barcode in user_barcodes or not any(user_barcodes)
+    def check_barcodes(self, legacy_loans: Iterable[LegacyLoan]) -> Iterator[LegacyLoan]:
+        """Checks that the items and patrons of the loans have been migrated. Loans are not
+        checked against the items or the users if no such results files are given.
+
+        Args:
+            legacy_loans (Iterable[LegacyLoan]): The loans
+
+        Yields:
+            Iterator[LegacyLoan]: The loans with migrated items and patrons
+        """
+        if not any(self.task_configuration.item_files) and not any(
+            self.task_configuration.patron_files
+        ):
+            yield from legacy_loans
+            return
+        check_items = len(self.item_barcodes) > 0
+        check_users = len(self.user_barcodes) > 0
+        for loan in legacy_loans:
+            has_item_barcode = not check_items or loan.item_barcode in self.item_barcodes
+            has_patron_barcode = not check_users or loan.patron_barcode in self.user_barcodes
             has_proxy_barcode = True
             if loan.proxy_patron_barcode:
-                has_proxy_barcode = loan.proxy_patron_barcode in user_barcodes or not any(
-                    user_barcodes
+                has_proxy_barcode = (
+                    not check_users or loan.proxy_patron_barcode in self.user_barcodes
                 )
             if has_item_barcode and has_patron_barcode and has_proxy_barcode:
                 self.migration_report.add_general_statistics(
@@ -346,11 +410,31 @@ class LoansMigrator(MigrationTaskBase):
                     "", "Loan without matched proxy patron barcode", json.dumps(loan.to_dict())
                 )
 
-    def load_and_validate_legacy_loans(self, loans_reader, service_point_id: str) -> list:
-        results = []
+    def load_and_validate_legacy_loans(
+        self, loans_reader, service_point_id: str
+    ) -> Iterator[LegacyLoan]:
+        """Validates the loans of a loans file, one at a time.
+
+        The valid loans of the first VALIDATION_SAMPLE_SIZE rows are held back until these rows
+        are validated. If more than half of them failed, or of all the rows in smaller files,
+        the migration halts before any of the loans are checked out.
+
+        Args:
+            loans_reader (_type_): The rows of the loans file
+            service_point_id (str): The service point of loans without one of their own
+
+        Yields:
+            Iterator[LegacyLoan]: The valid loans
+        """
+        sample: Optional[List[LegacyLoan]] = []
         num_bad = 0
+        legacy_loan_count = -1
         logging.info("Validating legacy loans in file...")
         for legacy_loan_count, legacy_loan_dict in enumerate(loans_reader):
+            if sample is not None and legacy_loan_count == VALIDATION_SAMPLE_SIZE:
+                self.halt_if_too_many_failed(num_bad, legacy_loan_count)
+                yield from sample
+                sample = None
             try:
                 legacy_loan = LegacyLoan(
                     legacy_loan_dict,
@@ -371,21 +455,33 @@ class LoansMigrator(MigrationTaskBase):
                     self.failed[
                         legacy_loan.item_barcode or f"no_barcode_{legacy_loan_count}"
                     ] = legacy_loan
+                elif sample is not None:
+                    sample.append(legacy_loan)
                 else:
-                    results.append(legacy_loan)
+                    yield legacy_loan
             except ValueError as ve:
                 logging.exception(ve)
         logging.info(
             f"Done validating {legacy_loan_count + 1} legacy loans out of which "
             f"{num_bad} where discarded."
         )
-        if num_bad / (legacy_loan_count + 1) > 0.5:
-            q = num_bad / (legacy_loan_count + 1)
+        if sample is not None:
+            self.halt_if_too_many_failed(num_bad, legacy_loan_count + 1)
+            yield from sample
+        elif num_bad / (legacy_loan_count + 1) > 0.5:
+            # Too late to halt, since loans have been checked out already
+            logging.error(
+                "%s percent of loans failed to validate.",
+                (num_bad / (legacy_loan_count + 1) * 100),
+            )
+
+    def halt_if_too_many_failed(self, num_bad: int, num_loans: int):
+        if num_loans and num_bad / num_loans > 0.5:
+            q = num_bad / num_loans
             logging.error("%s percent of loans failed to validate.", (q * 100))
             self.migration_report.log_me()
             logging.critical("Halting...")
             sys.exit(1)
-        return results
 
     def handle_checkout_failure(
         self, legacy_loan, folio_checkout: TransactionResult
@@ -739,6 +835,46 @@ class LoansMigrator(MigrationTaskBase):
             return False, None, None
 
 
+def partition_loans(
+    numbered_loans: List[Tuple[int, LegacyLoan]]
+) -> List[List[Tuple[int, LegacyLoan]]]:
+    """Groups the loans that share an item barcode or a patron barcode, directly or through
+    other loans. The loans in each group are kept in file order.
+
+    Args:
+        numbered_loans (List[Tuple[int, LegacyLoan]]): The loans with their row numbers
+
+    Returns:
+        List[List[Tuple[int, LegacyLoan]]]: The groups, in the order of their first loan
+    """
+    parents: Dict[tuple, tuple] = {}
+
+    def find(key: tuple) -> tuple:
+        root = key
+        while parents[root] != root:
+            root = parents[root]
+        while parents[key] != root:
+            parents[key], key = root, parents[key]
+        return root
+
+    loan_keys = []
+    for _, legacy_loan in numbered_loans:
+        keys = [("item", legacy_loan.item_barcode), ("patron", legacy_loan.patron_barcode)]
+        if legacy_loan.proxy_patron_barcode:
+            keys.append(("patron", legacy_loan.proxy_patron_barcode))
+        for key in keys:
+            parents.setdefault(key, key)
+        root = find(keys[0])
+        for key in keys[1:]:
+            parents[find(key)] = root
+        loan_keys.append(keys[0])
+
+    partitions: Dict[tuple, List[Tuple[int, LegacyLoan]]] = {}
+    for numbered_loan, key in zip(numbered_loans, loan_keys):
+        partitions.setdefault(find(key), []).append(numbered_loan)
+    return list(partitions.values())
+
+
 def timings(t0, t0func, num_objects):
     avg = num_objects / (time.time() - t0)
     elapsed = time.time() - t0
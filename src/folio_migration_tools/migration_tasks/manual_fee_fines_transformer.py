@@ -38,6 +38,7 @@ class ManualFeeFinesTransformer(MigrationTaskBase):
         feefines_owner_map: Optional[str]
         feefines_type_map: Optional[str]
         service_point_map: Optional[str]
+        users_results_files: Optional[List[str]] = []
 
     @staticmethod
     def get_object_type() -> FOLIONamespaces:
@@ -98,9 +99,19 @@ class ManualFeeFinesTransformer(MigrationTaskBase):
             ),
             ignore_legacy_identifier=True,
         )
+        for users_results_file in self.task_configuration.users_results_files or []:
+            self.mapper.user_lookup.seed_from_file(
+                self.folder_structure.results_folder / users_results_file
+            )
 
     def do_work(self):
         logging.info("Getting started!")
+        self.mapper.prefetch_folio_records(
+            [
+                self.folder_structure.legacy_records_folder / file_def.file_name
+                for file_def in self.task_configuration.files
+            ]
+        )
         for file in self.task_configuration.files:
             logging.info("Processing %s", file)
             try:
@@ -166,6 +177,7 @@ class ManualFeeFinesTransformer(MigrationTaskBase):
     def wrap_up(self):
         logging.info("Done. Transformer wrapping up...")
         self.extradata_writer.flush()
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             logging.info(
                 "Writing migration- and mapping report to %s",
@@ -1,6 +1,7 @@
 import csv
 import json
 import logging
+import multiprocessing
 import os
 import sys
 import time
@@ -14,18 +15,24 @@ from folio_uuid.folio_namespaces import FOLIONamespaces
 from folioclient import FolioClient
 
 from folio_migration_tools import library_configuration, task_configuration
+from folio_migration_tools.background_writer import BackgroundFileHandler, BackgroundWriter
 from folio_migration_tools.custom_exceptions import (
     TransformationProcessError,
     TransformationRecordFailedError,
 )
 from folio_migration_tools.extradata_writer import ExtradataWriter
 from folio_migration_tools.folder_structure import FolderStructure
+from folio_migration_tools.http_session import FolioHttpSession
+from folio_migration_tools.id_map_store import IdMapStore
 from folio_migration_tools.marc_rules_transformation.marc_file_processor import (
     MarcFileProcessor,
 )
 from folio_migration_tools.marc_rules_transformation.marc_reader_wrapper import (
     MARCReaderWrapper,
 )
+from folio_migration_tools.marc_rules_transformation.parallel_marc_file_processor import (
+    ParallelMarcFileProcessor,
+)
 
 
 class MigrationTaskBase:
@@ -53,6 +60,12 @@ class MigrationTaskBase:
             {"x-okapi-tenant": self.ecs_tenant_id} if self.ecs_tenant_id else {}
         )
         self.folio_client.okapi_headers.update(self.ecs_tenant_header)
+        self.http_session = FolioHttpSession(
+            self.folio_client,
+            library_configuration.http_timeout,
+            library_configuration.http_connect_timeout,
+            library_configuration.http_max_retries,
+        )
         self.folder_structure: FolderStructure = FolderStructure(
             library_configuration.base_folder,
             self.get_object_type(),
@@ -85,7 +98,25 @@ class MigrationTaskBase:
     def wrap_up(self):
         raise NotImplementedError()
 
+    def open_results_writer(self, path: Path) -> BackgroundWriter:
+        """Opens a results file, like the created objects, for writing in the background,
+        compressed and encoded as set up in the library configuration
+
+        Args:
+            path (Path): The file to write
+
+        Returns:
+            BackgroundWriter: The writer. Close it, or use it as a context manager.
+        """
+        return BackgroundWriter(
+            path,
+            self.library_configuration.results_compression,
+            self.library_configuration.json_encoder,
+        )
+
     def clean_out_empty_logs(self):
+        for handler in logging.getLogger().handlers:
+            handler.flush()
         if (
             self.folder_structure.data_issue_file_path.is_file()
             and os.stat(self.folder_structure.data_issue_file_path).st_size == 0
@@ -139,7 +170,29 @@ class MigrationTaskBase:
             logging.info("\t%s", filename)
 
     @staticmethod
-    def load_id_map(map_path, raise_if_empty=False):
+    def load_id_map(map_path, raise_if_empty=False, read_only=False):
+        """Loads a legacy id map
+
+        Args:
+            map_path (_type_): Path to the *_id_map.json file
+            raise_if_empty (bool, optional): Raise if there are no IDs in the map.
+            read_only (bool, optional): Open the map as an IdMapStore instead of loading it
+                into a dict. The store is converted from the file the first time, if needed.
+
+        Raises:
+            TransformationProcessError: If the map is empty and raise_if_empty is set
+
+        Returns:
+            _type_: The map, by legacy id
+        """
+        if read_only and (isfile(map_path) or IdMapStore.store_path(map_path).is_file()):
+            if not IdMapStore.is_up_to_date(map_path):
+                IdMapStore.convert(map_path)
+            id_map = IdMapStore(IdMapStore.store_path(map_path))
+            logging.info("Opened %s migrated IDs from %s", len(id_map), id_map.store_path)
+            if not any(id_map) and raise_if_empty:
+                raise TransformationProcessError("", "Legacy id map is empty", map_path)
+            return id_map
         if not isfile(map_path):
             logging.warn("No legacy id map found at %s. Will build one from scratch", map_path)
             return {}
@@ -180,6 +233,8 @@ class MigrationTaskBase:
         logging.Logger.data_issues = data_issues
         logger = logging.getLogger()
         logger.propogate = True
+        for handler in logger.handlers:
+            handler.close()
         logger.handlers = []
         formatter = logging.Formatter(
             "%(asctime)s\t%(levelname)s\t%(message)s\t%(task_configuration_name)s"
@@ -213,9 +268,7 @@ class MigrationTaskBase:
 
         # Data issue file formatter
         data_issue_file_formatter = logging.Formatter("%(message)s")
-        data_issue_file_handler = logging.FileHandler(
-            filename=str(self.folder_structure.data_issue_file_path), mode="w"
-        )
+        data_issue_file_handler = BackgroundFileHandler(self.folder_structure.data_issue_file_path)
         data_issue_file_handler.addFilter(LevelFilter(26))
         data_issue_file_handler.setFormatter(data_issue_file_formatter)
         data_issue_file_handler.setLevel(26)
@@ -252,24 +305,59 @@ class MigrationTaskBase:
             elapsed_formatted = "{0:.4g}".format(elapsed)
             logging.info(f"{num_processed:,} records processed. Recs/sec: {elapsed_formatted} ")
 
+    def get_number_of_processes(self) -> int:
+        """Returns the number of processes to use for tasks that can run in parallel
+
+        Returns:
+            int: the numberOfProcesses setting, or 1 if processes cannot be forked
+        """
+        if self.task_configuration.number_of_processes == 1:
+            return 1
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logging.warning(
+                "Worker processes cannot be forked on this platform. "
+                "Transforming the records in a single process"
+            )
+            return 1
+        return self.task_configuration.number_of_processes
+
     def do_work_marc_transformer(
         self,
+        number_of_processes: int = 1,
     ):
         logging.info("Starting....")
         if self.folder_structure.failed_marc_recs_file.is_file():
             os.remove(self.folder_structure.failed_marc_recs_file)
             logging.info("Removed failed marc records file to prevent duplicating data")
-        with open(self.folder_structure.created_objects_path, "w+") as created_records_file:
-            self.processor = MarcFileProcessor(
-                self.mapper, self.folder_structure, created_records_file
-            )
-            for file_def in self.task_configuration.files:
-                MARCReaderWrapper.process_single_file(
-                    file_def,
-                    self.processor,
-                    self.folder_structure.failed_marc_recs_file,
+        with self.open_results_writer(
+            self.folder_structure.created_objects_path
+        ) as created_records_file:
+            srs_records_file = None
+            if self.task_configuration.create_source_records:
+                srs_records_file = self.open_results_writer(self.folder_structure.srs_records_path)
+            if number_of_processes > 1:
+                self.processor = ParallelMarcFileProcessor(
+                    self.mapper,
                     self.folder_structure,
+                    created_records_file,
+                    number_of_processes,
+                    srs_records_file,
                 )
+                for file_def in self.task_configuration.files:
+                    self.processor.process_file(
+                        file_def, self.folder_structure.failed_marc_recs_file
+                    )
+            else:
+                self.processor = MarcFileProcessor(
+                    self.mapper, self.folder_structure, created_records_file, srs_records_file
+                )
+                for file_def in self.task_configuration.files:
+                    MARCReaderWrapper.process_single_file(
+                        file_def,
+                        self.processor,
+                        self.folder_structure.failed_marc_recs_file,
+                        self.folder_structure,
+                    )
 
     def load_ref_data_mapping_file(
         self,
@@ -83,8 +83,8 @@ class OrdersTransformer(MigrationTaskBase):
             self.folio_client,
             self.library_configuration,
             self.orders_map,
-            self.load_id_map(self.folder_structure.organizations_id_map_path, True),
-            self.load_id_map(self.folder_structure.instance_id_map_path, True),
+            self.load_id_map(self.folder_structure.organizations_id_map_path, True, True),
+            self.load_id_map(self.folder_structure.instance_id_map_path, True, True),
             self.load_ref_data_mapping_file(
                 "acquisitionMethod",
                 self.folder_structure.mapping_files_folder
@@ -152,8 +152,8 @@ class OrdersTransformer(MigrationTaskBase):
         return files
 
     def process_single_file(self, filename):
-        with open(filename, encoding="utf-8-sig") as records_file, open(
-            self.folder_structure.created_objects_path, "w+"
+        with open(filename, encoding="utf-8-sig") as records_file, self.open_results_writer(
+            self.folder_structure.created_objects_path
         ) as results_file:
             self.mapper.migration_report.add_general_statistics(
                 i18n.t("Number of files processed")
@@ -216,6 +216,7 @@ class OrdersTransformer(MigrationTaskBase):
 
     def do_work(self):
         logging.info("Getting started!")
+        self.mapper.prefetch_folio_organizations(self.files)
         for file in self.files:
             logging.info("Processing %s", file)
             try:
@@ -232,6 +233,7 @@ class OrdersTransformer(MigrationTaskBase):
 
     def wrap_up(self):
         logging.info("Done. Wrapping up...")
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             logging.info(
                 "Writing migration- and mapping report to %s",
@@ -27,11 +27,15 @@ from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base
 from folio_migration_tools.mapping_file_transformation.organization_mapper import (
     OrganizationMapper,
 )
+from folio_migration_tools.migration_report import ReportMetric
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
 csv.field_size_limit(int(ctypes.c_ulong(-1).value // 2))
 
+OBJECTS_IN_SOURCE_FILE = ReportMetric("GeneralStatistics", "Number of objects in source data file")
+ORGANIZATIONS_CREATED = ReportMetric("GeneralStatistics", "Number of organizations created")
+
 
 # Read files and do some work
 class OrganizationTransformer(MigrationTaskBase):
@@ -135,8 +139,8 @@ class OrganizationTransformer(MigrationTaskBase):
         return files
 
     def process_single_file(self, filename):
-        with open(filename, encoding="utf-8-sig") as records_file, open(
-            self.folder_structure.created_objects_path, "w+"
+        with open(filename, encoding="utf-8-sig") as records_file, self.open_results_writer(
+            self.folder_structure.created_objects_path
         ) as results_file:
             self.mapper.migration_report.add_general_statistics(
                 i18n.t("Number of files processed")
@@ -181,12 +185,8 @@ class OrganizationTransformer(MigrationTaskBase):
                 except Exception as excepion:
                     self.mapper.handle_generic_exception(idx, excepion)
 
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Number of objects in source data file")
-                )
-                self.mapper.migration_report.add_general_statistics(
-                    i18n.t("Number of organizations created")
-                )
+                self.mapper.migration_report.count(OBJECTS_IN_SOURCE_FILE)
+                self.mapper.migration_report.count(ORGANIZATIONS_CREATED)
 
                 # TODO Rewrite to base % value on number of rows in file
                 if idx > 1 and idx % 50 == 0:
@@ -221,6 +221,7 @@ class OrganizationTransformer(MigrationTaskBase):
     def wrap_up(self):
         logging.info("Done. Transformer wrapping up...")
         self.extradata_writer.flush()
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             logging.info(
                 "Writing migration- and mapping report to %s",
@@ -3,7 +3,8 @@ import json
 import logging
 import sys
 import time
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Optional
 
 import i18n
 from folio_uuid.folio_namespaces import FOLIONamespaces
@@ -49,6 +50,7 @@ class RequestsMigrator(MigrationTaskBase):
             self.folio_client,
             "",
             self.migration_report,
+            self.http_session,
         )
         try:
             logging.info("Attempting to retrieve tenant timezone configuration...")
@@ -63,35 +65,36 @@ class RequestsMigrator(MigrationTaskBase):
             logging.info('Tenant locale settings not available. Using "UTC".')
             self.tenant_timezone_str = "UTC"
         self.tenant_timezone = ZoneInfo(self.tenant_timezone_str)
+        self.item_barcodes = self.circulation_helper.load_migrated_item_barcodes(
+            task_configuration.item_files, self.folder_structure
+        )
+        self.user_barcodes = self.circulation_helper.load_migrated_user_barcodes(
+            task_configuration.patron_files, self.folder_structure
+        )
         with open(
             self.folder_structure.legacy_records_folder
             / task_configuration.open_requests_file.file_name,
             "r",
             encoding="utf-8",
         ) as requests_file:
-            self.semi_valid_legacy_requests = list(
-                self.load_and_validate_legacy_requests(
-                    InsensitiveDictReader(requests_file, dialect="tsv")
-                )
-            )
-            logging.info(
-                "Loaded and validated %s requests in file",
-                len(self.semi_valid_legacy_requests),
+            legacy_requests = self.load_and_validate_legacy_requests(
+                InsensitiveDictReader(requests_file, dialect="tsv")
             )
-        if any(self.task_configuration.item_files) or any(self.task_configuration.patron_files):
-            self.valid_legacy_requests = list(self.check_barcodes())
-            logging.info(
-                "Loaded and validated %s requests against barcodes",
-                len(self.valid_legacy_requests),
-            )
-        else:
-            logging.info(
-                "No item or user files supplied. Not validating against"
-                "previously migrated objects"
-            )
-            self.valid_legacy_requests = self.semi_valid_legacy_requests
-
-        self.valid_legacy_requests.sort(key=lambda x: x.request_date)
+            if any(self.task_configuration.item_files) or any(
+                self.task_configuration.patron_files
+            ):
+                legacy_requests = self.check_barcodes(legacy_requests)
+            else:
+                logging.info(
+                    "No item or user files supplied. Not validating against"
+                    "previously migrated objects"
+                )
+            # The requests are validated and checked as they are read, and only the valid
+            # ones are kept, sorted by request date
+            self.valid_legacy_requests = sorted(legacy_requests, key=lambda x: x.request_date)
+        logging.info(
+            "Loaded and validated %s requests in file", len(self.valid_legacy_requests)
+        )
         logging.info("Sorted the list of requests by request date")
 
         self.t0 = time.time()
@@ -150,7 +153,7 @@ class RequestsMigrator(MigrationTaskBase):
         if self.task_configuration.starting_row > 1:
             logging.info(f"Skipping {(self.task_configuration.starting_row-1)} records")
         for num_requests, legacy_request in enumerate(
-            self.valid_legacy_requests[self.task_configuration.starting_row - 1 :],
+            islice(self.valid_legacy_requests, self.task_configuration.starting_row - 1, None),
             start=1,
         ):
             t0_migration = time.time()
@@ -158,7 +161,10 @@ class RequestsMigrator(MigrationTaskBase):
                 res, legacy_request = self.prepare_legacy_request(legacy_request)
                 if res:
                     if self.circulation_helper.create_request(
-                        self.folio_client, legacy_request, self.migration_report
+                        self.folio_client,
+                        legacy_request,
+                        self.migration_report,
+                        self.http_session,
                     ):
                         self.migration_report.add_general_statistics(
                             i18n.t("Successfully migrated requests")
@@ -209,20 +215,11 @@ class RequestsMigrator(MigrationTaskBase):
             for failed in self.failed_requests:
                 writer.writerow(failed.to_source_dict())
 
-    def check_barcodes(self):
-        user_barcodes = set()
-        item_barcodes = set()
-        self.circulation_helper.load_migrated_item_barcodes(
-            item_barcodes, self.task_configuration.item_files, self.folder_structure
-        )
-        self.circulation_helper.load_migrated_user_barcodes(
-            user_barcodes, self.task_configuration.patron_files, self.folder_structure
-        )
-
+    def check_barcodes(self, legacy_requests: Iterable[LegacyRequest]):
         request: LegacyRequest
-        for request in self.semi_valid_legacy_requests:
-            has_item_barcode = request.item_barcode in item_barcodes
-            has_patron_barcode = request.patron_barcode in user_barcodes
+        for request in legacy_requests:
+            has_item_barcode = request.item_barcode in self.item_barcodes
+            has_patron_barcode = request.patron_barcode in self.user_barcodes
             if has_item_barcode and has_patron_barcode:
                 self.migration_report.add_general_statistics(
                     i18n.t("Requests successfully verified against migrated users and items")
@@ -7,7 +7,6 @@ import traceback
 from typing import Dict
 from urllib.error import HTTPError
 
-import httpx
 import i18n
 from folio_uuid.folio_namespaces import FOLIONamespaces
 
@@ -116,18 +115,20 @@ class ReservesMigrator(MigrationTaskBase):
             for _k, failed_reserve in self.failed.items():
                 writer.writerow(failed_reserve[0])
 
-    def check_barcodes(self):
+    def check_barcodes(self, legacy_reserves):
         """Stub for extension.
 
+        Args:
+            legacy_reserves (_type_): _description_
+
         Yields:
             _type_: _description_
         """
-        item_barcodes = set()
-        self.circulation_helper.load_migrated_item_barcodes(
-            item_barcodes, self.task_configuration.item_files, self.folder_structure
+        item_barcodes = self.circulation_helper.load_migrated_item_barcodes(
+            self.task_configuration.item_files, self.folder_structure
         )
-        for loan in self.semi_valid_legacy_loans:
-            has_item_barcode = loan.item_barcode in item_barcodes or not any(item_barcodes)
+        for loan in legacy_reserves:
+            has_item_barcode = loan.item_barcode in item_barcodes or not item_barcodes
             if has_item_barcode:
                 self.migration_report.add_general_statistics(
                     i18n.t("Reserve verified against migrated item")
@@ -171,13 +172,13 @@ class ReservesMigrator(MigrationTaskBase):
         full_url = f"{self.folio_client.okapi_url}{url}"
         try:
             if verb == "PUT":
-                resp = httpx.put(
+                resp = self.http_session.put(
                     full_url,
                     headers=self.folio_client.okapi_headers,
                     json=data_dict,
                 )
             elif verb == "POST":
-                resp = httpx.post(
+                resp = self.http_session.post(
                     full_url,
                     headers=self.folio_client.okapi_headers,
                     json=data_dict,
@@ -19,9 +19,13 @@ from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base
     MappingFileMapperBase,
 )
 from folio_migration_tools.mapping_file_transformation.user_mapper import UserMapper
+from folio_migration_tools.migration_report import ReportMetric
 from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
+from folio_migration_tools.results_index import BARCODE_INDEX, ResultsIndexWriter
 from folio_migration_tools.task_configuration import AbstractTaskConfiguration
 
+USERS_TRANSFORMED = ReportMetric("GeneralStatistics", "Successful user transformations")
+
 
 class UserTransformer(MigrationTaskBase):
     class TaskConfiguration(AbstractTaskConfiguration):
@@ -109,11 +113,12 @@ class UserTransformer(MigrationTaskBase):
             self.folder_structure.legacy_records_folder / self.task_config.user_file.file_name
         )
 
+        barcode_index = ResultsIndexWriter(
+            self.folder_structure.created_objects_path, BARCODE_INDEX
+        )
         try:
-            with open(
-                self.folder_structure.created_objects_path,
-                "w+",
-                encoding="utf-8",
+            with self.open_results_writer(
+                self.folder_structure.created_objects_path
             ) as results_file:
                 with open(source_path, encoding="utf8") as object_file:
                     logging.info(f"processing {source_path}")
@@ -135,13 +140,12 @@ class UserTransformer(MigrationTaskBase):
                                 legacy_user, folio_user, index_or_id
                             )
                             self.clean_user(folio_user, index_or_id)
-                            results_file.write(f"{json.dumps(folio_user)}\n")
+                            Helper.write_to_file(results_file, folio_user)
+                            barcode_index.add(folio_user.get("barcode"), folio_user["id"])
                             if num_users == 1:
                                 logging.info("## First FOLIO  user")
                                 logging.info(json.dumps(folio_user, indent=4, sort_keys=True))
-                            self.mapper.migration_report.add_general_statistics(
-                                i18n.t("Successful user transformations")
-                            )
+                            self.mapper.migration_report.count(USERS_TRANSFORMED)
                             if num_users % 1000 == 0:
                                 logging.info(f"{num_users} users processed.")
                         except TransformationRecordFailedError as tre:
@@ -168,6 +172,7 @@ class UserTransformer(MigrationTaskBase):
                             logging.error(ee, exc_info=True)
 
                         self.total_records = num_users
+            barcode_index.write()
         except FileNotFoundError as fnfe:
             logging.exception("File not found")
             print(f"\n{fnfe}")
@@ -175,6 +180,7 @@ class UserTransformer(MigrationTaskBase):
 
     def wrap_up(self):
         self.extradata_writer.flush()
+        self.mapper.report_ref_data_mapping_caches()
         with open(self.folder_structure.migration_reports_file, "w") as migration_report_file:
             self.mapper.migration_report.write_migration_report(
                 i18n.t("Users transformation report"),
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Set
+
+from folioclient import FolioClient
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.library_configuration import SnapshotMode
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOTS_FOLDER_NAME = "reference_data_snapshots"
+# Single objects that are reference data, and not settings changed by the migration
+SNAPSHOT_OBJECT_PATHS = ("/mapping-rules/",)
+
+
+class ReferenceDataSnapshot:
+    """A versioned store of the schemas, mapping rules and reference data the tasks fetch
+    when they start, under reference_data_snapshots/<tenant>/<FOLIO release> in the base
+    folder. Every entry is a JSON file of its own, and manifest.json lists them.
+
+    In the use mode, entries are read from the store, and fetched and stored when missing.
+    In the refresh mode, every entry is fetched again the first time it is asked for in the
+    run. In the offline mode, missing entries stop the task instead of being fetched.
+    """
+
+    def __init__(self, base_folder: Path, folio_release: str, mode: SnapshotMode):
+        self.folder = Path(base_folder) / SNAPSHOTS_FOLDER_NAME
+        self.folio_release = folio_release
+        self.mode = mode
+        self.entries: Dict[Path, str] = {}
+        self.refreshed: Set[Path] = set()
+
+    def get(self, tenant_id: str, name: str, fetch: Callable[[], Any]) -> Any:
+        """Returns an entry from the store, or fetches it
+
+        Args:
+            tenant_id (str): The tenant the entry belongs to
+            name (str): Identifies the entry, like the path it is fetched from
+            fetch (Callable[[], Any]): Fetches the entry, returning JSON serializable data
+
+        Raises:
+            TransformationProcessError: If the entry is missing in offline mode
+
+        Returns:
+            Any: A copy of the entry of its own, free to be changed by the caller
+        """
+        if self.mode == SnapshotMode.off:
+            return fetch()
+        folder = self.folder / tenant_id / self.folio_release
+        path = folder / f"{hashlib.sha1(name.encode('utf-8')).hexdigest()[:20]}.json"
+        if self.mode == SnapshotMode.refresh and path not in self.refreshed:
+            self.refreshed.add(path)
+            self.entries.pop(path, None)
+        elif (data := self.load(path, name)) is not None:
+            return json.loads(data)
+        elif self.mode == SnapshotMode.offline:
+            raise TransformationProcessError(
+                "",
+                "Reference data snapshot is set to offline, but this is not in the snapshot. "
+                "Run the task with --refresh_reference_data to add it",
+                name,
+            )
+        logging.info("Fetching %s for the reference data snapshot", name)
+        fetched = fetch()
+        if fetched is None:
+            return None
+        try:
+            data = json.dumps(fetched)
+        except (TypeError, ValueError) as error:
+            logging.warning("%s could not be stored in the snapshot: %s", name, error)
+            return fetched
+        self.store(folder, path, name, data)
+        return json.loads(data)
+
+    def load(self, path: Path, name: str):
+        if path in self.entries:
+            return self.entries[path]
+        try:
+            with open(path, encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+        except FileNotFoundError:
+            return None
+        except ValueError as error:
+            logging.warning("Ignoring broken snapshot entry %s: %s", path, error)
+            return None
+        if entry.get("formatVersion") != SNAPSHOT_FORMAT_VERSION or entry.get("name") != name:
+            return None
+        self.entries[path] = json.dumps(entry["data"])
+        return self.entries[path]
+
+    def store(self, folder: Path, path: Path, name: str, data: str):
+        folder.mkdir(parents=True, exist_ok=True)
+        fetched = datetime.now(timezone.utc).isoformat()
+        write_atomically(
+            path,
+            '{"formatVersion": %s, "name": %s, "fetched": %s, "data": %s}'
+            % (SNAPSHOT_FORMAT_VERSION, json.dumps(name), json.dumps(fetched), data),
+        )
+        self.entries[path] = data
+        manifest_path = folder / "manifest.json"
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        if manifest.get("formatVersion") != SNAPSHOT_FORMAT_VERSION:
+            manifest = {"formatVersion": SNAPSHOT_FORMAT_VERSION, "entries": {}}
+        manifest["entries"][name] = {"file": path.name, "fetched": fetched}
+        write_atomically(manifest_path, json.dumps(manifest, indent=4))
+
+
+def write_atomically(path: Path, text: str):
+    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    temp_path.write_text(text, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+class SnapshotFolioClient(FolioClient):
+    """A FolioClient reading schemas from GitHub, mapping rules and reference data through a
+    ReferenceDataSnapshot. Reference data is what is fetched in full, without a query of its
+    own. Lookups of records, and everything else, go to FOLIO as usual.
+    """
+
+    def __init__(
+        self,
+        okapi_url,
+        tenant_id,
+        username,
+        password,
+        reference_data_snapshot: ReferenceDataSnapshot,
+        ssl_verify=True,
+    ):
+        self.reference_data_snapshot = reference_data_snapshot
+        super().__init__(okapi_url, tenant_id, username, password, ssl_verify)
+
+    def snapshot(self, name: str, fetch: Callable[[], Any]) -> Any:
+        # The ECS tenant header, if set by the task, decides what tenant is queried
+        tenant_id = self._okapi_headers.get("x-okapi-tenant") or self.tenant_id
+        return self.reference_data_snapshot.get(tenant_id, name, fetch)
+
+    def get_from_github(self, owner, repo, filepath: str, ssl_verify=True):  # noqa: S107
+        return self.snapshot(
+            f"github:{owner}/{repo}/{filepath}",
+            lambda: FolioClient.get_from_github(self, owner, repo, filepath, ssl_verify),
+        )
+
+    def folio_get_single_object(self, path):
+        if not path.startswith(SNAPSHOT_OBJECT_PATHS):
+            return super().folio_get_single_object(path)
+        return self.snapshot(
+            f"folio:{path}", lambda: FolioClient.folio_get_single_object(self, path)
+        )
+
+    def folio_get_all(self, path, key=None, query=None, limit=10, **kwargs):
+        if kwargs or query not in (None, "", self.cql_all):
+            return super().folio_get_all(path, key, query, limit, **kwargs)
+        return iter(
+            self.snapshot(
+                f"folio:{path} {key} {query or ''}".rstrip(),
+                lambda: list(FolioClient.folio_get_all(self, path, key, query, 1000)),
+            )
+        )
+
+
+def get_snapshotted(folio_client: FolioClient, name: str, fetch: Callable[[], Any]) -> Any:
+    """Fetches something through the reference data snapshot of the FOLIO client, if it has
+    one. For what is fetched from elsewhere than FolioClient, like the acquisitions schemas.
+    """
+    if isinstance(folio_client, SnapshotFolioClient):
+        return folio_client.snapshot(name, fetch)
+    return fetch()
@@ -0,0 +1,164 @@
+import collections
+import heapq
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from folio_migration_tools.id_map_store import IdMapStore
+
+BARCODE_INDEX = "barcode"
+HRID_INDEX = "hrid"
+MERGE_KEY_INDEX = "merge_key"
+MAX_INDEX_ENTRIES_IN_MEMORY = 500000
+
+
+class ResultsIndex(IdMapStore):
+    """A sidecar index of a results file, mapping one property of the records written to the
+    file, like the barcode or the HRID, to the FOLIO id of the record.
+
+    The transformers write the index next to the results file, after the file is written,
+    as <results file>.<index name>.idmap. It is an ID map store, sorted by the property, so
+    other tasks can look records up, or list the values, without parsing the results file.
+    """
+
+    def __getitem__(self, key) -> str:
+        return super().__getitem__(key)[1]
+
+    @staticmethod
+    def index_path(results_path, index_name: str) -> Path:
+        results_path = Path(results_path)
+        return results_path.with_name(f"{results_path.name}.{index_name}.idmap")
+
+    @staticmethod
+    def is_up_to_date(results_path, index_name: str) -> bool:
+        """Checks if there is an index of the results file that is not older than the file"""
+        index_path = ResultsIndex.index_path(results_path, index_name)
+        return (
+            index_path.is_file()
+            and os.path.isfile(results_path)
+            and os.stat(index_path).st_mtime_ns >= os.stat(results_path).st_mtime_ns
+        )
+
+    @classmethod
+    def open(cls, results_path, index_name: str) -> Optional["ResultsIndex"]:
+        """Opens the index of a results file
+
+        Args:
+            results_path (_type_): The results file
+            index_name (str): The name of the index, like barcode or hrid
+
+        Returns:
+            Optional[ResultsIndex]: The index, or None if there is no index that is up to date
+            with the results file
+        """
+        if not cls.is_up_to_date(results_path, index_name):
+            return None
+        index_path = cls.index_path(results_path, index_name)
+        try:
+            return cls(index_path)
+        except (OSError, ValueError) as error:
+            logging.warning("Ignoring broken results index %s: %s", index_path, error)
+            return None
+
+
+class ResultsIndexWriter:
+    """Collects the values of a property of the records written to a results file, together
+    with the FOLIO ids of the records, and writes them as a ResultsIndex once the results file
+    is written. Should a value appear more than once, the last record wins.
+
+    Like the HoldingsSpillMerger, the writer only keeps a buffer of entries in memory. When
+    the buffer is full, it is sorted and written to a spill file in a temporary folder next
+    to the results file, and the spill files are merged into the index at the end.
+    """
+
+    def __init__(
+        self,
+        results_path,
+        index_name: str,
+        max_entries_in_memory: int = MAX_INDEX_ENTRIES_IN_MEMORY,
+    ):
+        self.results_path = Path(results_path)
+        self.index_name = index_name
+        self.max_entries_in_memory = max_entries_in_memory
+        self.buffer: List[Tuple[str, int, str]] = []
+        self.spill_folder: Optional[Path] = None
+        self.spill_files: List[Path] = []
+        self.entries_added = 0
+
+    def add(self, key: str, folio_id: str):
+        if key:
+            self.buffer.append((str(key), self.entries_added, folio_id))
+            self.entries_added += 1
+            if len(self.buffer) >= self.max_entries_in_memory:
+                self.spill()
+
+    def add_all(self, entries: Iterable[Tuple[str, str]]):
+        for key, folio_id in entries:
+            self.add(key, folio_id)
+
+    def spill(self):
+        if not self.spill_folder:
+            self.spill_folder = Path(
+                tempfile.mkdtemp(prefix=f"{self.index_name}_index_", dir=self.results_path.parent)
+            )
+        self.buffer.sort()
+        spill_path = self.spill_folder / f"spill_{len(self.spill_files)}.jsonl"
+        write_entries(spill_path, self.buffer)
+        self.spill_files.append(spill_path)
+        self.buffer = []
+
+    def write(self):
+        """Writes the index. Call it after the results file is closed, since an index older
+        than the results file is not used.
+        """
+        index_path = ResultsIndex.index_path(self.results_path, self.index_name)
+        try:
+            self.buffer.sort()
+            runs = [read_entries(spill_path) for spill_path in self.spill_files]
+            runs.append(iter(self.buffer))
+            # Entries with the same key come out in the order they were added. Keep the last
+            unique_entries = (
+                collections.deque(entries, maxlen=1)[0]
+                for _, entries in itertools.groupby(heapq.merge(*runs), key=lambda e: e[0])
+            )
+            if not self.spill_files:
+                rows = [encode_row(entry) for entry in unique_entries]
+                IdMapStore.write_sorted(index_path, rows)
+                return
+            unique_path = self.spill_folder / "unique.jsonl"
+            count = write_entries(unique_path, unique_entries)
+            IdMapStore.write_sorted_rows(
+                index_path, count, lambda: map(encode_row, read_entries(unique_path))
+            )
+        finally:
+            self.buffer = []
+            self.spill_files = []
+            if self.spill_folder:
+                shutil.rmtree(self.spill_folder, ignore_errors=True)
+                self.spill_folder = None
+
+
+def write_entries(path: Path, entries: Iterable[Tuple[str, int, str]]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as entries_file:
+        for entry in entries:
+            entries_file.write(f"{json.dumps(entry)}\n")
+            count += 1
+    return count
+
+
+def read_entries(path: Path) -> Iterator[Tuple[str, int, str]]:
+    with open(path, encoding="utf-8") as entries_file:
+        for line in entries_file:
+            key, order, folio_id = json.loads(line)
+            yield key, order, folio_id
+
+
+def encode_row(entry: Tuple[str, int, str]) -> Tuple[bytes, bytes]:
+    # Keys sorted as strings are sorted as UTF-8 bytes too, as the store needs them
+    return entry[0].encode("utf-8"), json.dumps([entry[2]]).encode("utf-8")
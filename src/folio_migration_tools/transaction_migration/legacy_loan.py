@@ -3,8 +3,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from dateutil import tz
-from dateutil.parser import parse
 
+from folio_migration_tools.date_parser import parse_date
 from folio_migration_tools.migration_report import MigrationReport
 
 utc = ZoneInfo("UTC")
@@ -52,7 +52,7 @@ class LegacyLoan(object):
             ):
                 self.errors.append(("Empty properties in legacy data", prop))
         try:
-            temp_date_due: datetime = parse(legacy_loan_dict["due_date"])
+            temp_date_due: datetime = parse_date(legacy_loan_dict["due_date"])
             if temp_date_due.tzinfo != tz.UTC:
                 temp_date_due = temp_date_due.replace(tzinfo=self.tenant_timezone)
                 self.report(
@@ -68,9 +68,9 @@ class LegacyLoan(object):
         except Exception as ee:
             logging.error(ee)
             self.errors.append(("Parse date failure. Setting UTC NOW", "due_date"))
-            temp_date_due = datetime.now(ZoneInfo("UTC"))
+            temp_date_due = datetime.now(utc)
         try:
-            temp_date_out: datetime = parse(legacy_loan_dict["out_date"])
+            temp_date_out: datetime = parse_date(legacy_loan_dict["out_date"])
             if temp_date_out.tzinfo != tz.UTC:
                 temp_date_out = temp_date_out.replace(tzinfo=self.tenant_timezone)
                 self.report(
@@ -78,9 +78,8 @@ class LegacyLoan(object):
                     f"setting tzinfo to tenant timezone ({self.tenant_timezone})"
                 )
         except Exception:
-            temp_date_out = datetime.now(
-                ZoneInfo("UTC")
-            )  # TODO: Consider moving this assignment block above the temp_date_due
+            # TODO: Consider moving this assignment block above the temp_date_due
+            temp_date_out = datetime.now(utc)
             self.errors.append(("Parse date failure. Setting UTC NOW", "out_date"))
 
         # good to go, set properties
@@ -125,9 +124,9 @@ class LegacyLoan(object):
 
     def make_utc(self):
         try:
-            if self.tenant_timezone != ZoneInfo("UTC"):
-                self.due_date = self.due_date.astimezone(ZoneInfo("UTC"))
-                self.out_date = self.out_date.astimezone(ZoneInfo("UTC"))
+            if self.tenant_timezone != utc:
+                self.due_date = self.due_date.astimezone(utc)
+                self.out_date = self.out_date.astimezone(utc)
         except Exception:
             self.errors.append(("UTC correction issues", "both dates"))
 
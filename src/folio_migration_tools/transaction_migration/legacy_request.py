@@ -4,9 +4,9 @@ import uuid
 from zoneinfo import ZoneInfo
 
 from dateutil import tz
-from dateutil.parser import parse
 
 from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
+from folio_migration_tools.date_parser import parse_date
 
 utc = ZoneInfo("UTC")
 
@@ -47,20 +47,22 @@ class LegacyRequest(object):
             self.errors.append((f"{self.request_type} not allowd", "request_type"))
 
         try:
-            temp_request_date: datetime.datetime = parse(legacy_request_dict["request_date"])
+            temp_request_date: datetime.datetime = parse_date(
+                legacy_request_dict["request_date"]
+            )
             if temp_request_date.tzinfo != tz.UTC:
                 temp_request_date = temp_request_date.replace(tzinfo=self.tenant_timezone)
         except Exception:
             self.errors.append(("Parse date failure. Setting UTC NOW", "request_date"))
-            temp_request_date = datetime.now(ZoneInfo("UTC"))
+            temp_request_date = datetime.now(utc)
         try:
-            temp_expiration_date: datetime.datetime = parse(
+            temp_expiration_date: datetime.datetime = parse_date(
                 legacy_request_dict["request_expiration_date"]
             )
             if temp_expiration_date.tzinfo != tz.UTC:
                 temp_expiration_date = temp_expiration_date.replace(tzinfo=self.tenant_timezone)
         except Exception:
-            temp_expiration_date = datetime.now(ZoneInfo("UTC"))
+            temp_expiration_date = datetime.now(utc)
             self.errors.append(("Parse date failure. Setting UTC NOW", "request_expiration_date"))
         if temp_expiration_date.hour == 0 and temp_expiration_date.minute == 0:
             temp_expiration_date = temp_expiration_date.replace(hour=23, minute=59)
@@ -139,10 +141,8 @@ class LegacyRequest(object):
 
     def make_request_utc(self):
         try:
-            if self.tenant_timezone != ZoneInfo("UTC"):
-                self.request_date = self.request_date.astimezone(ZoneInfo("UTC"))
-                self.request_expiration_date = self.request_expiration_date.astimezone(
-                    ZoneInfo("UTC")
-                )
+            if self.tenant_timezone != utc:
+                self.request_date = self.request_date.astimezone(utc)
+                self.request_expiration_date = self.request_expiration_date.astimezone(utc)
         except Exception:
             self.errors.append(("UTC correction issues", "both dates"))
@@ -0,0 +1,70 @@
+from folio_migration_tools.adaptive_batch_controller import AdaptiveBatchController
+from folio_migration_tools.migration_report import MigrationReport
+
+
+def make_controller(start=100, min_size=10, max_size=100, concurrency=4, target=10.0):
+    return AdaptiveBatchController(
+        MigrationReport(), start, min_size, max_size, concurrency, target
+    )
+
+
+def test_start_values_are_reported():
+    controller = make_controller(start=50)
+    assert controller.batch_size == 50
+    assert controller.concurrency == 4
+    report = controller.migration_report.report["AdaptiveBatching"]
+    assert report["blurb_id"] == "AdaptiveBatching"
+    assert report["Start batch size"] == 50
+    assert report["Final batch size"] == 50
+
+
+def test_413_halves_batch_size_and_caps_growth():
+    controller = make_controller()
+    controller.register_response(413, 1.0, 100_000, 100)
+    assert controller.batch_size == 50
+    assert controller.max_request_bytes == 80_000
+    for _ in range(50):
+        controller.register_response(201, 0.1, 50_000, 50)
+    assert controller.batch_size <= 80
+
+
+def test_server_errors_lower_batch_size_and_concurrency():
+    controller = make_controller()
+    controller.register_response(500, 1.0, 1000, 100)
+    assert controller.batch_size == 50
+    assert controller.concurrency == 3
+    controller.register_response(503, 1.0, 1000, 50)
+    controller.register_response(503, 1.0, 1000, 25)
+    controller.register_response(503, 1.0, 1000, 12)
+    assert controller.batch_size == 10
+    assert controller.concurrency == 1
+
+
+def test_slow_responses_shrink_batch_size():
+    controller = make_controller()
+    controller.register_response(201, 20.0, 1000, 100)
+    assert controller.batch_size == 75
+    report = controller.migration_report.report["AdaptiveBatching"]
+    assert report["Batch size decreased due to slow response"] == 1
+
+
+def test_fast_responses_grow_batch_size_then_concurrency():
+    controller = make_controller(start=20, max_size=22, concurrency=2)
+    controller.concurrency = 1
+    for _ in range(controller.growth_streak):
+        controller.register_response(201, 0.1, 1000, 20)
+    assert controller.batch_size == 22
+    assert controller.concurrency == 1
+    for _ in range(controller.growth_streak):
+        controller.register_response(201, 0.1, 1000, 22)
+    assert controller.batch_size == 22
+    assert controller.concurrency == 2
+
+
+def test_no_growth_while_recent_failures():
+    controller = make_controller(start=50)
+    controller.register_response(500, 1.0, 1000, 50)
+    size = controller.batch_size
+    for _ in range(controller.growth_streak * 2):
+        controller.register_response(201, 0.1, 1000, size)
+    assert controller.batch_size == size
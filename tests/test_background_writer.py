@@ -0,0 +1,65 @@
+import json
+import logging
+
+import pytest
+
+from folio_migration_tools.background_writer import (
+    BackgroundFileHandler,
+    BackgroundWriter,
+    open_results_file,
+    skip_bytes,
+)
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.helper import Helper
+from folio_migration_tools.library_configuration import ResultsCompression
+
+
+@pytest.mark.parametrize("compression", [ResultsCompression.none, ResultsCompression.gzip])
+def test_records_are_written_in_order_and_read_back(tmp_path, compression):
+    path = tmp_path / "folio_items.json"
+    records = [{"id": str(i), "barcode": f"bc{i}"} for i in range(2500)]
+    with BackgroundWriter(path, compression, batch_size=100) as writer:
+        for record in records:
+            Helper.write_to_file(writer, record)
+    with open_results_file(path) as results_file:
+        assert [json.loads(line) for line in results_file] == records
+
+
+def test_flush_writes_everything_written_so_far(tmp_path):
+    path = tmp_path / "folio_items.json"
+    writer = BackgroundWriter(path)
+    writer.write("first\n")
+    assert path.read_text() == ""
+    writer.flush()
+    assert path.read_text() == "first\n"
+    writer.close()
+
+
+def test_skip_bytes_in_compressed_file(tmp_path):
+    path = tmp_path / "srs.json"
+    with BackgroundWriter(path, ResultsCompression.gzip) as writer:
+        writer.writelines(["a\n", "bb\n", "ccc\n"])
+    with open_results_file(path, "rb") as rows:
+        skip_bytes(rows, 5)
+        assert list(rows) == [b"ccc\n"]
+
+
+def test_write_errors_are_raised_in_the_writing_thread(tmp_path):
+    writer = BackgroundWriter(tmp_path / "folio_items.json", batch_size=1)
+    writer.file.close()
+    writer.write("lost\n")
+    with pytest.raises(TransformationProcessError):
+        writer.close()
+
+
+def test_background_file_handler(tmp_path):
+    path = tmp_path / "data_issues.tsv"
+    handler = BackgroundFileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger("test_background_file_handler")
+    logger.addHandler(handler)
+    logger.warning("DATA ISSUE\t%s\t%s\t%s", "b1", "No title", "")
+    handler.flush()
+    assert path.read_text() == "DATA ISSUE\tb1\tNo title\t\n"
+    logger.removeHandler(handler)
+    handler.close()
@@ -0,0 +1,40 @@
+import json
+import os
+
+from folio_migration_tools.barcode_index import BarcodeIndex
+
+
+def write_items(path, barcodes):
+    with open(path, "w") as items_file:
+        for i, barcode in enumerate(barcodes):
+            items_file.write(json.dumps({"id": str(i), "barcode": barcode}) + "\n")
+
+
+def test_barcode_index_is_a_set_of_barcodes():
+    index = BarcodeIndex()
+    for i in range(5000):
+        index.add(f"item{i}")
+    index.add("item1")
+    assert len(index) == 5000
+    assert "item4999" in index
+    assert "item5000" not in index
+    assert None not in index
+
+
+def test_from_results_files_saves_and_reuses_the_index(tmp_path):
+    items_path = tmp_path / "folio_items.json"
+    index_path = tmp_path / "barcode_index_items.bin"
+    write_items(items_path, ["b1", "b2", ""])
+    index = BarcodeIndex.from_results_files([items_path], index_path)
+    assert len(index) == 2
+    assert index_path.exists()
+
+    # A saved index is used as long as the results files stay the same
+    stat = os.stat(items_path)
+    write_items(items_path, ["x1", "x2", ""])
+    os.utime(items_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert "b1" in BarcodeIndex.from_results_files([items_path], index_path)
+
+    write_items(items_path, ["b1", "b2", "b3"])
+    index = BarcodeIndex.from_results_files([items_path], index_path)
+    assert "b3" in index
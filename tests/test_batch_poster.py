@@ -1,7 +1,19 @@
-from unittest.mock import Mock
+import asyncio
+import gzip
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock, Mock
 
+import httpx
+import pytest
 from folio_uuid.folio_namespaces import FOLIONamespaces
 
+from folio_migration_tools.adaptive_batch_controller import AdaptiveBatchController
+from folio_migration_tools.checkpoint_journal import CheckpointJournal
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.http_session import FolioHttpSession
+from folio_migration_tools.library_configuration import FileDefinition
+from folio_migration_tools.migration_report import MigrationReport
 from folio_migration_tools.migration_tasks import batch_poster
 from folio_migration_tools.migration_tasks.batch_poster import BatchPoster
 
@@ -67,3 +79,346 @@ def test_get_extradata_endpoint_from_task_configuration():
     )
 
     assert endpoint == "otherdata-endpoint/endpoint"
+
+
+def make_concurrent_poster(tmp_path, object_type, rows, max_concurrent_batches=3):
+    (tmp_path / "records.json").write_text("".join(f"{json.dumps(r)}\n" for r in rows))
+    poster = BatchPoster.__new__(BatchPoster)
+    poster.task_configuration = BatchPoster.TaskConfiguration(
+        name="test",
+        migration_task_type="BatchPoster",
+        object_type=object_type,
+        files=[FileDefinition(file_name="records.json")],
+        batch_size=2,
+        max_concurrent_batches=max_concurrent_batches,
+    )
+    poster.folder_structure = Mock()
+    poster.folder_structure.results_folder = tmp_path
+    poster.folder_structure.failed_recs_path = tmp_path / "failed.txt"
+    poster.checkpoint_journal = CheckpointJournal(tmp_path / "checkpoint.json")
+    poster.migration_report = MigrationReport()
+    poster.api_info = batch_poster.get_api_info(object_type)
+    poster.query_params = {}
+    poster.snapshot_id = "snapshot"
+    poster.batch_size = 2
+    poster.max_concurrent_batches = max_concurrent_batches
+    poster.batch_controller = None
+    poster.in_flight_batches = 0
+    poster.processed = 0
+    poster.failed_batches = 0
+    poster.users_created = 0
+    poster.users_updated = 0
+    poster.num_failures = 0
+    poster.num_posted = 0
+    poster.folio_client = MagicMock()
+    poster.folio_client.okapi_url = "http://okapi"
+    poster.folio_client.okapi_headers = {}
+    poster.folio_client.ssl_verify = True
+    poster.http_session = FolioHttpSession(poster.folio_client)
+    return poster
+
+
+def fake_response(status_code, batch, **kwargs):
+    response = httpx.Response(
+        status_code, request=httpx.Request("POST", "http://okapi", json=batch), **kwargs
+    )
+    response.elapsed = timedelta(seconds=0.1)
+    return response
+
+
+def test_post_files_concurrently_writes_failed_batches(tmp_path):
+    rows = [{"id": str(i)} for i in range(9)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows)
+    in_flight = []
+    max_in_flight = []
+
+    async def do_post_async(batch):
+        in_flight.append(batch)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(batch)
+        if any(r["id"] == "4" for r in batch):
+            return fake_response(422, batch, json={"errors": [{"message": "bad"}]})
+        return fake_response(201, batch)
+
+    poster.do_post_async = do_post_async
+    failed_recs_path = tmp_path / "failed.txt"
+    with open(failed_recs_path, "w") as failed_recs_file:
+        asyncio.run(poster.post_files_concurrently(failed_recs_file))
+    failed = [json.loads(r) for r in failed_recs_path.read_text().splitlines()]
+    assert sorted(r["id"] for r in failed) == ["4", "5"]
+    assert poster.failed_batches == 1
+    assert poster.num_failures == 2
+    assert poster.processed == 9
+    assert 1 < max(max_in_flight) <= 3
+
+
+def test_post_files_concurrently_counts_users(tmp_path):
+    rows = [{"username": str(i)} for i in range(5)]
+    poster = make_concurrent_poster(tmp_path, "Users", rows)
+
+    async def do_post_async(batch):
+        await asyncio.sleep(0.01)
+        return fake_response(
+            200,
+            batch,
+            json={"createdRecords": len(batch) - 1, "updatedRecords": 1, "failedRecords": 0},
+        )
+
+    poster.do_post_async = do_post_async
+    with open(tmp_path / "failed.txt", "w") as failed_recs_file:
+        asyncio.run(poster.post_files_concurrently(failed_recs_file))
+    assert poster.users_created == 2
+    assert poster.users_updated == 3
+    assert poster.num_posted == 5
+    assert poster.num_failures == 0
+
+
+def test_post_files_concurrently_halts_on_process_error(tmp_path):
+    rows = [{"id": str(i)} for i in range(6)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows)
+
+    async def do_post_async(batch):
+        return fake_response(400, batch, text="Bad request")
+
+    poster.do_post_async = do_post_async
+    with open(tmp_path / "failed.txt", "w") as failed_recs_file:
+        with pytest.raises(TransformationProcessError):
+            asyncio.run(poster.post_files_concurrently(failed_recs_file))
+
+
+def test_post_batch_splits_batch_rejected_as_too_large(tmp_path):
+    rows = [{"id": str(i)} for i in range(4)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows, max_concurrent_batches=1)
+    poster.batch_size = 4
+    poster.batch_controller = AdaptiveBatchController(poster.migration_report, 4, 1, 4, 1, 10)
+    posted_sizes = []
+
+    def do_post(batch):
+        posted_sizes.append(len(batch))
+        if len(batch) > 2:
+            return fake_response(413, batch, text="Request Entity Too Large")
+        return fake_response(201, batch)
+
+    poster.do_post = do_post
+    with open(tmp_path / "failed.txt", "w") as failed_recs_file:
+        poster.post_batch(rows, failed_recs_file, 4)
+    assert posted_sizes == [4, 2, 2]
+    assert poster.batch_size == 2
+    assert (tmp_path / "failed.txt").read_text() == ""
+
+
+def test_post_batch_splits_failed_batch_to_isolate_failing_records(tmp_path):
+    rows = [{"id": str(i)} for i in range(8)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows, max_concurrent_batches=1)
+    poster.task_configuration.split_failed_batches = True
+    posted_sizes = []
+
+    def do_post(batch):
+        posted_sizes.append(len(batch))
+        if any(r["id"] == "5" for r in batch):
+            return fake_response(422, batch, json={"errors": [{"message": "bad"}]})
+        return fake_response(201, batch)
+
+    poster.do_post = do_post
+    failed_recs_path = tmp_path / "failed.txt"
+    with open(failed_recs_path, "w") as failed_recs_file:
+        poster.post_batch(rows, failed_recs_file, 8)
+    assert [json.loads(r) for r in failed_recs_path.read_text().splitlines()] == [{"id": "5"}]
+    assert posted_sizes == [8, 4, 4, 2, 1, 1, 2]
+    assert poster.num_posted == 7
+    assert poster.num_failures == 1
+    assert poster.failed_batches == 1
+    details = poster.migration_report.report["Details"]
+    assert details["Failing records isolated by splitting batches"] == 1
+
+
+def test_post_files_concurrently_splits_failed_batches(tmp_path):
+    rows = [{"id": str(i)} for i in range(9)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows)
+    poster.task_configuration.split_failed_batches = True
+
+    async def do_post_async(batch):
+        await asyncio.sleep(0.01)
+        if any(r["id"] in ["2", "3"] for r in batch):
+            return fake_response(422, batch, json={"errors": [{"message": "bad"}]})
+        return fake_response(201, batch)
+
+    poster.do_post_async = do_post_async
+    failed_recs_path = tmp_path / "failed.txt"
+    with open(failed_recs_path, "w") as failed_recs_file:
+        asyncio.run(poster.post_files_concurrently(failed_recs_file))
+    failed = [json.loads(r) for r in failed_recs_path.read_text().splitlines()]
+    assert sorted(r["id"] for r in failed) == ["2", "3"]
+    assert poster.num_posted == 7
+    assert poster.num_failures == 2
+    # Both records were isolated from the same batch
+    assert poster.failed_batches == 1
+
+
+def test_do_work_writes_checkpoints_and_resumes(tmp_path):
+    rows = [{"id": str(i)} for i in range(5)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows, max_concurrent_batches=1)
+    posted = []
+
+    def do_post(batch):
+        posted.extend(r["id"] for r in batch)
+        if len(posted) > 2:
+            raise httpx.ConnectError("VPN dropped")
+        return fake_response(201, batch)
+
+    poster.do_post = do_post
+    with pytest.raises(httpx.ConnectError):
+        poster.do_work()
+    assert json.loads((tmp_path / "checkpoint.json").read_text()) == {
+        "records.json": {"offset": 24, "line": 2, "done": False}
+    }
+
+    resumed = make_concurrent_poster(tmp_path, "Items", rows, max_concurrent_batches=1)
+    resumed.checkpoint_journal = CheckpointJournal(tmp_path / "checkpoint.json", True)
+    posted.clear()
+    resumed.do_post = lambda batch: posted.extend(r["id"] for r in batch) or fake_response(
+        201, batch
+    )
+    resumed.do_work()
+    assert posted == ["2", "3", "4"]
+    assert resumed.processed == 5
+    assert json.loads((tmp_path / "checkpoint.json").read_text()) == {
+        "records.json": {"offset": 60, "line": 5, "done": True}
+    }
+
+
+def test_post_files_concurrently_resumes_from_checkpoint(tmp_path):
+    rows = [{"id": str(i)} for i in range(9)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows)
+    (tmp_path / "checkpoint.json").write_text(
+        json.dumps({"records.json": {"offset": 48, "line": 4, "done": False}})
+    )
+    poster.checkpoint_journal = CheckpointJournal(tmp_path / "checkpoint.json", True)
+    posted = []
+
+    async def do_post_async(batch):
+        await asyncio.sleep(0.01 * (3 - len(posted) % 3))
+        posted.extend(r["id"] for r in batch)
+        return fake_response(201, batch)
+
+    poster.do_post_async = do_post_async
+    with open(tmp_path / "failed.txt", "w") as failed_recs_file:
+        asyncio.run(poster.post_files_concurrently(failed_recs_file))
+    assert sorted(posted) == ["4", "5", "6", "7", "8"]
+    assert json.loads((tmp_path / "checkpoint.json").read_text()) == {
+        "records.json": {"offset": 108, "line": 9, "done": True}
+    }
+
+
+def test_do_work_skips_rows_with_encoding_errors(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "Items", [], max_concurrent_batches=1)
+    (tmp_path / "records.json").write_bytes(b'{"id": "1"}\n{"id": "\xff"}\n{"id": "3"}\n')
+    posted = []
+    poster.do_post = lambda batch: posted.extend(r["id"] for r in batch) or fake_response(
+        201, batch
+    )
+    poster.do_work()
+    assert posted == ["1", "3"]
+    assert poster.migration_report.report["Details"]["Encoding errors"] == 1
+
+
+def test_prepare_raw_record_splices_injected_fields(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "SRS", [])
+    poster.task_configuration.pass_through_raw_json = True
+    assert (
+        poster.prepare_record('{"id": "1", "a": [1, 2]}\n', 2)
+        == b'{"id": "1", "a": [1, 2], "snapshotId": "snapshot"}'
+    )
+    assert poster.prepare_record("{}\n", 2) == b'{"snapshotId": "snapshot"}'
+    assert json.loads(poster.prepare_record('{"id": "1", "snapshotId": "old"}', 2)) == {
+        "id": "1",
+        "snapshotId": "snapshot",
+    }
+
+
+def test_prepare_raw_record_without_injected_fields_keeps_raw_json(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "Items", [])
+    poster.task_configuration.pass_through_raw_json = True
+    assert poster.prepare_record('legacy\t{"id":"1"}\n', 2) == b'{"id":"1"}'
+    poster.task_configuration.use_safe_inventory_endpoints = False
+    assert poster.prepare_record('{"id":"1"}\n', 2) == b'{"id":"1", "_version": -1}'
+
+
+def test_split_srs_records_are_joined(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "SRS", [])
+    split_row = (
+        '{"id": "1", "rawRecord": {"content": "@@rawRecord.content@@"}, '
+        '"parsedRecord": {"content": "@@parsedRecord.content@@"}}\t{"leader": "x"}\n'
+    )
+    expected = {
+        "id": "1",
+        "rawRecord": {"content": '{"leader": "x"}'},
+        "parsedRecord": {"content": {"leader": "x"}},
+        "snapshotId": "snapshot",
+    }
+    assert poster.prepare_record(split_row, 2) == expected
+    poster.task_configuration.pass_through_raw_json = True
+    assert json.loads(poster.prepare_record(split_row, 2)) == expected
+
+
+def test_raw_batch_payload_matches_json_payload(tmp_path):
+    for object_type in ["Items", "SRS", "Users"]:
+        poster = make_concurrent_poster(tmp_path, object_type, [])
+        records = [{"id": "1"}, {"id": "2", "a": "å"}]
+        raw_records = [json.dumps(r).encode("utf-8") for r in records]
+        assert json.loads(poster.get_raw_batch_payload(raw_records)) == (
+            poster.get_batch_payload(records)
+        )
+
+
+def test_do_post_sends_raw_batches_as_gzipped_bytes(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "Items", [])
+    poster.task_configuration.gzip_request_bodies = True
+    poster.folio_client.okapi_headers = {"x-okapi-token": "token"}
+    poster.http_client = MagicMock()
+    poster.http_client.is_closed = False
+    poster.do_post([b'{"id": "1"}'])
+    kwargs = poster.http_client.post.call_args.kwargs
+    assert json.loads(gzip.decompress(kwargs["content"])) == {"items": [{"id": "1"}]}
+    assert kwargs["headers"] == {
+        "x-okapi-token": "token",
+        "content-type": "application/json",
+        "content-encoding": "gzip",
+    }
+
+
+def test_failed_raw_batches_are_written_as_json_lines(tmp_path):
+    rows = [{"id": str(i)} for i in range(3)]
+    poster = make_concurrent_poster(tmp_path, "Items", rows, max_concurrent_batches=1)
+    poster.task_configuration.pass_through_raw_json = True
+    poster.do_post = lambda batch: fake_response(422, [], json={"errors": [{"message": "bad"}]})
+    poster.do_work()
+    failed = [json.loads(r) for r in (tmp_path / "failed.txt").read_text().splitlines()]
+    assert failed == rows
+
+
+def test_single_records_are_checkpointed_every_interval(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "Extradata", [], max_concurrent_batches=1)
+    poster.processed = batch_poster.CHECKPOINT_INTERVAL - 1
+    assert not poster.is_checkpoint_row()
+    poster.processed = batch_poster.CHECKPOINT_INTERVAL
+    assert poster.is_checkpoint_row()
+    poster.checkpoint_journal.enabled = False
+    assert not poster.is_checkpoint_row()
+
+
+def test_concurrent_posting_uses_the_session_timeouts(tmp_path):
+    poster = make_concurrent_poster(tmp_path, "Items", [])
+    poster.http_session = FolioHttpSession(poster.folio_client, 120, 10)
+    timeouts = []
+
+    async def do_post_async(batch):
+        timeouts.append(poster.async_http_client.timeout)
+        return fake_response(201, batch)
+
+    (tmp_path / "records.json").write_text('{"id": "1"}\n')
+    poster.do_post_async = do_post_async
+    with open(tmp_path / "failed.txt", "w") as failed_recs_file:
+        asyncio.run(poster.post_files_concurrently(failed_recs_file))
+    assert timeouts == [httpx.Timeout(120, connect=10)]
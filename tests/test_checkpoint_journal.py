@@ -0,0 +1,52 @@
+import json
+
+from folio_migration_tools.checkpoint_journal import CheckpointJournal
+
+
+def test_checkpoint_waits_for_earlier_batches(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.json")
+    first = journal.register_batch("a.json", 100, 10)
+    second = journal.register_batch("a.json", 200, 20)
+    third = journal.register_batch("a.json", 300, 30)
+    journal.acknowledge(second)
+    journal.acknowledge(third)
+    assert not (tmp_path / "journal.json").is_file()
+    journal.acknowledge(first)
+    assert json.loads((tmp_path / "journal.json").read_text()) == {
+        "a.json": {"offset": 300, "line": 30, "done": False}
+    }
+
+
+def test_file_is_done_when_all_its_batches_are_acknowledged(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.json")
+    first = journal.register_batch("a.json", 100, 10)
+    journal.register_file_done("a.json", 110, 11)
+    second = journal.register_batch("b.json", 50, 5)
+    assert journal.get_position("a.json") == (0, 0, False)
+    journal.acknowledge(second)
+    journal.acknowledge(first)
+    assert journal.get_position("a.json") == (110, 11, True)
+    assert journal.get_position("b.json") == (50, 5, False)
+
+
+def test_resume_loads_positions(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.json")
+    journal.acknowledge(journal.register_batch("a.json", 100, 10))
+    assert CheckpointJournal(tmp_path / "journal.json", True).get_position("a.json") == (
+        100,
+        10,
+        False,
+    )
+    assert CheckpointJournal(tmp_path / "journal.json").get_position("a.json") == (0, 0, False)
+    assert CheckpointJournal(tmp_path / "missing.json", True).get_position("a.json") == (
+        0,
+        0,
+        False,
+    )
+
+
+def test_disabled_journal_keeps_positions_without_writing(tmp_path):
+    journal = CheckpointJournal(tmp_path / "journal.json", enabled=False)
+    journal.acknowledge(journal.register_batch("a.json", 100, 10))
+    assert journal.get_position("a.json") == (100, 10, False)
+    assert not (tmp_path / "journal.json").is_file()
@@ -110,3 +110,55 @@ def test_condition_set_note_staff_only_via_indicator():
         mock, legacy_id, "value", {}, marc_field
     )
     assert res_false == "false"
+
+
+def make_conditions(profile: bool) -> Conditions:
+    conditions = Conditions.__new__(Conditions)
+    conditions.condition_statistics = {}
+    conditions.condition_cache = conditions.build_dispatch_table(profile)
+    return conditions
+
+
+def test_dispatch_table_binds_conditions_once():
+    conditions = make_conditions(False)
+    assert conditions.condition_cache["trim"] == conditions.condition_trim
+    assert conditions.get_condition("trim", "legacy_id", " value ") == "value"
+    assert "cache" not in conditions.condition_cache
+
+
+def test_failing_condition_is_called_once():
+    conditions = make_conditions(False)
+    conditions.condition_cache["trim"] = Mock(side_effect=ValueError("bad value"))
+    try:
+        conditions.get_condition("trim", "legacy_id", "value")
+    except ValueError:
+        pass
+    assert conditions.condition_cache["trim"].call_count == 1
+
+
+def test_profiled_conditions_are_counted():
+    conditions = make_conditions(True)
+    for _ in range(3):
+        conditions.get_condition("trim", "legacy_id", " value ")
+    assert conditions.condition_statistics["trim"][0] == 3
+    conditions.merge_statistics({"trim": [2, 0.5], "capitalize": [1, 0.1]})
+    assert conditions.condition_statistics["trim"][0] == 5
+    assert conditions.condition_statistics["capitalize"] == [1, 0.1]
+    conditions.reset_statistics()
+    assert conditions.condition_statistics["trim"] == [0, 0.0]
+
+
+def test_validate_condition_types():
+    conditions = make_conditions(False)
+    mappings = {
+        "100": [
+            {
+                "entity": [
+                    {"rules": [{"conditions": [{"type": "trim_period, trim"}]}]},
+                    {"rules": [{"conditions": [{"type": "no_such_condition"}]}]},
+                ]
+            }
+        ],
+        "245": [{"rules": [{"conditions": [{"type": "no_such_condition"}]}]}],
+    }
+    assert conditions.validate_condition_types(mappings) == ["no_such_condition"]
@@ -0,0 +1,51 @@
+import pytest
+from dateutil import parser as dateutil_parser
+from dateutil import tz
+
+from folio_migration_tools.date_parser import DateParser
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2022-06-29",
+        "2022-06-29 20:21",
+        "2022-06-29T20:21:22.123",
+        "2022-06-29T20:21:22+02:00",
+        "2022-06-29T20:21:22-0530",
+        "20220629",
+        "6/29/2022",
+        "06/29/2022 8:21",
+        "06/29/2022 20:21:22",
+        "2022/6/29",
+        "29/06/2022",
+        "June 29, 2022",
+        " 2022-06-29 ",
+    ],
+)
+def test_same_dates_as_dateutil(value):
+    assert DateParser().parse(value) == dateutil_parser.parse(value)
+
+
+def test_utc_is_dateutil_utc():
+    parsed = DateParser().parse("2022-06-29T20:21:22Z")
+    assert parsed.tzinfo == tz.UTC
+    assert parsed.utcoffset().total_seconds() == 0
+
+
+def test_fallbacks_and_cache_hits():
+    date_parser = DateParser()
+    for value in ["6/29/2022", "6/30/2022", "6/29/2022", "Due 6/29/2022"]:
+        date_parser.parse(value, fuzzy=True)
+    assert date_parser.formats[0][0] == "%m/%d/%Y"
+    assert (date_parser.fast_path_hits, date_parser.cache_hits, date_parser.fallbacks) == (2, 1, 1)
+
+
+def test_failures_are_raised_every_time():
+    date_parser = DateParser()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            date_parser.parse("not a date")
+    with pytest.raises(ValueError):
+        date_parser.parse("2022-02-30")
+    assert date_parser.cache_hits == 1
@@ -0,0 +1,41 @@
+import csv
+import io
+from pathlib import Path
+
+from folio_migration_tools.mapping_file_transformation.delimited_file_reader import (
+    DelimitedFileReader,
+)
+
+items_tsv = """\
+barcode\tlocation\tnote
+
+b1\tmain\tfirst
+\t\t
+b2\tannex
+b3\tmain\t"quoted\tnote"\textra
+"""
+
+
+def test_rows_are_the_same_as_from_dict_reader():
+    reader = DelimitedFileReader(io.StringIO(items_tsv), Path("items.tsv"))
+    expected = list(csv.DictReader(io.StringIO(items_tsv), delimiter="\t"))
+    assert list(reader) == expected
+    assert reader.total_rows == 5
+    assert reader.empty_rows == 2
+
+
+def test_row_views():
+    reader = DelimitedFileReader(io.StringIO(items_tsv), Path("items.tsv"), row_views=True)
+    rows = list(reader)
+    assert rows[0]["barcode"] == "b1"
+    assert rows[0].get("missing", "default") == "default"
+    assert "location" in rows[2]
+    assert rows[2].get("note") is None
+    assert rows[3].to_dict() == {"barcode": "b3", "location": "main", "note": "quoted\tnote"}
+    assert rows[0].columns is rows[3].columns
+
+
+def test_csv_file_and_line_num():
+    reader = DelimitedFileReader(io.StringIO("a,b\n1,2\n,\n"), Path("loans.csv"))
+    assert list(reader) == [{"a": "1", "b": "2"}, {"a": "", "b": ""}]
+    assert (reader.total_rows, reader.empty_rows, reader.line_num) == (2, 1, 3)
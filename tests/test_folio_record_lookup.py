@@ -0,0 +1,99 @@
+import csv
+from unittest.mock import Mock
+
+from folio_migration_tools.mapping_file_transformation.folio_record_lookup import (
+    FolioRecordLookup,
+    escape_cql,
+)
+from folio_migration_tools.mapping_file_transformation.mapping_file_mapper_base import (
+    MappingFileMapperBase,
+)
+from folio_migration_tools.mapping_file_transformation.manual_fee_fines_mapper import (
+    ManualFeeFinesMapper,
+)
+
+USERS = [{"id": f"user{i}", "barcode": f"u{i}"} for i in range(5)]
+
+
+def mocked_folio_client():
+    folio_client = Mock()
+    folio_client.folio_get_all.side_effect = lambda path, result_type, query, limit=10: (
+        u for u in USERS if f'"{u["barcode"]}"' in query
+    )
+    return folio_client
+
+
+def test_prefetch_caches_hits_and_misses_in_batches():
+    folio_client = mocked_folio_client()
+    cache: dict = {}
+    lookup = FolioRecordLookup(folio_client, "/users", "users", "barcode", cache, 2)
+    lookup.prefetch(["u1", "u2", "u1", "", "missing", "u4"])
+    assert folio_client.folio_get_all.call_count == 2
+    assert folio_client.folio_get_all.call_args_list[0].args[2] == (
+        '?query=(barcode==("missing" or "u1"))'
+    )
+    assert cache == {"u1": USERS[1], "u2": USERS[2], "u4": USERS[4], "missing": None}
+    lookup.prefetch(["u1", "missing"])
+    assert folio_client.folio_get_all.call_count == 2
+
+
+def test_misses_are_not_looked_up_again():
+    mapper = Mock(spec=ManualFeeFinesMapper)
+    mapper.folio_client = mocked_folio_client()
+    cache: dict = {}
+    for barcode in ["missing", "u1", "missing", "u1"]:
+        ManualFeeFinesMapper.get_matching_record_from_folio(
+            mapper, "row 1", cache, "/users", "barcode", barcode, "users"
+        )
+    assert mapper.folio_client.folio_get_all.call_count == 2
+    assert cache == {"missing": None, "u1": USERS[1]}
+
+
+def test_seeded_records_are_not_looked_up(tmp_path):
+    folio_client = mocked_folio_client()
+    cache: dict = {}
+    lookup = FolioRecordLookup(folio_client, "/users", "users", "barcode", cache)
+    results_file = tmp_path / "folio_users_transform_users.json"
+    results_file.write_text('{"id": "local", "barcode": "u9"}\n{"barcode": "no id"}\n')
+    lookup.seed_from_file(results_file)
+    lookup.prefetch(["u9"])
+    assert cache == {"u9": {"id": "local", "barcode": "u9"}}
+    assert not folio_client.folio_get_all.called
+
+
+def test_escape_cql():
+    assert escape_cql('a"b*c\\') == 'a\\"b\\*c\\\\'
+
+
+def test_collect_mapped_values(tmp_path):
+    csv.register_dialect("tsv", delimiter="\t")
+    mapper = Mock(spec=MappingFileMapperBase)
+    mapper.library_configuration = Mock(multi_field_delimiter="<delimiter>")
+    mapper.map_entries_by_folio_prop = {
+        "account.userId": [{"folio_field": "account.userId", "legacy_field": "patron"}],
+        "account.itemId": [{"folio_field": "account.itemId", "legacy_field": "item"}],
+    }
+    mapper._get_delimited_file_reader = MappingFileMapperBase._get_delimited_file_reader
+    source_file = tmp_path / "feefines.tsv"
+    source_file.write_text("patron\titem\nu1\ti1\nu2\t\nu1\ti2\n")
+    assert MappingFileMapperBase.collect_mapped_values(
+        mapper, [source_file], ["account.userId", "account.itemId"]
+    ) == {"account.userId": {"u1", "u2"}, "account.itemId": {"i1", "i2"}}
+
+
+def test_records_matched_ignoring_case_and_accents_are_cached_as_hits():
+    folio_client = Mock()
+    folio_client.folio_get_all.return_value = [
+        {"id": "1", "barcode": "ABC"},
+        {"id": "2", "barcode": "Café"},
+        {"id": "3", "barcode": "cafe"},
+    ]
+    cache: dict = {}
+    FolioRecordLookup(folio_client, "/users", "users", "barcode", cache).prefetch(
+        ["abc", "cafe", "missing"]
+    )
+    assert cache == {
+        "abc": {"id": "1", "barcode": "ABC"},
+        "cafe": {"id": "3", "barcode": "cafe"},
+        "missing": None,
+    }
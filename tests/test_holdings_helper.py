@@ -5,6 +5,7 @@ import pytest
 
 from folio_migration_tools.custom_exceptions import TransformationProcessError
 from folio_migration_tools.holdings_helper import HoldingsHelper
+from folio_migration_tools.holdings_helper import HoldingsMerger
 from folio_migration_tools.migration_report import MigrationReport
 
 # flake8: noqa: E501
@@ -334,3 +335,47 @@ def test_holdings_notes2():
     folio_rec = {"notes": [{"note": "", "holdingsNoteTypeId": "apa"}]}
     HoldingsHelper.handle_notes(folio_rec)
     assert "notes" not in folio_rec
+
+
+def test_holdings_merger_gives_the_same_holding_as_merge_holding():
+    records = [
+        {
+            "id": "h1",
+            "formerIds": ["i1"],
+            "holdingsStatements": [{"statement": "v.1", "note": ""}, {"statement": ""}],
+            "notes": [{"note": "a", "holdingsNoteTypeId": "t"}],
+            "discoverySuppress": True,
+        },
+        {
+            "id": "h2",
+            "formerIds": ["i2", "i1"],
+            "holdingsStatements": [{"statement": "v.1", "note": ""}],
+            "notes": [{"note": "b", "holdingsNoteTypeId": "t"}],
+            "electronicAccess": [{"uri": "http://a"}],
+            "discoverySuppress": True,
+        },
+        {
+            "id": "h3",
+            "formerIds": ["i3"],
+            "holdingsStatements": [{"statement": "v.2", "note": ""}, {"statement": ""}],
+            "holdingsStatementsForIndexes": [{"statement": ""}],
+            "notes": [{"note": "a", "holdingsNoteTypeId": "t"}],
+            "electronicAccess": [{"uri": "http://a"}],
+            "discoverySuppress": False,
+        },
+    ]
+    expected = deepcopy(records[0])
+    for record in deepcopy(records[1:]):
+        expected = HoldingsHelper.merge_holding(expected, record)
+    holdings_merger = HoldingsMerger(deepcopy(records[0]))
+    for record in deepcopy(records[1:]):
+        holdings_merger.merge(record)
+    merged = holdings_merger.get_merged_holding()
+    assert holdings_merger.merged_records == 2
+    assert merged["notes"] == [
+        {"note": "a", "holdingsNoteTypeId": "t"},
+        {"note": "b", "holdingsNoteTypeId": "t"},
+    ]
+    # merge_holding dedupes the notes through a set, which does not keep their order
+    assert sorted(expected.pop("notes"), key=lambda n: n["note"]) == merged.pop("notes")
+    assert merged == expected
@@ -0,0 +1,46 @@
+from folio_migration_tools.holdings_helper import HoldingsHelper
+from folio_migration_tools.holdings_spill_merger import HoldingsSpillMerger
+
+
+def holding(holdings_id, key, former_id):
+    return {"id": holdings_id, "key": key, "formerIds": [former_id], "discoverySuppress": False}
+
+
+def test_spilled_holdings_are_merged_like_in_memory(tmp_path):
+    incoming = [
+        holding("h1", "b", "i1"),
+        holding("h2", "a", "i2"),
+        holding("h3", "b", "i3"),
+        holding("h4", "c", "i4"),
+        holding("h5", "a", "i5"),
+        holding("h6", "b", "i6"),
+        holding("h7", "d", "i7"),
+    ]
+    in_memory = {}
+    for record in incoming:
+        if record["key"] in in_memory:
+            HoldingsHelper.merge_holding(in_memory[record["key"]], dict(record))
+        else:
+            in_memory[record["key"]] = dict(record)
+
+    spill_merger = HoldingsSpillMerger(tmp_path, 2)
+    for record in incoming:
+        spill_merger.add(record["key"], record)
+    assert len(spill_merger.spill_files) == 3
+    assert spill_merger.holdings_added == 7
+
+    merged = list(spill_merger.merge())
+    assert [h["key"] for h, _, _ in merged] == ["a", "b", "c", "d"]
+    assert [(order, count) for _, order, count in merged] == [(1, 2), (0, 3), (3, 1), (6, 1)]
+    assert {h["key"]: h for h, _, _ in merged} == in_memory
+    assert merged[1][0]["formerIds"] == ["i1", "i3", "i6"]
+    assert not any(tmp_path.iterdir())
+
+
+def test_merge_by_key_yields_the_keys(tmp_path):
+    spill_merger = HoldingsSpillMerger(tmp_path, 1)
+    spill_merger.add("b", holding("h1", "b", "i1"))
+    spill_merger.add("a", holding("h2", "a", "i2"))
+    spill_merger.add("b", holding("h3", "b", "i3"))
+    merged = list(spill_merger.merge_by_key())
+    assert [(key, h["id"]) for key, h, _, _ in merged] == [("a", "h2"), ("b", "h1")]
@@ -0,0 +1,105 @@
+from unittest.mock import Mock
+
+from folio_uuid.folio_namespaces import FOLIONamespaces
+
+from folio_migration_tools.library_configuration import HridHandling
+from folio_migration_tools.marc_rules_transformation.hrid_block_allocator import (
+    HridBlockAllocator,
+)
+from folio_migration_tools.marc_rules_transformation.hrid_handler import HRIDHandler
+from folio_migration_tools.migration_report import MigrationReport
+
+
+def hrid_handler(start_number: int):
+    folio_client = Mock(okapi_url="https://okapi.example.com")
+    folio_client.folio_get_single_object.return_value = {
+        "instances": {"prefix": "in", "startNumber": start_number},
+        "holdings": {"prefix": "ho", "startNumber": 1},
+        "items": {"prefix": "it", "startNumber": 1},
+        "commonRetainLeadingZeroes": False,
+    }
+    return HRIDHandler(folio_client, HridHandling.default, MigrationReport(), False)
+
+
+def test_blocks_are_not_handed_out_twice(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    first = HridBlockAllocator(journal_path, 10)
+    second = HridBlockAllocator(journal_path, 10)
+    assert first.reserve("instances", 5) == (5, 15)
+    assert second.reserve("instances", 5) == (15, 25)
+    assert second.reserve("holdings", 1) == (1, 11)
+    first.release("instances", 8, 15)
+    assert first.reserve("instances", 5) == (25, 35)
+    second.release("instances", 25, 25)
+    first.release("instances", 27, 35)
+    # All released. Blocks continue after the last number handed out
+    assert first.reserve("instances", 5) == (27, 37)
+    first.reset("instances")
+    assert first.reserve("instances", 1) == (1, 11)
+
+
+def test_hrid_handler_continues_after_crashed_transformation(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    crashed = hrid_handler(100)
+    crashed.use_hrid_journal(journal_path, 3)
+    assert [crashed.get_next_hrid(FOLIONamespaces.instances) for _ in range(4)] == [
+        "in100",
+        "in101",
+        "in102",
+        "in103",
+    ]
+    handler = hrid_handler(100)
+    handler.use_hrid_journal(journal_path, 3)
+    assert handler.get_next_hrid(FOLIONamespaces.instances) == "in106"
+
+
+def test_hrid_handler_continues_after_finished_transformation(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    finished = hrid_handler(100)
+    finished.http_session = Mock()
+    finished.use_hrid_journal(journal_path, 10)
+    handler = hrid_handler(100)
+    handler.use_hrid_journal(journal_path, 10)
+    for _ in range(3):
+        finished.get_next_hrid(FOLIONamespaces.instances)
+    finished.store_hrid_settings()
+    assert handler.get_next_hrid(FOLIONamespaces.instances) == "in103"
+
+
+def test_hrid_settings_are_reconciled_and_blocks_released(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    handler = hrid_handler(100)
+    handler.http_session = Mock()
+    handler.use_hrid_journal(journal_path, 10)
+    handler.get_next_hrid(FOLIONamespaces.instances)
+    # Another transformation stored a higher number in the meantime
+    handler.folio_client.folio_get_single_object.return_value = {
+        "instances": {"prefix": "in", "startNumber": 500},
+        "holdings": {"prefix": "ho", "startNumber": 1},
+        "items": {"prefix": "it", "startNumber": 1},
+        "commonRetainLeadingZeroes": False,
+    }
+    handler.store_hrid_settings()
+    # FOLIO is already ahead of this transformation, so there is nothing to store
+    handler.http_session.put.assert_not_called()
+    assert handler.instance_hrid_counter == 500
+    assert not handler.hrid_blocks
+    assert HridBlockAllocator(journal_path).reserve("instances", 500) == (500, 1500)
+
+
+def test_only_advanced_hrid_counters_are_stored(tmp_path):
+    handler = hrid_handler(100)
+    handler.http_session = Mock()
+    handler.use_hrid_journal(tmp_path / "journal.jsonl", 10)
+    handler.get_next_hrid(FOLIONamespaces.instances)
+    # A holdings transformation stored its counter while this one ran
+    handler.folio_client.folio_get_single_object.return_value = {
+        "instances": {"prefix": "in", "startNumber": 100},
+        "holdings": {"prefix": "ho", "startNumber": 250},
+        "items": {"prefix": "it", "startNumber": 1},
+        "commonRetainLeadingZeroes": False,
+    }
+    handler.store_hrid_settings()
+    stored = handler.http_session.put.call_args.kwargs["json"]
+    assert stored["instances"]["startNumber"] == 101
+    assert stored["holdings"]["startNumber"] == 250
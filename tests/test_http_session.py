@@ -0,0 +1,108 @@
+from unittest.mock import Mock
+
+import httpx
+import pytest
+
+from folio_migration_tools import http_session as http_session_module
+from folio_migration_tools.http_session import FolioHttpSession
+
+
+def folio_session(handler, max_retries=3):
+    folio_client = Mock()
+    folio_client.okapi_url = "https://okapi.example.com"
+    folio_client.ssl_verify = True
+    session = FolioHttpSession(folio_client, max_retries=max_retries)
+    session.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return session
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_session_module.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_retries_overloaded_post_and_honours_retry_after(no_sleep):
+    statuses = iter([429, 429, 201])
+
+    def handler(request):
+        return httpx.Response(next(statuses), headers={"Retry-After": "2"})
+
+    session = folio_session(handler)
+    response = session.post("/circulation/check-out-by-barcode", json={})
+    assert response.status_code == 201
+    assert no_sleep == [2.0, 2.0]
+
+
+def test_does_not_retry_post_on_500():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(500)
+
+    session = folio_session(handler)
+    assert session.post("/circulation/requests", json={}).status_code == 500
+    assert len(requests) == 1
+
+
+def test_does_not_retry_post_on_503():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    session = folio_session(handler)
+    assert session.post("/circulation/check-out-by-barcode", json={}).status_code == 503
+    assert len(requests) == 1
+
+
+def test_closed_session_opens_again_when_used():
+    session = folio_session(lambda request: httpx.Response(200))
+    assert not session.is_closed
+    session.close()
+    assert session.is_closed
+    session.client = httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(200)))
+    session.get("/groups")
+    assert not session.is_closed
+
+
+def test_retries_put_on_500_until_max_retries():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(500)
+
+    session = folio_session(handler, max_retries=2)
+    assert session.put("/hrid-settings-storage/hrid-settings", json={}).status_code == 500
+    assert len(requests) == 3
+
+
+def test_retries_connect_errors_but_not_read_errors_on_post():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        raise httpx.ReadError("reset", request=request)
+
+    session = folio_session(handler)
+    with pytest.raises(httpx.ReadError):
+        session.post("/source-storage/snapshots", json={})
+    assert len(calls) == 2
+
+
+def test_latencies_are_grouped_by_endpoint(caplog):
+    session = folio_session(lambda request: httpx.Response(200))
+    session.get("/circulation/loans/9dc3e30d-8d1b-4dc1-b6ae-fb0c2e2da2c5")
+    session.get("https://okapi.example.com/circulation/loans/e3a1d2c6-3bd7-4d3f-9b3b-0b0e5a3f7c1d")
+    session.put("/courses/courselistings/1/reserves")
+    assert sum(session.latencies["GET /circulation/loans/{id}"]) == 2
+    assert sum(session.latencies["PUT /courses/courselistings/{n}/reserves"]) == 1
+    caplog.set_level("INFO")
+    session.log_latencies()
+    assert "GET /circulation/loans/{id}: 2 requests, 0 retried" in caplog.text
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.id_map_store import IdMapStore
+from folio_migration_tools.migration_tasks.migration_task_base import MigrationTaskBase
+
+
+def write_id_map_file(path, rows):
+    with open(path, "w") as id_map_file:
+        for row in rows:
+            id_map_file.write(f"{json.dumps(row)}\n")
+
+
+def test_store_behaves_like_the_loaded_id_map(tmp_path):
+    rows = [[f"b{i}", f"id-{i}", f"in{i:08}"] for i in range(500, 0, -1)]
+    rows.append(["åäö 1", "id-åäö", "in00000000"])
+    map_path = tmp_path / "instances_id_map.json"
+    write_id_map_file(map_path, rows)
+    id_map = MigrationTaskBase.load_id_map(map_path)
+    store = IdMapStore(IdMapStore.convert(map_path))
+
+    assert len(store) == len(id_map)
+    assert set(store) == set(id_map)
+    assert all(store[legacy_id] == value for legacy_id, value in id_map.items())
+    assert "b0" not in store and store.get("b501") is None
+    assert 1 not in store
+    with pytest.raises(KeyError):
+        store["b1000"]
+
+
+def test_last_row_wins(tmp_path):
+    store_path = tmp_path / "holdings_id_map.idmap"
+    IdMapStore.write(store_path, [("h1", "id-1"), ("h2", "id-2"), ("h1", "id-3")])
+    store = IdMapStore(store_path)
+    assert dict(store) == {"h1": ["h1", "id-3"], "h2": ["h2", "id-2"]}
+
+
+def test_load_id_map_read_only_converts_once(tmp_path):
+    map_path = tmp_path / "holdings_id_map.json"
+    write_id_map_file(map_path, [["h1", "id-1"]])
+    id_map = MigrationTaskBase.load_id_map(map_path, True, True)
+    assert isinstance(id_map, IdMapStore)
+    assert id_map["h1"] == ["h1", "id-1"]
+    assert IdMapStore.is_up_to_date(map_path)
+
+    # A newer map file is converted again
+    write_id_map_file(map_path, [["h2", "id-2"]])
+    store_mtime = os.path.getmtime(IdMapStore.store_path(map_path))
+    os.utime(map_path, (store_mtime + 10, store_mtime + 10))
+    assert MigrationTaskBase.load_id_map(map_path, True, True)["h2"] == ["h2", "id-2"]
+
+
+def test_load_id_map_read_only_empty(tmp_path):
+    map_path = tmp_path / "holdings_id_map.json"
+    write_id_map_file(map_path, [])
+    with pytest.raises(TransformationProcessError, match=r"Legacy id map is empty"):
+        MigrationTaskBase.load_id_map(map_path, True, True)
+    assert MigrationTaskBase.load_id_map(tmp_path / "nothing_id_map.json", read_only=True) == {}
@@ -89,6 +89,19 @@ def test_item_mapper_duplicate_barcode(mapper):
     assert item2["barcode"].startswith("abc000950000010-")
 
 
+def test_item_mapper_deferred_barcodes(mapper):
+    data = {"barcode": "DEF000950000010", "note": "Check it out!", "lt": "ah", "mat": "oh"}
+    mapper.deferred_barcodes = []
+    try:
+        item, idx = mapper.do_map(data, data["barcode"], FOLIONamespaces.items)
+        item2, idx2 = mapper.do_map(data, "dupe", FOLIONamespaces.items, True)
+    finally:
+        mapper.deferred_barcodes = None
+    assert item["barcode"] == item2["barcode"] == "DEF000950000010"
+    assert mapper.get_unique_barcode(item["barcode"], idx) == "DEF000950000010"
+    assert mapper.get_unique_barcode(item2["barcode"], idx2).startswith("DEF000950000010-")
+
+
 def test_perform_additional_mappings(mapper: ItemMapper):
     file_config = Mock(spec=FileDefinition)
     file_config_2 = Mock(spec=FileDefinition)
@@ -5,9 +5,13 @@ from zoneinfo import ZoneInfo
 
 from folio_uuid.folio_namespaces import FOLIONamespaces
 
+from folio_migration_tools.barcode_index import BarcodeIndex
 from folio_migration_tools.library_configuration import LibraryConfiguration
 from folio_migration_tools.migration_report import MigrationReport
-from folio_migration_tools.migration_tasks.loans_migrator import LoansMigrator
+from folio_migration_tools.migration_tasks.loans_migrator import (
+    LoansMigrator,
+    partition_loans,
+)
 
 
 def test_get_object_type():
@@ -50,8 +54,10 @@ def test_load_and_validate_legacy_loans_set_in_source():
         mock_migrator = Mock(spec=LoansMigrator)
         mock_migrator.tenant_timezone = ZoneInfo("UTC")
         mock_migrator.migration_report = MigrationReport()
-        a = LoansMigrator.load_and_validate_legacy_loans(
-            mock_migrator, reader, "Set on file or config"
+        a = list(
+            LoansMigrator.load_and_validate_legacy_loans(
+                mock_migrator, reader, "Set on file or config"
+            )
         )
         assert a[0].service_point_id == "Set in source data"
 
@@ -90,8 +96,10 @@ def test_load_and_validate_legacy_loans_set_centrally():
         mock_migrator = Mock(spec=LoansMigrator)
         mock_migrator.migration_report = MigrationReport()
         mock_migrator.tenant_timezone = ZoneInfo("UTC")
-        a = LoansMigrator.load_and_validate_legacy_loans(
-            mock_migrator, reader, "Set on file or config"
+        a = list(
+            LoansMigrator.load_and_validate_legacy_loans(
+                mock_migrator, reader, "Set on file or config"
+            )
         )
         assert a[0].service_point_id == "Set on file or config"
 
@@ -132,7 +140,71 @@ def test_load_and_validate_legacy_loans_with_proxy():
         mock_migrator = Mock(spec=LoansMigrator)
         mock_migrator.migration_report = MigrationReport()
         mock_migrator.tenant_timezone = ZoneInfo("UTC")
-        a = LoansMigrator.load_and_validate_legacy_loans(
-            mock_migrator, reader, "Set on file or config"
+        a = list(
+            LoansMigrator.load_and_validate_legacy_loans(
+                mock_migrator, reader, "Set on file or config"
+            )
         )
         assert a[0].proxy_patron_barcode == "prox_barcode"
+
+
+def test_partition_loans_keeps_loans_of_same_item_or_patron_together():
+    def loan(item, patron, proxy=""):
+        return Mock(item_barcode=item, patron_barcode=patron, proxy_patron_barcode=proxy)
+
+    loans = list(
+        enumerate(
+            [
+                loan("i1", "p1"),
+                loan("i2", "p2"),
+                loan("i3", "p1"),
+                loan("i4", "p3", "p2"),
+                loan("i5", "p4"),
+                loan("i3", "p5"),
+            ],
+            start=1,
+        )
+    )
+    partitions = partition_loans(loans)
+    assert [[num for num, _ in partition] for partition in partitions] == [
+        [1, 3, 6],
+        [2, 4],
+        [5],
+    ]
+
+
+def test_migrate_loans_concurrently_checks_out_each_loan_once():
+    mock_migrator = Mock(spec=LoansMigrator)
+    mock_migrator.task_configuration = Mock(number_of_threads=4)
+    mock_migrator.migrate_loans = lambda partition: LoansMigrator.migrate_loans(
+        mock_migrator, partition
+    )
+    loans = [
+        (num, Mock(item_barcode=f"i{num}", patron_barcode=f"p{num % 7}", proxy_patron_barcode=""))
+        for num in range(1, 101)
+    ]
+    LoansMigrator.migrate_loans_concurrently(mock_migrator, loans)
+    migrated = [c.args for c in mock_migrator.migrate_loan.call_args_list]
+    assert sorted(migrated, key=lambda c: c[0]) == loans
+    for patron in range(7):
+        rows = [num for num, loan in migrated if loan.patron_barcode == f"p{patron}"]
+        assert rows == sorted(rows)
+
+
+def test_check_barcodes_against_migrated_barcodes():
+    mock_migrator = Mock(spec=LoansMigrator)
+    mock_migrator.task_configuration = Mock(item_files=[Mock()], patron_files=[Mock()])
+    mock_migrator.migration_report = MigrationReport()
+    mock_migrator.failed = {}
+    mock_migrator.item_barcodes = BarcodeIndex()
+    mock_migrator.item_barcodes.add("i1")
+    mock_migrator.user_barcodes = BarcodeIndex()
+    mock_migrator.user_barcodes.add("p1")
+    loans = [
+        Mock(item_barcode=item, patron_barcode="p1", proxy_patron_barcode=proxy)
+        for item, proxy in [("i1", ""), ("i2", ""), ("i1", "p2")]
+    ]
+    for loan in loans:
+        loan.to_dict.return_value = {}
+    assert list(LoansMigrator.check_barcodes(mock_migrator, iter(loans))) == loans[:1]
+    assert list(mock_migrator.failed) == ["i2", "i1"]
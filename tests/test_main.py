@@ -75,6 +75,7 @@ def test_arg_prompts(insecure_inputs, secure_inputs):
         "base_folder_path": "folder_path",
         "okapi_password": "okapi_password",
         "report_language": "en",
+        "refresh_reference_data": False,
     }
 
 
@@ -102,6 +103,7 @@ def test_args_positionally(insecure_inputs, secure_inputs):
         "base_folder_path": "folder_path",
         "okapi_password": "okapi_password",
         "report_language": "en",
+        "refresh_reference_data": False,
     }
 
 
@@ -126,6 +128,7 @@ def test_args_from_env(insecure_inputs, secure_inputs):
         "base_folder_path": "folder_path",
         "okapi_password": "okapi_password",
         "report_language": "fr",
+        "refresh_reference_data": False,
     }
 
 
@@ -161,6 +164,7 @@ def test_args_overriding_env(insecure_inputs, secure_inputs):
         "base_folder_path": "folder_path",
         "okapi_password": "okapi_password",
         "report_language": "fr",
+        "refresh_reference_data": False,
     }
 
 
@@ -184,6 +188,7 @@ def test_task_name_arg_exception(insecure_inputs, secure_inputs):
         "base_folder_path": "folder_path",
         "okapi_password": "okapi_password",
         "report_language": "fr",
+        "refresh_reference_data": False,
     }
 
 
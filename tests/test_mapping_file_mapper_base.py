@@ -1623,10 +1623,7 @@ def test__get_delimited_file_reader():
             delimited_file_tab = (Path("/tmp/delimited_data.tsv"), delimited_data_tab_file)
             delimited_file_comma = (Path("/tmp/delimited_data.csv"), delimited_data_comma_file)
             for file in (delimited_file_tab, delimited_file_comma):
-                total_rows, empty_rows, reader = MappingFileMapperBase._get_delimited_file_reader(
-                    file[1], file[0]
-                )
-                assert total_rows == 2 and empty_rows == 1
+                reader = MappingFileMapperBase._get_delimited_file_reader(file[1], file[0])
                 for idx, row in enumerate(reader):
                     if idx == 0:
                         for key in row.keys():
@@ -1637,6 +1634,7 @@ def test__get_delimited_file_reader():
                             and row["header_2"] == "value_2"
                             and row["header_3"] == "value_3"
                         )
+                assert reader.total_rows == 2 and reader.empty_rows == 1
 
 
 def test_map_string_first_level(mocked_folio_client: FolioClient):
@@ -4075,6 +4073,9 @@ def test_get_prop_same_as_get_legacy_value_mapped_value():
     )
     mock_self = Mock(spec=MappingFileMapperBase)
     mock_self.record_map = {"data": [mapping_file_entry]}
+    mock_self.map_entries_by_folio_prop = MappingFileMapperBase.setup_map_entries_index(
+        mock_self.record_map
+    )
     mock_self.mapped_from_legacy_data = {"title": "title"}
     mock_self.migration_report = MigrationReport()
     mock_self.library_configuration = Mock(spec=LibraryConfiguration)
@@ -4102,6 +4103,9 @@ def test_get_prop_concatenated():
 
     mock_self = Mock(spec=MappingFileMapperBase)
     mock_self.record_map = {"data": mapping_file_entries}
+    mock_self.map_entries_by_folio_prop = MappingFileMapperBase.setup_map_entries_index(
+        mock_self.record_map
+    )
     mock_self.mapped_from_legacy_data = {"title": ["firstname", "lastname"]}
     mock_self.migration_report = MigrationReport()
     mock_self.library_configuration = Mock(spec=LibraryConfiguration)
@@ -4563,3 +4567,35 @@ def test_add_default_from_schema(mocked_folio_client: FolioClient):
     assert folio_recs[1]["compositePoLines"][0]["checkinItems"] is True
     assert folio_recs[1]["compositePoLines"][0]["receiptStatus"] == "Ongoing"
     assert folio_recs[1]["compositePoLines"][0]["cost"]["discountType"] == "amount"
+
+
+def test_mapping_file_is_indexed_by_folio_property(mocked_folio_client):
+    schema = {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "formerIds": {"type": "array", "items": {"type": "string"}},
+            "notes": {"type": "array", "items": {"type": "string"}},
+            "status": {"type": "object", "properties": {"name": {"type": "string"}}},
+        },
+    }
+    the_map = {
+        "data": [
+            {"folio_field": "legacyIdentifier", "legacy_field": "id", "value": ""},
+            {
+                "folio_field": "title",
+                "legacy_field": "title",
+                "value": "",
+                "rules": {"regexGetFirstMatchOrEmpty": "(.*)@.*"},
+            },
+            {"folio_field": "title", "legacy_field": "", "value": ""},
+            {"folio_field": "title", "legacy_field": "subtitle", "value": ""},
+            {"folio_field": "formerIds[0]", "legacy_field": "id", "value": ""},
+        ]
+    }
+    mapper = MyTestableFileMapper(schema, the_map, mocked_folio_client)
+    assert mapper.map_entries_by_folio_prop["title"] == [the_map["data"][1], the_map["data"][3]]
+    assert mapper.legacy_basic_property("title") == "title"
+    assert mapper.mapped_schema_properties == ["title", "formerIds", "status"]
+    legacy_object = {"id": "1", "title": "Alpha@Beta", "subtitle": "Gamma"}
+    assert mapper.get_prop(legacy_object, "title", "1", "") == "Alpha Gamma"
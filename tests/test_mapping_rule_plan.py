@@ -0,0 +1,98 @@
+import pytest
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.marc_rules_transformation.mapping_rule_plan import (
+    MappingRulePlan,
+)
+
+schema = {
+    "properties": {
+        "title": {"type": "string"},
+        "identifiers": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["value"],
+                "properties": {
+                    "value": {"type": "string"},
+                    "identifierTypeId": {"type": "string"},
+                },
+            },
+        },
+    }
+}
+
+
+class FakeConditions:
+    def get_bound_condition(self, name):
+        return getattr(self, f"condition_{name}")
+
+    def condition_trim(self, legacy_id, value, parameter, marc_field):
+        return value.strip()
+
+    def condition_prefix(self, legacy_id, value, parameter, marc_field):
+        return parameter["prefix"] + value
+
+
+def test_rule_is_compiled_once():
+    plan = MappingRulePlan(schema, FakeConditions())
+    mapping = {"target": "title", "subfield": ["a"], "rules": []}
+    assert plan.rule(mapping) is plan.rule(mapping)
+    assert plan.rule(dict(mapping)) is not plan.rule(mapping)
+
+
+def test_conditions_are_parsed_and_applied_in_order():
+    plan = MappingRulePlan(schema, FakeConditions())
+    mapping = {
+        "target": "identifiers.value",
+        "subfield": ["a"],
+        "rules": [{"conditions": [{"type": "trim, prefix", "parameter": {"prefix": "isbn:"}}]}],
+    }
+    rule = plan.rule(mapping)
+    assert rule.condition_types == ["trim", "prefix"]
+    assert rule.target_key == "value"
+    assert plan.apply_conditions(rule, "id1", " 123 ", None) == "isbn:123"
+
+
+def test_missing_condition_raises_when_applied():
+    plan = MappingRulePlan(schema, FakeConditions())
+    rule = plan.rule({"target": "title", "rules": [{"conditions": [{"type": "nope"}]}]})
+    with pytest.raises(TransformationProcessError):
+        plan.apply_conditions(rule, "id1", "value", None)
+
+
+def test_subfields_are_grouped_by_delimiter():
+    plan = MappingRulePlan(schema, FakeConditions())
+    rule = plan.rule(
+        {
+            "target": "title",
+            "subfield": ["a", "b", "c"],
+            "subFieldDelimiter": [
+                {"value": " : ", "subfields": ["a", "b"]},
+                {"value": " / ", "subfields": ["c"]},
+            ],
+        }
+    )
+    assert rule.delimited_subfields == [(" : ", ["a", "b"]), (" / ", ["c"])]
+
+
+def test_values_to_add_are_converted():
+    plan = MappingRulePlan(schema, FakeConditions())
+    true_rule = plan.rule({"target": "t", "rules": [{"conditions": [], "value": "true"}]})
+    text_rule = plan.rule({"target": "t", "rules": [{"conditions": [], "value": "text"}]})
+    assert true_rule.has_value_to_add and true_rule.value_to_add == [True]
+    assert text_rule.value_to_add == ["text"]
+
+
+def test_entity_rules_and_targets_are_resolved():
+    plan = MappingRulePlan(schema, FakeConditions())
+    entity_mapping = {"target": "identifiers.value", "subfield": ["a"]}
+    rule = plan.rule({"entity": [entity_mapping]})
+    assert rule.is_entity and rule.entity_parent == "identifiers"
+    assert rule.entity[0] is plan.rule(entity_mapping)
+    assert plan.required_entity_properties("identifiers") == ["value"]
+    target = plan.target("identifiers.value")
+    assert [step.name for step in target.steps] == ["identifiers", "value"]
+    assert target.steps[0].is_array_of_objects and target.steps[0].property_count == 2
+    assert target.steps[1].parent_is_array_of_objects and target.steps[1].is_string
+    assert isinstance(plan.target("identifiers.nope").error, KeyError)
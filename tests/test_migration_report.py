@@ -1,8 +1,51 @@
 from dateutil import parser
 
+import i18n
+
+from folio_migration_tools.migration_report import MigrationReport, ReportMetric
+
 
 def test_time_diff():
     start = parser.parse("2022-06-29T20:21:22")
     end = parser.parse("2022-06-30T21:22:23")
     nice_diff = str(end - start)
     assert nice_diff == "1 day, 1:01:01"
+
+
+def test_merge():
+    migration_report = MigrationReport()
+    migration_report.add("GeneralStatistics", "Records processed", 2)
+    other_report = MigrationReport()
+    other_report.add("GeneralStatistics", "Records processed", 3)
+    other_report.add("RecordStatus", "a")
+    migration_report.merge(other_report.report)
+    assert migration_report.report == {
+        "GeneralStatistics": {"blurb_id": "GeneralStatistics", "Records processed": 5},
+        "RecordStatus": {"blurb_id": "RecordStatus", "a": 1},
+    }
+
+
+def test_counted_metrics_are_folded_into_the_report():
+    migration_report = MigrationReport()
+    written = ReportMetric("GeneralStatistics", "Number of records written to disk")
+    assert written is ReportMetric("GeneralStatistics", "Number of records written to disk")
+    in_file = ReportMetric(
+        "GeneralStatistics", "Number of Legacy items in %{container}", container="items.tsv"
+    )
+    for _ in range(3):
+        migration_report.count(written)
+        migration_report.count(in_file)
+    migration_report.add_general_statistics(i18n.t("Number of records written to disk"))
+    assert migration_report.report["GeneralStatistics"] == {
+        "blurb_id": "GeneralStatistics",
+        i18n.t("Number of records written to disk"): 4,
+        i18n.t("Number of Legacy items in %{container}", container="items.tsv"): 3,
+    }
+    assert not migration_report.counters
+
+
+def test_setting_the_report_drops_the_counts():
+    migration_report = MigrationReport()
+    migration_report.count(ReportMetric("GeneralStatistics", "Records processed"))
+    migration_report.report = {}
+    assert migration_report.report == {}
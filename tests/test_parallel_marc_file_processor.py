@@ -0,0 +1,167 @@
+import io
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+from folio_uuid.folio_namespaces import FOLIONamespaces
+from pymarc import Field
+from pymarc import Record
+from pymarc import Subfield
+
+from folio_migration_tools.custom_exceptions import TransformationRecordFailedError
+from folio_migration_tools.extradata_writer import ExtradataWriter
+from folio_migration_tools.library_configuration import FileDefinition
+from folio_migration_tools.library_configuration import HridHandling
+from folio_migration_tools.mapper_base import MapperBase
+from folio_migration_tools.marc_rules_transformation.hrid_handler import HRIDHandler
+from folio_migration_tools.marc_rules_transformation.marc_file_processor import (
+    MarcFileProcessor,
+)
+from folio_migration_tools.marc_rules_transformation.marc_reader_wrapper import (
+    MARCReaderWrapper,
+)
+from folio_migration_tools.marc_rules_transformation.parallel_marc_file_processor import (
+    ParallelMarcFileProcessor,
+)
+from folio_migration_tools.marc_rules_transformation.rules_mapper_base import (
+    RulesMapperBase,
+)
+from folio_migration_tools.migration_report import MigrationReport
+
+
+class FakeBibsMapper:
+    """Stands in for BibsRulesMapper, which needs a FOLIO tenant to be set up"""
+
+    get_id_map_tuple = MapperBase.get_id_map_tuple
+    save_source_record = staticmethod(RulesMapperBase.save_source_record)
+
+    def __init__(self):
+        self.migration_report = MigrationReport()
+        self.folio_client = Mock(okapi_url="https://okapi.example.com")
+        self.folio_client.folio_get_single_object.return_value = {
+            "instances": {"prefix": "in", "startNumber": 1},
+            "holdings": {"prefix": "ho", "startNumber": 1},
+            "items": {"prefix": "it", "startNumber": 1},
+            "commonRetainLeadingZeroes": True,
+        }
+        self.hrid_handler = HRIDHandler(
+            self.folio_client, HridHandling.default, self.migration_report, False
+        )
+        self.task_configuration = Mock(create_source_records=True, split_srs_records=False)
+        self.library_configuration = Mock(
+            failed_percentage_threshold=50, failed_records_threshold=100
+        )
+        self.extradata_writer = ExtradataWriter(Path(""))
+        self.id_map: dict = {}
+        self.parsed_records = 0
+        self.mapped_folio_fields: dict = {}
+        self.mapped_legacy_fields: dict = {}
+        self.conditions = None
+
+    def get_legacy_ids(self, marc_record: Record, idx: int):
+        return [marc_record["001"].value()] if "001" in marc_record else []
+
+    def parse_record(self, marc_record: Record, file_def: FileDefinition, legacy_ids):
+        self.parsed_records += 1
+        title = marc_record["245"]["a"]
+        self.migration_report.add("RecordStatus", title[:1])
+        self.mapped_folio_fields["title"] = [self.mapped_folio_fields.get("title", [0])[0] + 1]
+        instance = {"id": f"id-{legacy_ids[0]}", "title": title}
+        self.hrid_handler.handle_hrid(
+            FOLIONamespaces.instances, instance, marc_record, legacy_ids
+        )
+        if title.startswith("Failing"):
+            raise TransformationRecordFailedError(legacy_ids[0], "Failing title", title)
+        return [instance]
+
+
+def make_marc_file(path: Path):
+    records = []
+    for i in range(23):
+        legacy_id = "dupe" if i in (5, 17) else f"b{i}"
+        title = "Failing title" if i in (3, 11) else f"Title number {i}"
+        record = Record()
+        record.add_field(Field(tag="001", data=legacy_id))
+        record.add_field(
+            Field(
+                tag="245",
+                indicators=["0", "0"],
+                subfields=[Subfield(code="a", value=title)],
+            )
+        )
+        records.append(record.as_marc())
+    records.append(b"00042corrupt record")
+    path.write_bytes(b"".join(records))
+
+
+def transform(tmp_path: Path, processor_class, **kwargs):
+    tmp_path.mkdir()
+    make_marc_file(tmp_path / "bibs.mrc")
+    mapper = FakeBibsMapper()
+    folder_structure = Mock(
+        object_type=FOLIONamespaces.instances,
+        legacy_records_folder=tmp_path,
+        srs_records_path=tmp_path / "srs.json",
+    )
+    file_def = FileDefinition(file_name="bibs.mrc")
+    with open(tmp_path / "instances.json", "w+") as created_records_file:
+        processor = processor_class(mapper, folder_structure, created_records_file, **kwargs)
+        if processor_class == MarcFileProcessor:
+            MARCReaderWrapper.process_single_file(
+                file_def, processor, tmp_path / "failed.mrc", folder_structure
+            )
+        else:
+            processor.process_file(file_def, tmp_path / "failed.mrc")
+        processor.srs_records_file.close()
+    return processor
+
+
+def test_parallel_output_equals_sequential_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(ParallelMarcFileProcessor, "chunk_size", 4)
+    sequential = transform(tmp_path / "sequential", MarcFileProcessor)
+    parallel = transform(tmp_path / "parallel", ParallelMarcFileProcessor, number_of_processes=3)
+    for file_name in ["instances.json", "srs.json", "failed.mrc"]:
+        assert (tmp_path / "parallel" / file_name).read_bytes() == (
+            tmp_path / "sequential" / file_name
+        ).read_bytes()
+    assert parallel.mapper.id_map == sequential.mapper.id_map
+    assert parallel.mapper.migration_report.report == sequential.mapper.migration_report.report
+    assert parallel.mapper.parsed_records == sequential.mapper.parsed_records
+    assert parallel.mapper.mapped_folio_fields == sequential.mapper.mapped_folio_fields
+    assert (
+        parallel.mapper.hrid_handler.instance_hrid_counter
+        == sequential.mapper.hrid_handler.instance_hrid_counter
+    )
+    assert parallel.records_count == sequential.records_count
+    assert parallel.failed_records_count == sequential.failed_records_count
+
+
+def test_parallel_hrids_are_assigned_in_input_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ParallelMarcFileProcessor, "chunk_size", 2)
+    transform(tmp_path / "parallel", ParallelMarcFileProcessor, number_of_processes=4)
+    with open(tmp_path / "parallel" / "instances.json") as instances_file:
+        instances = [json.loads(line) for line in instances_file]
+    with open(tmp_path / "parallel" / "srs.json") as srs_file:
+        srs_records = [json.loads(line) for line in srs_file]
+    assert [i["hrid"] for i in instances[:3]] == [
+        "in00000000001",
+        "in00000000002",
+        "in00000000003",
+    ]
+    # The failing record consumed in00000000004, just like it does in a single process
+    assert instances[3]["hrid"] == "in00000000005"
+    for instance, srs_record in zip(instances, srs_records):
+        assert srs_record["externalIdsHolder"]["instanceHrid"] == instance["hrid"]
+        assert instance["hrid"] in json.dumps(srs_record["parsedRecord"])
+
+
+def test_read_chunks_splits_on_record_lengths():
+    marc_file = io.BytesIO(b"00010abcde00007xy00008xyz")
+    chunks = list(ParallelMarcFileProcessor.read_chunks(marc_file, 2))
+    assert chunks == [(0, [b"00010abcde", b"00007xy"]), (2, [b"00008xyz"])]
+
+
+def test_read_chunks_leaves_invalid_lengths_to_the_reader():
+    marc_file = io.BytesIO(b"00007xyabcdefghij")
+    chunks = list(ParallelMarcFileProcessor.read_chunks(marc_file, 5))
+    assert chunks == [(0, [b"00007xy", b"abcdefghij"])]
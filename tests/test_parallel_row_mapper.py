@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from folio_migration_tools.extradata_writer import ExtradataWriter
+from folio_migration_tools.helper import Helper
+from folio_migration_tools.mapping_file_transformation.parallel_row_mapper import (
+    ParallelRowMapper,
+)
+from folio_migration_tools.migration_report import MigrationReport
+
+
+class FakeMapper:
+    def __init__(self, extradata_writer: ExtradataWriter):
+        self.migration_report = MigrationReport()
+        self.mapped_folio_fields: dict = {}
+        self.mapped_legacy_fields: dict = {}
+        self.unique_record_ids: set = set()
+        self.extradata_writer = extradata_writer
+        self.num_criticalerrors = 0
+        self.num_exceptions = 0
+        self.defer_threshold_checks = False
+        self.threshold_checks: list = []
+
+    def map_row(self, idx: int, row: dict):
+        self.migration_report.add("Rows", row["kind"])
+        if row["kind"] == "failed":
+            self.num_criticalerrors += 1
+        self.mapped_folio_fields["id"] = [self.mapped_folio_fields.get("id", [0])[0] + 1]
+        if row["kind"] == "boundwith":
+            self.extradata_writer.write("boundwithPart", {"row": idx})
+        return row["value"] * 2
+
+    def report_ref_data_mapping_caches(self):
+        pass
+
+    def check_failed_records_threshold(self, records_processed: int):
+        self.threshold_checks.append((self.num_criticalerrors, records_processed))
+
+    def check_generic_exception_threshold(self):
+        pass
+
+
+def test_map_rows_returns_results_in_input_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ParallelRowMapper, "chunk_size", 3)
+    # The ExtradataWriter is a singleton, shared with the other tests
+    extradata_writer = ExtradataWriter(Path(""))
+    monkeypatch.setattr(extradata_writer, "path_to_file", tmp_path / "extradata.extradata")
+    monkeypatch.setattr(extradata_writer, "cache", [])
+    mapper = FakeMapper(extradata_writer)
+    rows = [
+        {"value": i, "kind": "boundwith" if i % 4 == 0 else "plain"} for i in range(20)
+    ]
+    row_mapper = ParallelRowMapper(mapper, mapper.map_row, 3)
+    results = list(row_mapper.map_rows(enumerate(rows)))
+    mapper.extradata_writer.flush()
+
+    assert results == [(i, i * 2) for i in range(20)]
+    assert mapper.migration_report.report["Rows"]["boundwith"] == 5
+    assert mapper.migration_report.report["Rows"]["plain"] == 15
+    assert mapper.mapped_folio_fields == {"id": [20]}
+    extradata = (tmp_path / "extradata.extradata").read_text().splitlines()
+    assert extradata == [f'boundwithPart\t{{"row": {i}}}' for i in range(0, 20, 4)]
+
+
+def test_merge_mapping_stats():
+    mapped_fields = {"id": [2, 1], "barcode": [1, 0]}
+    Helper.merge_mapping_stats(mapped_fields, {"id": [1, 1], "notes": [3, 2]})
+    assert mapped_fields == {"id": [3, 2], "barcode": [1, 0], "notes": [3, 2]}
+
+
+def test_failed_records_are_summed_and_checked_in_the_main_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(ParallelRowMapper, "chunk_size", 4)
+    extradata_writer = ExtradataWriter(Path(""))
+    monkeypatch.setattr(extradata_writer, "path_to_file", tmp_path / "extradata.extradata")
+    monkeypatch.setattr(extradata_writer, "cache", [])
+    mapper = FakeMapper(extradata_writer)
+    rows = [{"value": i, "kind": "failed" if i % 3 == 0 else "plain"} for i in range(12)]
+    list(ParallelRowMapper(mapper, mapper.map_row, 2).map_rows(enumerate(rows)))
+    assert mapper.num_criticalerrors == 4
+    assert mapper.threshold_checks == [(2, 3), (3, 7), (4, 11)]
+    assert not mapper.defer_threshold_checks
@@ -1,7 +1,13 @@
+import itertools
+import random
 from unittest.mock import Mock
 
 import pytest
+from folioclient import FolioClient
 
+from folio_migration_tools.library_configuration import LibraryConfiguration
+from folio_migration_tools.mapper_base import MapperBase
+from folio_migration_tools.mapping_file_transformation import ref_data_mapping
 from folio_migration_tools.mapping_file_transformation.ref_data_mapping import (
     RefDataMapping,
 )
@@ -24,8 +30,9 @@ def test_get_hybrid_mapping():
     legacy_object = {"location": "l_1", "loan_type": "lt_1", "material_type": "mt_1"}
     mock = Mock(spec=RefDataMapping)
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res == mappings[1]
 
@@ -39,8 +46,9 @@ def test_get_hybrid_mapping2():
     legacy_object = {"location": "l_2", "loan_type": "apa", "material_type": "papa"}
     mock = Mock(spec=RefDataMapping)
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res == mappings[0]
 
@@ -54,8 +62,9 @@ def test_get_hybrid_mapping3_4():
     legacy_object = {"location": "l_1", "loan_type": "lt_1", "material_type": "papa"}
     mock = Mock(spec=RefDataMapping)
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res == mappings[1]
 
@@ -69,8 +78,9 @@ def test_get_hybrid_mapping3_5():
     legacy_object = {"location": "l_1", "loan_type": "lt_44", "material_type": "papa"}
     mock = Mock(spec=RefDataMapping)
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res == mappings[2]
 
@@ -89,8 +99,9 @@ def test_get_hybrid_mapping_none():
     }
     mock = Mock(spec=RefDataMapping)
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res is None
 
@@ -104,8 +115,8 @@ def test_get_hybrid_mapping3():
     mock = Mock(spec=RefDataMapping)
     mock.regular_mappings = mappings
     mock.hybrid_mappings = [{"location": "sprad", "loan_type": "* ", "material_type": "*"}]
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res is None
 
@@ -119,8 +130,9 @@ def test_normal_refdata_mapping_strip():
     legacy_object = {"location": "l_1 ", "loan_type": "lt1", "material_type": "mt2 "}
     mock = Mock(spec=RefDataMapping)
     mock.regular_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["location", "loan_type", "material_type"]
+    mock.hybrid_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_ref_data_mapping(mock, legacy_object)
     assert res == mappings[2]
 
@@ -159,8 +171,8 @@ def test_mapping_for_multiple_fields():
         },
     ]
     mock.hybrid_mappings = mappings
-    mock.cache = {}
     mock.mapped_legacy_keys = ["email1_categories", "email2_categories"]
+    RefDataMapping.setup_indexes(mock)
     res = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
     assert res == mappings[1]
 
@@ -228,13 +240,67 @@ def test_multiple_emails_array_objects_with_different_ref_data_mappings():
     mock = Mock(spec=RefDataMapping)
 
     mock.hybrid_mappings = mapping_a
-    mock.cache = {}
     mock.mapped_legacy_keys = ["email1_categories", "email2_categories"]
+    mock.regular_mappings = []
+    RefDataMapping.setup_indexes(mock)
     res_1 = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
 
     mock.hybrid_mappings = mapping_b
-    mock.cache = {}
     mock.mapped_legacy_keys = ["email1_categories", "email2_categories"]
     res_2 = RefDataMapping.get_hybrid_mapping(mock, legacy_object)
 
     assert res_1 == res_2
+
+
+def test_hybrid_index_matches_the_most_specific_mapping_first_in_file():
+    keys = ["location", "loan_type", "material_type"]
+    values = ["a", "b", "*"]
+    hybrid_mappings = [
+        dict(zip(keys, combination))
+        for combination in itertools.product(values, repeat=3)
+        if "*" in combination and combination != ("*", "*", "*")
+    ]
+    random.Random(42).shuffle(hybrid_mappings)
+    mock = Mock(spec=RefDataMapping)
+    mock.regular_mappings = []
+    mock.hybrid_mappings = hybrid_mappings
+    mock.mapped_legacy_keys = keys
+    RefDataMapping.setup_indexes(mock)
+    for combination in itertools.product(["a", "b", "c"], repeat=3):
+        legacy_object = dict(zip(keys, combination))
+        # The first mapping with the highest number of matching values, as per the scoring
+        # of each mapping against the record done before the mappings were indexed
+        candidates = [
+            (sum(m[k] == legacy_object[k] for k in keys), -i, i)
+            for i, m in enumerate(hybrid_mappings)
+            if all(m[k] in [legacy_object[k], "*"] for k in keys)
+        ]
+        expected = hybrid_mappings[max(candidates)[2]] if candidates else None
+        assert RefDataMapping.get_hybrid_mapping(mock, legacy_object) is expected
+
+
+def test_hybrid_mapping_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(ref_data_mapping, "HYBRID_MAPPING_CACHE_SIZE", 2)
+    mock = Mock(spec=RefDataMapping)
+    mock.regular_mappings = []
+    mock.hybrid_mappings = [{"location": "l_1", "loan_type": "*"}]
+    mock.mapped_legacy_keys = ["location", "loan_type"]
+    RefDataMapping.setup_indexes(mock)
+    for loan_type in ["lt_1", "lt_2", "lt_1", "lt_3", "lt_2"]:
+        RefDataMapping.get_hybrid_mapping(mock, {"location": "l_1", "loan_type": loan_type})
+    assert list(mock.cache) == [("l_1", "lt_3"), ("l_1", "lt_2")]
+    assert (mock.cache_hits, mock.cache_misses) == (1, 4)
+
+
+def test_report_ref_data_mapping_caches():
+    mapper = MapperBase(Mock(spec=LibraryConfiguration), Mock(spec=FolioClient))
+    mapper.location_mapping = Mock(spec=RefDataMapping)
+    mapper.location_mapping.name = "locations"
+    mapper.location_mapping.cache_hits = 3
+    mapper.location_mapping.cache_misses = 2
+    mapper.report_ref_data_mapping_caches()
+    mapper.report_ref_data_mapping_caches()
+    report = mapper.migration_report.report["RefDataMappingCache"]
+    assert report["locations hybrid mapping cache hits"] == 3
+    assert report["locations hybrid mapping cache misses"] == 2
+    assert mapper.location_mapping.cache_hits == 0
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from folioclient import FolioClient
+
+from folio_migration_tools.custom_exceptions import TransformationProcessError
+from folio_migration_tools.library_configuration import SnapshotMode
+from folio_migration_tools.reference_data_snapshot import (
+    ReferenceDataSnapshot,
+    SnapshotFolioClient,
+)
+
+
+def make_fetch(calls: list, data):
+    def fetch():
+        calls.append(1)
+        return data
+
+    return fetch
+
+
+def test_entries_are_fetched_once_and_kept_per_tenant_and_release(tmp_path):
+    calls: list = []
+    fetch = make_fetch(calls, {"locations": [{"id": "1"}]})
+    snapshot = ReferenceDataSnapshot(tmp_path, "ramsons", SnapshotMode.use)
+    assert snapshot.get("diku", "folio:/locations", fetch) == {"locations": [{"id": "1"}]}
+    snapshot.get("diku", "folio:/locations", fetch)["locations"].clear()
+    assert ReferenceDataSnapshot(tmp_path, "ramsons", SnapshotMode.offline).get(
+        "diku", "folio:/locations", fetch
+    ) == {"locations": [{"id": "1"}]}
+    assert len(calls) == 1
+    manifest = json.loads(
+        (tmp_path / "reference_data_snapshots" / "diku" / "ramsons" / "manifest.json").read_text()
+    )
+    assert list(manifest["entries"]) == ["folio:/locations"]
+    ReferenceDataSnapshot(tmp_path, "sunflower", SnapshotMode.use).get(
+        "diku", "folio:/locations", fetch
+    )
+    assert len(calls) == 2
+
+
+def test_refresh_fetches_again_once_per_run(tmp_path):
+    calls: list = []
+    ReferenceDataSnapshot(tmp_path, "ramsons", SnapshotMode.use).get(
+        "diku", "mapping rules", make_fetch(calls, {"version": 1})
+    )
+    snapshot = ReferenceDataSnapshot(tmp_path, "ramsons", SnapshotMode.refresh)
+    fetch = make_fetch(calls, {"version": 2})
+    assert snapshot.get("diku", "mapping rules", fetch) == {"version": 2}
+    assert snapshot.get("diku", "mapping rules", fetch) == {"version": 2}
+    assert len(calls) == 2
+
+
+def test_offline_without_snapshot(tmp_path):
+    snapshot = ReferenceDataSnapshot(tmp_path, "ramsons", SnapshotMode.offline)
+    with pytest.raises(TransformationProcessError):
+        snapshot.get("diku", "folio:/locations", make_fetch([], {}))
+
+
+def test_only_reference_data_is_snapshotted(tmp_path, monkeypatch):
+    calls: list = []
+
+    def folio_get_all(self, path, key=None, query=None, limit=10, **kwargs):
+        calls.append(query)
+        yield {"id": "1"}
+
+    monkeypatch.setattr(FolioClient, "folio_get_all", folio_get_all)
+    folio_client = SnapshotFolioClient.__new__(SnapshotFolioClient)
+    folio_client.tenant_id = "diku"
+    folio_client._okapi_headers = {}
+    folio_client.cql_all = "?query=cql.allRecords=1"
+    folio_client.reference_data_snapshot = ReferenceDataSnapshot(
+        tmp_path, "ramsons", SnapshotMode.use
+    )
+    for _ in range(2):
+        assert list(folio_client.folio_get_all("/groups", "usergroups", "", 1000)) == [
+            {"id": "1"}
+        ]
+        list(folio_client.folio_get_all("/users", "users", '?query=(barcode=="1")'))
+    assert calls == ["", '?query=(barcode=="1")', '?query=(barcode=="1")']
@@ -0,0 +1,88 @@
+import json
+import os
+
+from folio_migration_tools.barcode_index import BarcodeIndex
+from folio_migration_tools.results_index import (
+    BARCODE_INDEX,
+    ResultsIndex,
+    ResultsIndexWriter,
+)
+
+
+def write_results(results_path, records):
+    with open(results_path, "w") as results_file:
+        for record in records:
+            results_file.write(json.dumps(record) + "\n")
+
+
+def test_index_is_written_next_to_the_results_file(tmp_path):
+    results_path = tmp_path / "folio_items_transform_items.json"
+    write_results(results_path, [])
+    index_writer = ResultsIndexWriter(results_path, BARCODE_INDEX)
+    index_writer.add("b2", "id2")
+    index_writer.add("b1", "id1")
+    index_writer.add("", "id3")
+    index_writer.add(None, "id4")
+    index_writer.write()
+    assert (tmp_path / "folio_items_transform_items.json.barcode.idmap").is_file()
+
+    index = ResultsIndex.open(results_path, BARCODE_INDEX)
+    assert index["b1"] == "id1"
+    assert index.get("b3") is None
+    assert list(index) == ["b1", "b2"]
+    index.close()
+
+
+def test_index_older_than_the_results_file_is_not_used(tmp_path):
+    results_path = tmp_path / "folio_users.json"
+    write_results(results_path, [])
+    assert ResultsIndex.open(results_path, BARCODE_INDEX) is None
+    index_writer = ResultsIndexWriter(results_path, BARCODE_INDEX)
+    index_writer.add("b1", "id1")
+    index_writer.write()
+    index_path = ResultsIndex.index_path(results_path, BARCODE_INDEX)
+    stat = os.stat(index_path)
+    os.utime(results_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert ResultsIndex.open(results_path, BARCODE_INDEX) is None
+
+
+def test_barcodes_are_read_from_the_index(tmp_path):
+    results_path = tmp_path / "folio_items.json"
+    write_results(results_path, [{"id": "id1", "barcode": "in file"}])
+    index_writer = ResultsIndexWriter(results_path, BARCODE_INDEX)
+    index_writer.add("in index", "id1")
+    index_writer.write()
+    barcodes = BarcodeIndex.from_results_files([results_path])
+    assert "in index" in barcodes
+    assert "in file" not in barcodes
+
+
+def test_spilled_entries_are_merged_into_the_index(tmp_path):
+    results_path = tmp_path / "folio_items.json"
+    write_results(results_path, [])
+    index_writer = ResultsIndexWriter(results_path, BARCODE_INDEX, max_entries_in_memory=2)
+    for barcode, item_id in [("b3", "id3"), ("b1", "id1"), ("b2", "id2"), ("b1", "id4")]:
+        index_writer.add(barcode, item_id)
+    index_writer.add("b5", "id5")
+    assert len(index_writer.spill_files) == 2
+    index_writer.write()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "folio_items.json",
+        "folio_items.json.barcode.idmap",
+    ]
+    index = ResultsIndex.open(results_path, BARCODE_INDEX)
+    assert dict(index.items()) == {"b1": "id4", "b2": "id2", "b3": "id3", "b5": "id5"}
+    index.close()
+
+
+def test_records_without_barcodes_are_left_out_either_way(tmp_path):
+    results_path = tmp_path / "folio_users.json"
+    write_results(results_path, [{"id": "id1", "barcode": "b1"}, {"id": "id2"}])
+    from_file = BarcodeIndex.from_results_files([results_path])
+    index_writer = ResultsIndexWriter(results_path, BARCODE_INDEX)
+    index_writer.add("b1", "id1")
+    index_writer.add(None, "id2")
+    index_writer.write()
+    from_index = BarcodeIndex.from_results_files([results_path])
+    assert len(from_file) == len(from_index) == 1
+    assert "None" not in from_file
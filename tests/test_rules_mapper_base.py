@@ -235,6 +235,30 @@ def test_get_srs_string_bib():
             assert "snapshotId" not in record
 
 
+def test_get_srs_string_serializes_the_marc_record_once():
+    path = "./tests/test_data/two020a.mrc"
+    with open(path, "rb") as marc_file:
+        reader = MARCReader(marc_file, to_unicode=True, permissive=True)
+        record = next(reader)
+    instance = {"id": str(uuid4()), "hrid": "my hrid"}
+    srs_id = str(uuid4())
+    srs_record_string = RulesMapperBase.get_srs_string(
+        record, instance, srs_id, False, FOLIONamespaces.instances
+    )
+    srs_record = json.loads(srs_record_string)
+    assert srs_record["rawRecord"] == {"id": srs_id, "content": record.as_json()}
+    assert srs_record["parsedRecord"] == {"id": srs_id, "content": record.as_dict()}
+    assert srs_record["leaderRecordStatus"] == str(record.leader)[5]
+    assert srs_record_string == json.dumps(srs_record)
+
+    split_srs_record = RulesMapperBase.get_srs_string(
+        record, instance, srs_id, False, FOLIONamespaces.instances, True
+    )
+    assert split_srs_record.split("\t")[1] == record.as_json()
+    assert RulesMapperBase.join_split_srs_record(f"{split_srs_record}\n") == srs_record_string
+    assert RulesMapperBase.join_split_srs_record('id\t{"a": 1}') == 'id\t{"a": 1}'
+
+
 def test_get_srs_string_bad_leaders():
     path = "./tests/test_data/corrupt_leader.mrc"
     with open(path, "rb") as marc_file: